@@ -3,14 +3,18 @@ import asyncio
 import logging
 from aiogram import Bot, Dispatcher
 from config import TOKEN
-from aiogram.fsm.storage.memory import MemoryStorage
+from database.fsm_storage import SQLiteStorage
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 
 async def main():
     bot = Bot(token=TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
+    # Все исходящие запросы проходят через планировщик с лимитами Telegram
+    from utils.send_queue import send_scheduler
+    bot.session.middleware(send_scheduler)
+    # Состояния FSM переживают перезапуск: горячие - в памяти, все - в SQLite
+    dp = Dispatcher(storage=SQLiteStorage())
     
     # ПРАВИЛЬНЫЙ ПОРЯДОК ПОДКЛЮЧЕНИЯ РОУТЕРОВ
     # Сначала подключаем start_router - он обрабатывает /start и основные кнопки
@@ -26,7 +30,45 @@ async def main():
     dp.include_router(orders_router)
     
     print("✅ Все роутеры подключены в правильном порядке")
-    await dp.start_polling(bot)
+    
+    # Отложенные сообщения: переход кнопкой на другой шаг отменяет еще не пришедшие сообщения прежнего
+    from utils.followups import CancelFollowUpsMiddleware, followups
+    dp.callback_query.outer_middleware(CancelFollowUpsMiddleware(followups))
+    
+    # Кнопки ищутся по индексу: сообщаем о дублях и перехваченных обработчиках
+    from utils.callback_dispatch import check_callback_routes
+    check_callback_routes(start_router, tutorial_router)
+    
+    # Кнопки сценария обучения должны вести к обработчикам
+    from routers.tutorial import tutorial_scenario
+    tutorial_scenario.check_links(start_router, tutorial_router)
+    
+    # Горячие запросы должны идти по индексам - иначе не стартуем
+    from database.models import Database
+    Database().check_query_plans()
+    
+    # Каждый сохраненный шаг обучения должен восстанавливаться по «Продолжить играть»
+    from database.models import tutorial_db
+    from routers.resume import check_resume_steps
+    check_resume_steps(tutorial_db.get_progress_steps())
+    
+    # Картинки проверяем один раз при старте, а не перед каждой отправкой
+    from utils.assets import asset_manifest, referenced_images
+    asset_manifest.report_missing(referenced_images())
+    
+    # Колесо отложенных сообщений (и досылка не отправленных до перезапуска)
+    followups.start(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await followups.stop()
+        # Сохраняем отложенные состояния и прогресс, дожидаемся запросов к БД и закрываем соединения
+        await dp.storage.close()
+        from database.async_db import shutdown_executor
+        from database.pool import close_all_pools
+        shutdown_executor()
+        tutorial_db.close()
+        close_all_pools()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -2,6 +2,9 @@ import sqlite3
 import threading
 from datetime import datetime
 
+from database.migrations import migrate
+from database.seed import ORDER_TEMPLATES, ORDER_TEMPLATES_COLUMNS, seed_table
+
 # Безопасное подключение к БД для многих пользователей
 class Database:
     def __init__(self):
@@ -16,8 +19,7 @@ class Database:
 # Создаем один экземпляр базы данных
 db = Database()
 
-def init_database():
-    conn = db.get_connection()
+def _create_tables(conn):
     cursor = conn.cursor()
     
     # Таблица игроков
@@ -64,26 +66,18 @@ def init_database():
         FOREIGN KEY (order_template_id) REFERENCES order_templates (id)
     )
     """)
+
+# Миграции players.db (версия схемы - PRAGMA user_version)
+MIGRATIONS = (
+    (1, "Таблицы игроков и заказов", _create_tables),
+)
+
+def init_database():
+    conn = db.get_connection()
+    migrate(conn, MIGRATIONS)
     
-    # Наполняем шаблоны заказов
-    cursor.execute("SELECT COUNT(*) FROM order_templates")
-    if cursor.fetchone()[0] == 0:
-        # Добавляем тестовые заказы
-        orders = [
-            ("Простой ремень", "Изготовить простой кожаный ремень", "easy", 1, 10, 5, 0),
-            ("Кошелек", "Создать кожаный кошелек", "easy", 2, 15, 8, 1),
-            ("Чехол для телефона", "Изготовить чехол для телефона", "medium", 3, 30, 15, 1),
-            ("Портмоне", "Создать кожаное портмоне", "medium", 4, 45, 20, 2),
-            ("Сумка", "Изготовить кожаную сумку", "hard", 5, 70, 35, 3)
-        ]
-        
-        for order in orders:
-            cursor.execute("""
-                INSERT INTO order_templates (name, description, difficulty, required_mastery, base_coins, base_exp, base_rep)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, order)
-    
-    conn.commit()
+    # Наполняем шаблоны заказов (только если они изменились)
+    seed_table(conn, "order_templates", ORDER_TEMPLATES_COLUMNS, ORDER_TEMPLATES)
 
 # ===== ИГРОКИ =====
 def add_player(user_id, character_name, character_type, mastery, luck, marketing, reputation, title="", coins=0):
@@ -0,0 +1,54 @@
+# database/async_db.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database.models import tutorial_db as sync_tutorial_db
+from database.pool import DEFAULT_POOL_SIZE
+
+# Отдельные потоки под SQLite, чтобы запросы не блокировали event loop.
+# Потоков столько же, сколько соединений в пуле - ждать соединение не придется.
+_executor = ThreadPoolExecutor(max_workers=DEFAULT_POOL_SIZE, thread_name_prefix="db")
+
+
+class AsyncDatabase:
+    """Асинхронная обертка над Database / TutorialDatabase.
+
+    Те же методы, но возвращают awaitable и выполняются в потоках БД:
+        player = await db.get_active_player(user_id)
+    Не-вызываемые атрибуты (db_path, pool) отдаются как есть.
+    """
+
+    def __init__(self, sync_db, executor=None):
+        self._db = sync_db
+        self._executor = executor or _executor
+
+    @property
+    def sync(self):
+        """Синхронный объект (для скриптов и кода вне event loop)"""
+        return self._db
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(attr, *args, **kwargs)
+            )
+
+        # Кэшируем обертку, чтобы не создавать ее на каждый вызов
+        self.__dict__[name] = wrapper
+        return wrapper
+
+
+def shutdown_executor():
+    """Дожидается завершения запросов и останавливает потоки БД"""
+    _executor.shutdown(wait=True)
+
+
+# Асинхронный экземпляр базы данных для обучения
+async_tutorial_db = AsyncDatabase(sync_tutorial_db)
@@ -0,0 +1,104 @@
+# database/cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Настройки кэша активных персонажей (можно переопределить через переменные окружения)
+PLAYER_CACHE_SIZE = int(os.getenv("PLAYER_CACHE_SIZE", "10000"))
+PLAYER_CACHE_TTL = float(os.getenv("PLAYER_CACHE_TTL", "300"))
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш с ограничением по размеру и времени жизни записей"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Растет при каждой инвалидации: запись, прочитанная до нее, в кэш не попадет
+        self._generation = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[1] < now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def set(self, key, value, generation=None):
+        """Сохраняет значение. С generation - только если с тех пор не было инвалидаций"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def evict_expired(self):
+        """Удаляет просроченные записи, не дожидаясь обращения к ним"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._data.items() if entry[1] < now]
+            for key in expired:
+                del self._data[key]
+            self._evictions += len(expired)
+            return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / requests if requests else 0.0,
+            }
+
+
+_player_caches = {}
+_player_caches_lock = threading.Lock()
+
+
+def get_player_cache(db_path):
+    """Общий кэш активных персонажей на файл базы (все экземпляры Database видят одни данные)"""
+    key = os.path.abspath(db_path)
+    with _player_caches_lock:
+        cache = _player_caches.get(key)
+        if cache is None:
+            cache = LRUCache(PLAYER_CACHE_SIZE, PLAYER_CACHE_TTL)
+            _player_caches[key] = cache
+        return cache
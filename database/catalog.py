@@ -0,0 +1,127 @@
+# database/catalog.py
+from types import MappingProxyType
+from typing import NamedTuple
+
+
+class ShopItem(NamedTuple):
+    """Товар магазина (строка shop_items)"""
+    id: int
+    name: str
+    category: str
+    price: int
+    available_in_tutorial: bool
+    image_path: str
+
+
+# Вид товара - по категории магазина
+ITEM_KINDS = {
+    "Ножи": "tool",
+    "Пробойники": "tool",
+    "Торцбилы": "tool",
+    "Материалы": "leather",
+    "Фурнитура": "hardware",
+    "Нитки": "thread",
+    "Химия": "chemistry",
+}
+
+# Роли товара в рецептах (какие предметы инвентаря предлагать на шаге выбора)
+ITEM_ROLES = {
+    "belt_leather": lambda item, kind: kind == "leather" and "ременная" in item.name.lower(),
+    # Кожа и фурнитура для сумки: ременные заготовки и нержавейка для ремней не подходят
+    "bag_material": lambda item, kind: (
+        (kind == "leather" and "кожа" in item.name.lower())
+        or (kind == "hardware" and "фурнитура" in item.name.lower())
+    ),
+    # Для сумки торцбилы не нужны, кроме мультитула (в нем есть нож)
+    "bag_tool": lambda item, kind: kind == "tool" and (item.category != "Торцбилы" or "мультитул" in item.name.lower()),
+    "wax": lambda item, kind: kind == "chemistry" and "воск" in item.name.lower(),
+    "wax_mix": lambda item, kind: kind == "chemistry" and "масловосковые" in item.name.lower(),
+}
+
+
+class ShopCatalog:
+    """Неизменяемый снимок каталога магазина.
+
+    Индексы по id, по названию и по категории (товары категории отсортированы по цене).
+    Вид товара, роли в рецептах и доступность в обучении считаются один раз при сборке:
+    проверка «это инструмент?» - поиск в frozenset, а не поиск подстрок в названии.
+    При изменении каталога не правится, а заменяется новым снимком целиком.
+    """
+
+    __slots__ = ("version", "items", "by_id", "by_name", "by_category", "categories",
+                 "kinds", "by_kind", "by_role", "tutorial_ids")
+
+    def __init__(self, items, version):
+        items = tuple(sorted(items, key=lambda item: (item.category, item.price, item.id)))
+
+        by_category = {}
+        for item in items:
+            by_category.setdefault(item.category, []).append(item)
+
+        self.version = version
+        self.items = items
+        self.by_id = MappingProxyType({item.id: item for item in items})
+        self.by_name = MappingProxyType({item.name: item for item in items})
+        self.by_category = MappingProxyType(
+            {category: tuple(category_items) for category, category_items in by_category.items()}
+        )
+        self.categories = tuple(self.by_category)
+
+        kinds = {item.id: ITEM_KINDS.get(item.category) for item in items}
+        by_kind = {}
+        by_role = {role: set() for role in ITEM_ROLES}
+        for item in items:
+            by_kind.setdefault(kinds[item.id], set()).add(item.name)
+            for role, matches in ITEM_ROLES.items():
+                if matches(item, kinds[item.id]):
+                    by_role[role].add(item.name)
+        self.kinds = MappingProxyType(kinds)
+        self.by_kind = MappingProxyType({kind: frozenset(names) for kind, names in by_kind.items()})
+        self.by_role = MappingProxyType({role: frozenset(names) for role, names in by_role.items()})
+        self.tutorial_ids = frozenset(item.id for item in items if item.available_in_tutorial)
+
+    def get(self, item_id):
+        return self.by_id.get(item_id)
+
+    def find(self, name):
+        return self.by_name.get(name)
+
+    def kind(self, item_id):
+        """Вид товара: tool / leather / hardware / thread / chemistry"""
+        return self.kinds.get(item_id)
+
+    def of_kind(self, kind):
+        """Названия товаров вида kind (frozenset)"""
+        return self.by_kind.get(kind, frozenset())
+
+    def with_role(self, role):
+        """Названия товаров с ролью role в рецептах (frozenset)"""
+        return self.by_role.get(role, frozenset())
+
+    def in_tutorial(self, item_id):
+        return item_id in self.tutorial_ids
+
+    def in_category(self, category, tutorial_only=False):
+        """Товары категории по возрастанию цены"""
+        items = self.by_category.get(category, ())
+        if tutorial_only:
+            return tuple(item for item in items if item.available_in_tutorial)
+        return items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def load_catalog(conn, version):
+    """Читает shop_items и собирает снимок каталога"""
+    cursor = conn.execute(
+        'SELECT id, name, category, price, available_in_tutorial, image_path FROM shop_items'
+    )
+    items = [
+        ShopItem(row[0], row[1], row[2], row[3], bool(row[4]), row[5])
+        for row in cursor.fetchall()
+    ]
+    return ShopCatalog(items, version)
@@ -0,0 +1,144 @@
+# database/fsm_storage.py
+import asyncio
+import json
+import os
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage
+
+from database.async_db import _executor
+from database.cache import LRUCache
+from database.migrations import prepare_database
+from database.pool import get_pool
+from database.write_buffer import WriteBehindBuffer
+
+# Сколько состояний держим в памяти и через сколько секунд простоя выгружаем их
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_IDLE_TTL = float(os.getenv("FSM_IDLE_TTL", "900"))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.5"))
+
+_MISSING = object()
+
+
+def _storage_key(key):
+    """StorageKey aiogram -> строковый ключ таблицы fsm_storage"""
+    return ":".join(str(part) if part is not None else "" for part in (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id,
+        getattr(key, "business_connection_id", None), key.destiny,
+    ))
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище aiogram поверх SQLite.
+
+    Горячие записи (состояние, данные) живут в LRU-кэше и читаются без БД.
+    Изменения копятся в буфере отложенной записи и пишутся пачкой в фоне,
+    поэтому после перезапуска бота игроки продолжают с того же места.
+    """
+
+    def __init__(self, db_path='game.db', cache_size=None, idle_ttl=None, flush_interval=None):
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+        prepare_database(db_path)
+        self.cache = LRUCache(cache_size or FSM_CACHE_SIZE, idle_ttl or FSM_IDLE_TTL)
+        self.buffer = WriteBehindBuffer(
+            self._persist,
+            lambda old, new: new,  # в буфере всегда полный снимок записи
+            interval=flush_interval or FSM_FLUSH_INTERVAL,
+            name="fsm-write-behind",
+        )
+
+    async def _get_record(self, key):
+        record = self.cache.get(key, _MISSING)
+        if record is not _MISSING:
+            return record
+        loop = asyncio.get_running_loop()
+        record = await loop.run_in_executor(_executor, self._load, key)
+        # Пока читали из БД, запись могли обновить - свежая важнее
+        current = self.cache.get(key, _MISSING)
+        if current is not _MISSING:
+            return current
+        self.cache.set(key, record)
+        return record
+
+    def _put_record(self, key, state, data):
+        record = (state, data)
+        self.cache.set(key, record)
+        self.buffer.put(key, record)
+
+    def _load(self, key):
+        # Несохраненное изменение могло уйти из кэша раньше, чем записалось
+        self.buffer.flush(key)
+        conn = self.pool.acquire()
+        try:
+            row = conn.execute('SELECT state, data FROM fsm_storage WHERE key = ?', (key,)).fetchone()
+        finally:
+            self.pool.release(conn)
+        if not row:
+            return None, {}
+        return row[0], json.loads(row[1])
+
+    def _persist(self, items):
+        """Пишет пачку записей одной транзакцией; пустые записи удаляет"""
+        upserts = []
+        deletes = []
+        for key, (state, data) in items:
+            if state is None and not data:
+                deletes.append((key,))
+            else:
+                upserts.append((key, state, json.dumps(data, ensure_ascii=False)))
+
+        conn = self.pool.acquire()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            if upserts:
+                conn.executemany(
+                    'INSERT INTO fsm_storage (key, state, data, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP) '
+                    'ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, '
+                    'updated_at = excluded.updated_at',
+                    upserts
+                )
+            if deletes:
+                conn.executemany('DELETE FROM fsm_storage WHERE key = ?', deletes)
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+
+        # Заодно выгружаем из памяти записи игроков, которые давно не заходили
+        self.cache.evict_expired()
+
+    async def set_state(self, key, state=None):
+        storage_key = _storage_key(key)
+        _, data = await self._get_record(storage_key)
+        self._put_record(storage_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key):
+        state, _ = await self._get_record(_storage_key(key))
+        return state
+
+    async def set_data(self, key, data):
+        storage_key = _storage_key(key)
+        state, _ = await self._get_record(storage_key)
+        self._put_record(storage_key, state, dict(data))
+
+    async def get_data(self, key):
+        _, data = await self._get_record(_storage_key(key))
+        return data.copy()
+
+    async def update_data(self, key, data=None, **kwargs):
+        storage_key = _storage_key(key)
+        state, current = await self._get_record(storage_key)
+        current = current.copy()
+        if data:
+            current.update(data)
+        current.update(kwargs)
+        self._put_record(storage_key, state, current)
+        return current.copy()
+
+    def stats(self):
+        return {"cache": self.cache.stats(), "buffer": self.buffer.stats()}
+
+    async def close(self):
+        # Останавливаем фоновую запись и сбрасываем все накопленное
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.buffer.close)
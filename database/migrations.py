@@ -0,0 +1,265 @@
+# database/migrations.py
+import os
+import threading
+
+from database.pool import get_pool
+from database.schema import create_hot_indexes
+from database.seed import (
+    MATERIALS,
+    MATERIALS_COLUMNS,
+    SHOP_ITEMS,
+    SHOP_ITEMS_COLUMNS,
+    TOOLS,
+    TOOLS_COLUMNS,
+    seed_table,
+)
+from database.steps import STEP_BITS, steps_to_mask
+
+
+def _create_base_tables(conn):
+    # Таблица пользователей Telegram
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Таблица игровых персонажей (gender добавляет миграция 2)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS players (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            class TEXT NOT NULL,
+            level INTEGER DEFAULT 1,
+            mastery INTEGER DEFAULT 0,
+            luck INTEGER DEFAULT 0,
+            marketing INTEGER DEFAULT 0,
+            reputation INTEGER DEFAULT 0,
+            coins INTEGER DEFAULT 2000,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Таблица инструментов
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tools (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price INTEGER NOT NULL,
+            mastery_bonus INTEGER DEFAULT 0,
+            luck_bonus INTEGER DEFAULT 0,
+            durability INTEGER DEFAULT 10
+        )
+    ''')
+
+    # Таблица материалов
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS materials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price INTEGER NOT NULL,
+            stage1_bonus INTEGER DEFAULT 0,
+            stage4_bonus INTEGER DEFAULT 0,
+            durability INTEGER DEFAULT 1
+        )
+    ''')
+
+    # Таблица инвентаря игрока
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS player_inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id INTEGER NOT NULL,
+            item_type TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            quantity INTEGER DEFAULT 1,
+            current_durability INTEGER,
+            FOREIGN KEY (player_id) REFERENCES players (id)
+        )
+    ''')
+
+    # Таблица прогресса обучения
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tutorial_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id INTEGER NOT NULL,
+            current_step TEXT DEFAULT 'start',
+            has_started BOOLEAN DEFAULT FALSE,
+            completed_steps TEXT DEFAULT '',
+            player_balance INTEGER DEFAULT 2000,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (player_id) REFERENCES players (id)
+        )
+    ''')
+
+    # Таблица инвентаря обучения
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tutorial_inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id INTEGER NOT NULL,
+            item_name TEXT,
+            item_type TEXT,
+            quantity INTEGER DEFAULT 1,
+            FOREIGN KEY (player_id) REFERENCES players (id)
+        )
+    ''')
+
+    # Таблица товаров магазина
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS shop_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            category TEXT,
+            price INTEGER,
+            available_in_tutorial BOOLEAN DEFAULT FALSE,
+            image_path TEXT
+        )
+    ''')
+
+
+def _table_columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+
+
+def _add_player_gender(conn):
+    # В старых базах поле уже могло быть добавлено через ALTER при старте
+    if "gender" not in _table_columns(conn, "players"):
+        conn.execute("ALTER TABLE players ADD COLUMN gender TEXT NOT NULL DEFAULT 'male'")
+
+
+def _add_completed_mask(conn):
+    # Выполненные шаги - битовая маска вместо растущей CSV-строки (колонка completed_steps больше не пишется)
+    if "completed_mask" not in _table_columns(conn, "tutorial_progress"):
+        conn.execute("ALTER TABLE tutorial_progress ADD COLUMN completed_mask INTEGER NOT NULL DEFAULT 0")
+
+    rows = conn.execute(
+        "SELECT id, completed_steps FROM tutorial_progress WHERE completed_steps IS NOT NULL AND completed_steps != ''"
+    ).fetchall()
+    updates = []
+    for row_id, completed_steps in rows:
+        steps = [step for step in completed_steps.split(',') if step]
+        unknown = [step for step in steps if step not in STEP_BITS]
+        if unknown:
+            print(f"⚠️ Прогресс {row_id}: неизвестные шаги {unknown} пропущены")
+        updates.append((steps_to_mask(step for step in steps if step in STEP_BITS), row_id))
+    conn.executemany(
+        "UPDATE tutorial_progress SET completed_mask = completed_mask | ?, completed_steps = '' WHERE id = ?",
+        updates
+    )
+
+
+def _create_fsm_storage(conn):
+    # Состояния FSM aiogram (см. database/fsm_storage.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _create_media_files(conn):
+    # file_id загруженных в Telegram картинок (см. utils/media.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS media_files (
+            path TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _create_scheduled_messages(conn):
+    # Отложенные сообщения игрокам (см. utils/followups.py), переживают перезапуск
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scheduled_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            due_at REAL NOT NULL,
+            payload TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scheduled_messages_chat ON scheduled_messages (chat_id)')
+
+
+def _create_schema_meta(conn):
+    # Служебные метки (версии справочников seed:*). В старых базах таблица уже
+    # создана на лету прежним get_meta - поэтому IF NOT EXISTS
+    conn.execute('CREATE TABLE IF NOT EXISTS schema_meta (key TEXT PRIMARY KEY, value TEXT)')
+
+
+# Нумерованные миграции: (версия, описание, функция(conn)).
+# Уже примененные миграции не меняем - любое изменение схемы оформляем новой.
+MIGRATIONS = (
+    (1, "Базовые таблицы", _create_base_tables),
+    (2, "Поле gender у персонажей", _add_player_gender),
+    (3, "Индексы горячих запросов", create_hot_indexes),
+    (4, "Битовая маска выполненных шагов обучения", _add_completed_mask),
+    (5, "Хранилище состояний FSM", _create_fsm_storage),
+    (6, "Кэш file_id картинок Telegram", _create_media_files),
+    (7, "Отложенные сообщения", _create_scheduled_messages),
+    (8, "Служебная таблица schema_meta", _create_schema_meta),
+)
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Применяет недостающие миграции. Версия схемы хранится в PRAGMA user_version.
+
+    Если база актуальна - это одно чтение user_version без блокировки на запись.
+    """
+    target = migrations[-1][0] if migrations else 0
+    if get_schema_version(conn) >= target:
+        return 0
+
+    applied = 0
+    for version, description, apply in migrations:
+        # Каждая миграция - отдельная транзакция вместе с записью версии
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Перечитываем под блокировкой: миграцию мог применить другой процесс
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied += 1
+        print(f"🛠️ Миграция {version} применена: {description}")
+    return applied
+
+
+_prepared = set()
+_prepared_lock = threading.Lock()
+
+
+def prepare_database(db_path):
+    """Миграции и справочники - один раз на процесс для каждого файла базы"""
+    key = os.path.abspath(db_path)
+    with _prepared_lock:
+        if key in _prepared:
+            return
+        with get_pool(db_path).connection() as conn:
+            migrate(conn)
+            seed_table(conn, "tools", TOOLS_COLUMNS, TOOLS)
+            seed_table(conn, "materials", MATERIALS_COLUMNS, MATERIALS)
+            seed_table(conn, "shop_items", SHOP_ITEMS_COLUMNS, SHOP_ITEMS)
+        _prepared.add(key)
@@ -1,171 +1,78 @@
 # database/models.py
-import sqlite3
-from datetime import datetime
+import atexit
+import os
+import threading
+from typing import NamedTuple, Optional
+
+from database.cache import get_player_cache
+from database.catalog import load_catalog
+from database.migrations import prepare_database
+from database.pool import PooledConnection, get_pool
+from database.schema import check_query_plans
+from database.seed import (
+    DEFAULT_CLASS_STATS,
+    PLAYER_CLASSES,
+    SHOP_ITEMS,
+    SHOP_ITEMS_COLUMNS,
+    content_hash,
+)
+from database.steps import mask_to_steps, step_bit
+from database.write_buffer import WriteBehindBuffer
 
 class Database:
     def __init__(self, db_path='game.db'):
         self.db_path = db_path
-        self.init_db()
-        self.add_gender_column()
+        self.pool = get_pool(db_path)
+        # Миграции и справочники - один раз на процесс
+        prepare_database(db_path)
+        # Кэш активных персонажей по telegram_id (общий для всех экземпляров)
+        self.player_cache = get_player_cache(db_path)
     
-    def add_gender_column(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_connection(self):
+        """Берет соединение из общего пула (close() возвращает его обратно)"""
+        return PooledConnection(self.pool, self.pool.acquire())
+    
+    def check_query_plans(self):
+        """Самопроверка: горячие запросы должны идти по индексам"""
+        conn = self.get_connection()
         try:
-            cursor.execute('ALTER TABLE players ADD COLUMN gender TEXT NOT NULL DEFAULT "male"')
-            print("✅ Добавлено поле gender в таблицу players")
-        except sqlite3.OperationalError as e:
-            print(f"✅ Поле gender уже существует или ошибка: {e}")
+            check_query_plans(conn)
         finally:
             conn.close()
-    
-    def init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Таблица пользователей Telegram
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE NOT NULL,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица игровых персонажей (ОБНОВЛЕНА - добавлены coins)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                class TEXT NOT NULL,
-                level INTEGER DEFAULT 1,
-                mastery INTEGER DEFAULT 0,
-                luck INTEGER DEFAULT 0,
-                marketing INTEGER DEFAULT 0,
-                reputation INTEGER DEFAULT 0,
-                coins INTEGER DEFAULT 2000,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                gender TEXT NOT NULL DEFAULT 'male',
-                FOREIGN KEY (user_id) REFERENCES users (id)               
-            )
-        ''')
-        
-        # Таблица инструментов (НОВАЯ)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tools (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                category TEXT NOT NULL,
-                price INTEGER NOT NULL,
-                mastery_bonus INTEGER DEFAULT 0,
-                luck_bonus INTEGER DEFAULT 0,
-                durability INTEGER DEFAULT 10
-            )
-        ''')
-        
-        # Таблица материалов (НОВАЯ)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS materials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                category TEXT NOT NULL,
-                price INTEGER NOT NULL,
-                stage1_bonus INTEGER DEFAULT 0,
-                stage4_bonus INTEGER DEFAULT 0,
-                durability INTEGER DEFAULT 1
-            )
-        ''')
-        
-        # Таблица инвентаря игрока (НОВАЯ)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS player_inventory (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_id INTEGER NOT NULL,
-                item_type TEXT NOT NULL,
-                item_id INTEGER NOT NULL,
-                quantity INTEGER DEFAULT 1,
-                current_durability INTEGER,
-                FOREIGN KEY (player_id) REFERENCES players (id)
-            )
-        ''')
+
+    def _load_active_players(self, telegram_id):
+        """Активные персонажи пользователя: из кэша или одним запросом"""
+        players = self.player_cache.get(telegram_id)
+        if players is not None:
+            return players
         
-        # Наполняем таблицы инструментов и материалов
-        self._populate_tools_and_materials(cursor)
+        generation = self.player_cache.generation
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute('''
+                SELECT p.* FROM players p 
+                JOIN users u ON p.user_id = u.id 
+                WHERE u.telegram_id = ? AND p.is_active = TRUE
+            ''', (telegram_id,))
+            players = tuple(cursor.fetchall())
+        finally:
+            conn.close()
         
-        conn.commit()
-        conn.close()
+        # Если пока шел запрос персонажа изменили - не кэшируем устаревшие данные
+        self.player_cache.set(telegram_id, players, generation)
+        return players
     
-    def _populate_tools_and_materials(self, cursor):
-        """Наполняет таблицы инструментов и материалов"""
-        # Проверяем, есть ли уже данные
-        cursor.execute("SELECT COUNT(*) FROM tools")
-        if cursor.fetchone()[0] == 0:
-            tools = [
-                # Дешевые инструменты
-                ("Канцелярский нож", "Ножи", 300, -5, -5, 10),
-                ("Высечные пробойники", "Пробойники", 280, 0, 0, 10),
-                ("Мультитул 3 в 1", "Торцбилы", 250, -10, -20, 10),
-                ("Сликер", "Сликеры", 200, 0, 0, 10),
-                # Средние инструменты  
-                ("Нож SDI", "Ножи", 900, 10, 5, 15),
-                ("Пробойники Wuta", "Пробойники", 840, 0, 0, 18),
-                ("Торцбил Wuta", "Торцбилы", 750, 0, -5, 20),
-                # Дорогие инструменты
-                ("Шорный нож", "Ножи", 3600, 20, 10, 25),
-                ("Пробойники Sinabroks", "Пробойники", 3360, 10, 10, 28),
-                ("Профессиональный торцбил", "Торцбилы", 3000, 15, 10, 30)
-            ]
-            
-            for tool in tools:
-                cursor.execute('''
-                    INSERT INTO tools (name, category, price, mastery_bonus, luck_bonus, durability)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', tool)
-        
-        cursor.execute("SELECT COUNT(*) FROM materials")
-        if cursor.fetchone()[0] == 0:
-            materials = [
-                # Дешевые материалы
-                ("Дешевая ременная лента", "Кожа для ремней", 150, -5, -5, 1),
-                ("Дешевая фурнитура", "Фурнитура для ремней", 100, -5, -5, 1),
-                ("Пчелиный воск", "Химия", 80, 0, -25, 50),
-                # Средние материалы
-                ("Обычная ременная лента", "Кожа для ремней", 450, 0, 0, 1),
-                ("Нержавейка", "Фурнитура для ремней", 300, 0, 0, 1),
-                ("Масловосковые смеси", "Химия", 240, 0, -10, 75),
-                # Дорогие материалы
-                ("Дорогая ременная лента", "Кожа для ремней", 1800, 8, 8, 1),
-                ("Латунная фурнитура", "Фурнитура для ремней", 1200, 8, 8, 1),
-                ("Профессиональная косметика", "Химия", 960, 0, 30, 100)
-            ]
-            
-            for material in materials:
-                cursor.execute('''
-                    INSERT INTO materials (name, category, price, stage1_bonus, stage4_bonus, durability)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', material)
+    def _invalidate_players(self, cursor, where, params):
+        """Сбрасывает кэш для владельцев затронутых персонажей"""
+        cursor.execute(f'SELECT telegram_id FROM users WHERE {where}', params)
+        for (telegram_id,) in cursor.fetchall():
+            self.player_cache.invalidate(telegram_id)
 
     def get_user_players(self, telegram_id):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.* FROM players p 
-            JOIN users u ON p.user_id = u.id 
-            WHERE u.telegram_id = ? AND p.is_active = TRUE
-        ''', (telegram_id,))
-        
-        players = cursor.fetchall()
-        conn.close()
-        return players
+        return list(self._load_active_players(telegram_id))
 
     def add_user(self, telegram_id, username, first_name, last_name):
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -175,10 +82,12 @@ class Database:
             ''', (telegram_id, username, first_name, last_name))
             
             conn.commit()
-            user_id = cursor.lastrowid
             
-            # Если пользователь уже существовал, получаем его ID
-            if user_id == 0:
+            # Если пользователь уже существовал, получаем его ID. lastrowid тут не годится:
+            # соединение из пула помнит rowid прошлой вставки, а не 0
+            if cursor.rowcount == 1:
+                user_id = cursor.lastrowid
+            else:
                 cursor.execute('SELECT id FROM users WHERE telegram_id = ?', (telegram_id,))
                 user_id = cursor.fetchone()[0]
                 
@@ -192,24 +101,17 @@ class Database:
 
     def add_player(self, user_id, name, player_class, gender='male'):
         """Добавляет нового персонажа с характеристиками по классу"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Устанавливаем характеристики в зависимости от класса (ОБНОВЛЕННЫЕ)
-        if player_class == "Работяга":
-            mastery, luck, marketing, reputation = 25, 15, 5, 5
-        elif player_class == "Менеджер":
-            mastery, luck, marketing, reputation = 10, 15, 25, 10
-        elif player_class == "Блоггер":
-            mastery, luck, marketing, reputation = 5, 25, 20, 20
-        else:
-            mastery, luck, marketing, reputation = 10, 10, 10, 10
+        # Устанавливаем характеристики в зависимости от класса
+        mastery, luck, marketing, reputation = PLAYER_CLASSES.get(player_class, DEFAULT_CLASS_STATS)
         
         try:
             # Деактивируем всех предыдущих персонажей пользователя
             cursor.execute('''
                 UPDATE players SET is_active = FALSE 
-                WHERE user_id = ?
+                WHERE user_id = ? AND is_active = TRUE
             ''', (user_id,))
             
             # Создаем нового активного персонажа
@@ -221,6 +123,8 @@ class Database:
             conn.commit()
             player_id = cursor.lastrowid
             
+            self._invalidate_players(cursor, 'id = ?', (user_id,))
+            
         except Exception as e:
             print(f"Error adding player: {e}")
             player_id = None
@@ -231,173 +135,177 @@ class Database:
 
     def get_active_player(self, telegram_id):
         """Получает активного персонажа пользователя"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.* FROM players p 
-            JOIN users u ON p.user_id = u.id 
-            WHERE u.telegram_id = ? AND p.is_active = TRUE
-        ''', (telegram_id,))
-        
-        player = cursor.fetchone()
-        conn.close()
-        return player
+        players = self._load_active_players(telegram_id)
+        return players[0] if players else None
 
     def deactivate_player(self, player_id):
         """Деактивирует персонажа"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE players SET is_active = FALSE 
-            WHERE id = ?
-        ''', (player_id,))
-        
-        conn.commit()
-        conn.close()
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute('''
+                UPDATE players SET is_active = FALSE 
+                WHERE id = ?
+            ''', (player_id,))
+            conn.commit()
+            
+            self._invalidate_players(
+                cursor, 'id = (SELECT user_id FROM players WHERE id = ?)', (player_id,)
+            )
+        finally:
+            conn.close()
 
     def get_user_by_telegram_id(self, telegram_id):
         """Получает пользователя по telegram_id"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM users WHERE telegram_id = ?
-        ''', (telegram_id,))
-        
-        user = cursor.fetchone()
-        conn.close()
-        return user
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute('''
+                SELECT * FROM users WHERE telegram_id = ?
+            ''', (telegram_id,))
+            return cursor.fetchone()
+        finally:
+            conn.close()
     
     # Новые методы для работы с инструментами и материалами
     def get_tools_by_category(self, category):
         """Получить инструменты по категории"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tools WHERE category = ? ORDER BY price", (category,))
-        tools = cursor.fetchall()
-        conn.close()
-        return tools
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute("SELECT * FROM tools WHERE category = ? ORDER BY price", (category,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
     
     def get_materials_by_category(self, category):
         """Получить материалы по категории"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM materials WHERE category = ? ORDER BY price", (category,))
-        materials = cursor.fetchall()
-        conn.close()
-        return materials
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute("SELECT * FROM materials WHERE category = ? ORDER BY price", (category,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
     
     def add_to_inventory(self, player_id, item_type, item_id):
         """Добавить предмет в инвентарь игрока"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Получаем прочность предмета
-        if item_type == 'tool':
-            cursor.execute("SELECT durability FROM tools WHERE id = ?", (item_id,))
-        else:
-            cursor.execute("SELECT durability FROM materials WHERE id = ?", (item_id,))
-        
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return False
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
             
-        durability = result[0]
-        
-        cursor.execute('''
-            INSERT INTO player_inventory (player_id, item_type, item_id, current_durability)
-            VALUES (?, ?, ?, ?)
-        ''', (player_id, item_type, item_id, durability))
-        
-        conn.commit()
-        conn.close()
-        return True
+            # Получаем прочность предмета
+            if item_type == 'tool':
+                cursor.execute("SELECT durability FROM tools WHERE id = ?", (item_id,))
+            else:
+                cursor.execute("SELECT durability FROM materials WHERE id = ?", (item_id,))
+            
+            result = cursor.fetchone()
+            if not result:
+                return False
+                
+            durability = result[0]
+            
+            cursor.execute('''
+                INSERT INTO player_inventory (player_id, item_type, item_id, current_durability)
+                VALUES (?, ?, ?, ?)
+            ''', (player_id, item_type, item_id, durability))
+            
+            conn.commit()
+            return True
+        finally:
+            conn.close()
     
     def get_player_inventory(self, player_id):
         """Получить инвентарь игрока"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT pi.*, 
-                   CASE 
-                       WHEN pi.item_type = 'tool' THEN t.name
-                       WHEN pi.item_type = 'material' THEN m.name
-                   END as item_name,
-                   CASE 
-                       WHEN pi.item_type = 'tool' THEN t.category
-                       WHEN pi.item_type = 'material' THEN m.category
-                   END as item_category
-            FROM player_inventory pi
-            LEFT JOIN tools t ON pi.item_type = 'tool' AND pi.item_id = t.id
-            LEFT JOIN materials m ON pi.item_type = 'material' AND pi.item_id = m.id
-            WHERE pi.player_id = ?
-        ''', (player_id,))
-        
-        inventory = cursor.fetchall()
-        conn.close()
-        return inventory
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute('''
+                SELECT pi.*, 
+                       CASE 
+                           WHEN pi.item_type = 'tool' THEN t.name
+                           WHEN pi.item_type = 'material' THEN m.name
+                       END as item_name,
+                       CASE 
+                           WHEN pi.item_type = 'tool' THEN t.category
+                           WHEN pi.item_type = 'material' THEN m.category
+                       END as item_category
+                FROM player_inventory pi
+                LEFT JOIN tools t ON pi.item_type = 'tool' AND pi.item_id = t.id
+                LEFT JOIN materials m ON pi.item_type = 'material' AND pi.item_id = m.id
+                WHERE pi.player_id = ?
+            ''', (player_id,))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+# Результаты покупки (PurchaseResult.status)
+PURCHASE_OK = "ok"
+PURCHASE_ITEM_NOT_FOUND = "item_not_found"
+PURCHASE_NO_PROGRESS = "no_progress"
+PURCHASE_INSUFFICIENT_FUNDS = "insufficient_funds"
+PURCHASE_ALREADY_OWNED = "already_owned"
+
+
+class PurchaseResult(NamedTuple):
+    """Результат buy_item_atomic"""
+    status: str
+    item_name: Optional[str] = None
+    price: int = 0
+    balance: Optional[int] = None  # Баланс после операции (или текущий, если покупка не прошла)
+
+    @property
+    def ok(self):
+        return self.status == PURCHASE_OK
+
+
+# Запись прогресса обучения: strict (по умолчанию) или buffered
+PROGRESS_DURABILITY = os.getenv("TUTORIAL_PROGRESS_DURABILITY", "strict")
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("TUTORIAL_PROGRESS_FLUSH_INTERVAL", "0.5"))
+
+
+def _merge_progress(old, new):
+    """Два обновления прогресса одного персонажа: шаг берем новый, маски выполненных шагов объединяем"""
+    return new[0], old[1] | new[1]
+
 
 class TutorialDatabase:
-    def __init__(self):
-        # УБИРАЕМ постоянное соединение, создаем при каждом вызове
-        self.db_path = 'game.db'
-        self.create_tables()
+    def __init__(self, db_path='game.db', progress_durability=None):
+        # Соединения берем из общего пула (тот же, что у Database)
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+        
+        # strict - каждый шаг пишется сразу; buffered - шаги копятся и пишутся пачкой
+        self.progress_durability = progress_durability or PROGRESS_DURABILITY
+        if self.progress_durability not in ("strict", "buffered"):
+            raise ValueError(f"Неизвестный режим записи прогресса: {self.progress_durability}")
+        self.progress_buffer = None
+        if self.progress_durability == "buffered":
+            self.progress_buffer = WriteBehindBuffer(
+                self._write_progress,
+                _merge_progress,
+                interval=PROGRESS_FLUSH_INTERVAL,
+                name="tutorial-progress",
+            )
+            # Страховка на случай выхода без штатной остановки
+            atexit.register(self.close)
+        
+        # Каталог магазина в памяти: перечитывается только при смене версии
+        self._catalog = None
+        self._catalog_lock = threading.Lock()
+        
+        # Миграции и справочники - один раз на процесс
+        prepare_database(db_path)
+        self._catalog_version = content_hash(SHOP_ITEMS_COLUMNS, SHOP_ITEMS)
     
     def get_connection(self):
-        """Создает новое соединение для каждого запроса"""
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+        """Берет соединение из общего пула (close() возвращает его обратно)"""
+        return PooledConnection(self.pool, self.pool.acquire())
     
-    def create_tables(self):
-        """Создает таблицы при инициализации"""
-        conn = self.get_connection()
-        try:
-            # Таблица прогресса обучения
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS tutorial_progress (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    player_id INTEGER NOT NULL,
-                    current_step TEXT DEFAULT 'start',
-                    has_started BOOLEAN DEFAULT FALSE,
-                    completed_steps TEXT DEFAULT '',
-                    player_balance INTEGER DEFAULT 2000,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (player_id) REFERENCES players (id)
-                )
-            ''')
-            
-            # Таблица инвентаря обучения
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS tutorial_inventory (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    player_id INTEGER NOT NULL,
-                    item_name TEXT,
-                    item_type TEXT,
-                    quantity INTEGER DEFAULT 1,
-                    FOREIGN KEY (player_id) REFERENCES players (id)
-                )
-            ''')
-            
-            # Таблица товаров магазина
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS shop_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    category TEXT,
-                    price INTEGER,
-                    available_in_tutorial BOOLEAN DEFAULT FALSE,
-                    image_path TEXT
-                )
-            ''')
-            
-            conn.commit()
-        finally:
-            conn.close()
+    def _discard_progress(self, player_id):
+        # Прогресс пересоздается/удаляется - старые шаги из буфера записывать нельзя
+        if self.progress_buffer is not None:
+            self.progress_buffer.discard(player_id)
     
     def init_tutorial_progress(self, player_id):
         """Инициализирует прогресс обучения для персонажа"""
+        self._discard_progress(player_id)
         conn = self.get_connection()
         try:
             # Удаляем старый прогресс если есть
@@ -415,41 +323,78 @@ class TutorialDatabase:
     
     def get_tutorial_progress(self, player_id):
         """Получает текущий прогресс обучения"""
+        # Чтение всегда видит последние шаги: сначала сбрасываем буфер этого персонажа
+        self.flush_progress(player_id)
         conn = self.get_connection()
         try:
             cursor = conn.execute(
-                'SELECT current_step, has_started, completed_steps, player_balance FROM tutorial_progress WHERE player_id = ?',
+                'SELECT current_step, has_started, completed_mask, player_balance FROM tutorial_progress WHERE player_id = ?',
                 (player_id,)
             )
-            return cursor.fetchone()
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        # Снаружи выполненные шаги по-прежнему строкой через запятую
+        current_step, has_started, completed_mask, player_balance = row
+        return current_step, has_started, ','.join(mask_to_steps(completed_mask)), player_balance
+    
+    def get_progress_steps(self):
+        """Все различные шаги, на которых сейчас стоят игроки"""
+        self.flush_progress()
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute('SELECT DISTINCT current_step FROM tutorial_progress')
+            return {row[0] for row in cursor.fetchall()}
         finally:
             conn.close()
     
     def update_tutorial_progress(self, player_id, current_step, completed_step=None):
-        """Обновляет прогресс обучения"""
+        """Обновляет прогресс обучения (в режиме buffered - через буфер отложенной записи)"""
+        completed_mask = step_bit(completed_step) if completed_step else 0
+        if self.progress_buffer is not None:
+            self.progress_buffer.put(player_id, (current_step, completed_mask))
+            return
+        self._write_progress([(player_id, (current_step, completed_mask))])
+    
+    def _write_progress(self, updates):
+        """Пишет пачку обновлений прогресса одной транзакцией: [(player_id, (шаг, маска_выполненных))]"""
         conn = self.get_connection()
         try:
-            if completed_step:
-                cursor = conn.execute(
-                    'SELECT completed_steps FROM tutorial_progress WHERE player_id = ?',
-                    (player_id,)
-                )
-                result = cursor.fetchone()
-                completed_steps = result[0] + ',' + completed_step if result and result[0] else completed_step
-                
-                conn.execute(
-                    'UPDATE tutorial_progress SET current_step = ?, completed_steps = ?, has_started = TRUE WHERE player_id = ?',
-                    (current_step, completed_steps, player_id)
-                )
-            else:
-                conn.execute(
-                    'UPDATE tutorial_progress SET current_step = ?, has_started = TRUE WHERE player_id = ?',
-                    (current_step, player_id)
-                )
+            # Маска дописывается через OR прямо в UPDATE - без чтения и без потери параллельных шагов
+            conn.executemany(
+                'UPDATE tutorial_progress SET current_step = ?, completed_mask = completed_mask | ?, has_started = TRUE WHERE player_id = ?',
+                [(current_step, completed_mask, player_id) for player_id, (current_step, completed_mask) in updates]
+            )
             conn.commit()
         finally:
             conn.close()
     
+    def has_completed_step(self, player_id, step):
+        """Проверяет, выполнен ли шаг обучения"""
+        self.flush_progress(player_id)
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute(
+                'SELECT completed_mask & ? FROM tutorial_progress WHERE player_id = ?',
+                (step_bit(step), player_id)
+            )
+            result = cursor.fetchone()
+            return bool(result and result[0])
+        finally:
+            conn.close()
+    
+    def flush_progress(self, player_id=None):
+        """Сбрасывает отложенные обновления прогресса (одного персонажа или всех)"""
+        if self.progress_buffer is not None:
+            self.progress_buffer.flush(player_id)
+    
+    def close(self):
+        """Останавливает отложенную запись и сохраняет все накопленное"""
+        if self.progress_buffer is not None:
+            self.progress_buffer.close()
+    
     def update_player_balance(self, player_id, new_balance):
         """Обновляет баланс игрока"""
         conn = self.get_connection()
@@ -466,20 +411,30 @@ class TutorialDatabase:
         """Добавляет предмет в инвентарь обучения"""
         conn = self.get_connection()
         try:
-            # Проверяем, нет ли уже такого предмета
+            # Дубликаты отсекает уникальный индекс (player_id, item_name)
             cursor = conn.execute(
-                'SELECT id FROM tutorial_inventory WHERE player_id = ? AND item_name = ?',
-                (player_id, item_name)
-            )
-            if cursor.fetchone():
-                return False  # Предмет уже есть
-            
-            conn.execute(
-                'INSERT INTO tutorial_inventory (player_id, item_name, item_type) VALUES (?, ?, ?)',
+                'INSERT OR IGNORE INTO tutorial_inventory (player_id, item_name, item_type) VALUES (?, ?, ?)',
                 (player_id, item_name, item_type)
             )
             conn.commit()
-            return True
+            return cursor.rowcount > 0  # 0 - предмет уже есть
+        finally:
+            conn.close()
+    
+    def remove_from_tutorial_inventory(self, player_id, item_names):
+        """Списывает предметы из инвентаря обучения"""
+        item_names = list(item_names)
+        if not item_names:
+            return 0
+        placeholders = ', '.join('?' * len(item_names))
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute(
+                f'DELETE FROM tutorial_inventory WHERE player_id = ? AND item_name IN ({placeholders})',
+                (player_id, *item_names)
+            )
+            conn.commit()
+            return cursor.rowcount
         finally:
             conn.close()
     
@@ -509,6 +464,7 @@ class TutorialDatabase:
     
     def clear_tutorial_data(self, player_id):
         """Очищает все данные обучения для персонажа"""
+        self._discard_progress(player_id)
         conn = self.get_connection()
         try:
             conn.execute('DELETE FROM tutorial_progress WHERE player_id = ?', (player_id,))
@@ -517,90 +473,91 @@ class TutorialDatabase:
         finally:
             conn.close()
     
-    def init_shop_items(self):
-        """Инициализирует товары магазина с новыми ценами"""
-        shop_items = [
-            # Ножи (дешевые, средние, дорогие)
-            ('Канцелярский нож', 'Ножи', 300, True, 'images/shop/knife_cheap.jpg'),
-            ('Нож SDI', 'Ножи', 900, False, 'images/shop/knife_mid.jpg'),
-            ('Шорный нож', 'Ножи', 3600, False, 'images/shop/knife_pro.jpg'),
-            
-            # Нитки
-            ('Швейные МосНитки', 'Нитки', 150, True, 'images/shop/threads_cheap.jpg'),
-            ('Синтетические нитки', 'Нитки', 450, False, 'images/shop/threads_mid.jpg'),
-            ('Льняные нитки', 'Нитки', 1800, False, 'images/shop/threads_pro.jpg'),
-            
-            # Пробойники
-            ('Строчные пробойники PFG', 'Пробойники', 200, False, 'images/shop/punch_line_PFG.jpg'),
-            ('Высечные пробойники', 'Пробойники', 280, True, 'images/shop/punch_set.jpg'),
-            ('Пробойники Wuta', 'Пробойники', 840, False, 'images/shop/punch_wuta.jpg'),
-            ('Пробойники Sinabroks', 'Пробойники', 3360, False, 'images/shop/punch_storybrook.jpg'),
-        
-            # Торцбилы
-            ('Мультитул 3 в 1', 'Торцбилы', 250, True, 'images/shop/edge_slicker.jpg'),
-            ('Торцбил Wuta', 'Торцбилы', 750, False, 'images/shop/edge_wuta.jpg'),
-            ('Профессиональный торцбил', 'Торцбилы', 3000, False, 'images/shop/edge_pro.jpg'),
-        
-            # Материалы (кожа)
-            ('Дешевая ременная заготовка', 'Материалы', 150, True, 'images/shop/leather_cheap.jpg'),
-            ('Обычная ременная заготовка', 'Материалы', 450, False, 'images/shop/leather_mid.jpg'),
-            ('Дорогая ременная заготовка', 'Материалы', 1800, False, 'images/shop/leather_expensive.jpg'),
-            ("Кожа для галантереи (дешевая)", 'Материалы', 200, False, "images/shop/leather_galanterey_cheap.jpg"),
-            ("Кожа для галантереи (средняя)", 'Материалы', 600, False, "images/shop/leather_galanterey_mid.jpg"), 
-            ("Кожа для галантереи (дорогая)", 'Материалы', 2400, False, "images/shop/leather_galanterey_pro.jpg"),
-            ("Кожа для сумок (дешевая)", 'Материалы', 400, False, "images/shop/leather_bags_cheap.jpg"),
-            ("Кожа для сумок (средняя)", 'Материалы', 1200, False, "images/shop/leather_bags_mid.jpg"),
-            ("Кожа для сумок (дорогая)", 'Материалы', 4800, False, "images/shop/leather_bags_pro.jpg"),
-            
-            # Фурнитура
-            ('Дешевая фурнитура для ремней', 'Фурнитура', 100, True, 'images/shop/hardware_belts.jpg'),
-            ('Нержавейка для ремней', 'Фурнитура', 300, False, 'images/shop/hardware_wallets.jpg'),
-            ('Латунная фурнитура для ремней', 'Фурнитура', 1200, False, 'images/shop/hardware_bags.jpg'),
-            ('Дешевая фурнитура для сумок', 'Фурнитура', 150, False, 'images/shop/hardware_bags_cheap.jpg'),
-            ('Средняя фурнитура для сумок', 'Фурнитура', 450, False, 'images/shop/hardware_bags_mid.jpg'),
-            ('Дорогая фурнитура для сумок', 'Фурнитура', 1800, False, 'images/shop/hardware_bags_pro.jpg'),
-        
-             # Химия
-            ('Пчелиный воск', 'Химия', 80, True, 'images/shop/wax.jpg'),
-            ('Масловосковые смеси', 'Химия', 240, False, 'images/shop/wax_mix.jpg'),
-            ('Профессиональная косметика', 'Химия', 960, False, 'images/shop/pro_cosmetics.jpg'),
-        ]
+    @property
+    def catalog(self):
+        """Текущий снимок каталога магазина (ShopCatalog)"""
+        catalog = self._catalog
+        if catalog is not None and catalog.version == self._catalog_version:
+            return catalog
         
+        with self._catalog_lock:
+            catalog = self._catalog
+            if catalog is None or catalog.version != self._catalog_version:
+                conn = self.get_connection()
+                try:
+                    catalog = load_catalog(conn, self._catalog_version)
+                finally:
+                    conn.close()
+                # Подмена ссылки атомарна: читатели видят либо старый, либо новый снимок
+                self._catalog = catalog
+                print(f"📦 Каталог магазина загружен: {len(catalog)} товаров (версия {str(catalog.version)[:8]})")
+            return catalog
+    
+    def get_shop_item_by_name(self, item_name):
+        """Получает товар по названию (ShopItem или None)"""
+        return self.catalog.find(item_name)
+    
+    def buy_item_atomic(self, player_id, item_id):
+        """Покупка товара одной транзакцией: проверка баланса и дубликата, списание, добавление в инвентарь"""
         conn = self.get_connection()
         try:
-            # Очищаем и заполняем заново
-            conn.execute('DELETE FROM shop_items')
-            for item in shop_items:
-                conn.execute(
-                    'INSERT INTO shop_items (name, category, price, available_in_tutorial, image_path) VALUES (?, ?, ?, ?, ?)',
-                    item
-                )
+            # Сразу берем блокировку на запись: двойное нажатие не спишет монеты дважды
+            conn.execute('BEGIN IMMEDIATE')
+            
+            item = conn.execute(
+                'SELECT name, category, price FROM shop_items WHERE id = ?',
+                (item_id,)
+            ).fetchone()
+            if not item:
+                conn.rollback()
+                return PurchaseResult(PURCHASE_ITEM_NOT_FOUND)
+            item_name, category, price = item
+            
+            progress = conn.execute(
+                'SELECT player_balance FROM tutorial_progress WHERE player_id = ?',
+                (player_id,)
+            ).fetchone()
+            if not progress:
+                conn.rollback()
+                return PurchaseResult(PURCHASE_NO_PROGRESS, item_name, price)
+            balance = progress[0]
+            
+            if balance < price:
+                conn.rollback()
+                return PurchaseResult(PURCHASE_INSUFFICIENT_FUNDS, item_name, price, balance)
+            
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO tutorial_inventory (player_id, item_name, item_type) VALUES (?, ?, ?)',
+                (player_id, item_name, category)
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return PurchaseResult(PURCHASE_ALREADY_OWNED, item_name, price, balance)
+            
+            conn.execute(
+                'UPDATE tutorial_progress SET player_balance = player_balance - ? WHERE player_id = ?',
+                (price, player_id)
+            )
             conn.commit()
+            return PurchaseResult(PURCHASE_OK, item_name, price, balance - price)
+        except Exception:
+            conn.rollback()
+            raise
         finally:
             conn.close()
     
     def get_shop_items_by_category(self, category=None, tutorial_only=False):
-        """Получает товары магазина"""
-        conn = self.get_connection()
-        try:
-            if category:
-                if tutorial_only:
-                    cursor = conn.execute(
-                        'SELECT name, price, available_in_tutorial, image_path FROM shop_items WHERE category = ? AND available_in_tutorial = TRUE ORDER BY price',
-                        (category,)
-                    )
-                else:
-                    cursor = conn.execute(
-                        'SELECT name, price, available_in_tutorial, image_path FROM shop_items WHERE category = ? ORDER BY price',
-                        (category,)
-                    )
-            else:
-                cursor = conn.execute(
-                    'SELECT name, category, price, available_in_tutorial, image_path FROM shop_items ORDER BY category, price'
-                )
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        """Получает товары магазина (из каталога в памяти)"""
+        catalog = self.catalog
+        if category:
+            return [
+                (item.name, item.price, item.available_in_tutorial, item.image_path)
+                for item in catalog.in_category(category, tutorial_only)
+            ]
+        return [
+            (item.name, item.category, item.price, item.available_in_tutorial, item.image_path)
+            for item in catalog
+        ]
 
 # Создаем экземпляр базы данных для обучения
 tutorial_db = TutorialDatabase()
\ No newline at end of file
@@ -0,0 +1,223 @@
+# database/pool.py
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Размер пула по умолчанию (можно переопределить через переменную окружения)
+DEFAULT_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+
+# Кэш подготовленных выражений на соединение.
+# Набор запросов у нас небольшой (~60 разных), берем с запасом.
+DEFAULT_CACHED_STATEMENTS = 128
+
+# Сколько ждем свободное соединение, прежде чем упасть
+DEFAULT_ACQUIRE_TIMEOUT = 10.0
+
+# PRAGMA, которые выполняются один раз при создании соединения
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+class PooledConnection:
+    """Обертка над соединением из пула: close() возвращает его в пул"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Соединение уже возвращено в пул")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """Пул долгоживущих соединений SQLite"""
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE,
+                 cached_statements=DEFAULT_CACHED_STATEMENTS,
+                 acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        if size < 1:
+            raise ValueError("Размер пула должен быть больше нуля")
+
+        self.db_path = db_path
+        self.size = size
+        self.cached_statements = cached_statements
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+
+        # Счетчики
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    def _create_connection(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.DatabaseError as e:
+                print(f"⚠️ Не удалось применить '{pragma}': {e}")
+        return conn
+
+    def acquire(self):
+        """Берет соединение из пула (или создает новое, если лимит не исчерпан)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Пул соединений закрыт")
+
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._hits += 1
+                self._in_use += 1
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+                self._misses += 1
+                self._in_use += 1
+
+        if can_create:
+            try:
+                return self._create_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+
+        # Все соединения заняты - ждем освобождения
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(
+                f"Нет свободных соединений с {self.db_path} за {self.acquire_timeout} c"
+            ) from None
+        waited = time.perf_counter() - started
+
+        with self._lock:
+            self._waits += 1
+            self._wait_time += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._in_use += 1
+        return conn
+
+    def release(self, conn):
+        """Возвращает соединение в пул"""
+        # Незавершенная транзакция не должна перейти к следующему владельцу
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+
+        with self._lock:
+            self._in_use -= 1
+            if self._closed:
+                self._created -= 1
+                conn.close()
+                return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: with pool.connection() as conn: ..."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Счетчики пула"""
+        with self._lock:
+            requests = self._hits + self._misses + self._waits
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "wait_time_total": self._wait_time,
+                "wait_time_avg": self._wait_time / self._waits if self._waits else 0.0,
+                "wait_time_max": self._max_wait,
+            }
+
+    def close(self):
+        """Закрывает все простаивающие соединения"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, size=None):
+    """Общий пул на файл базы (один на процесс)"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path, size=size or DEFAULT_POOL_SIZE)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    """Закрывает все пулы (при остановке бота)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,125 @@
+# database/schema.py
+import sqlite3
+
+# Индексы под горячие запросы: (имя, таблица, SQL).
+# Набор версионируется миграциями (database/migrations.py): новые индексы - новой миграцией.
+HOT_INDEXES = (
+    # Частичный индекс: ищем только активных персонажей пользователя
+    ("idx_players_user_active", "players",
+     "CREATE INDEX IF NOT EXISTS idx_players_user_active ON players (user_id) WHERE is_active = TRUE"),
+    ("idx_player_inventory_player", "player_inventory",
+     "CREATE INDEX IF NOT EXISTS idx_player_inventory_player ON player_inventory (player_id)"),
+    ("idx_tools_category_price", "tools",
+     "CREATE INDEX IF NOT EXISTS idx_tools_category_price ON tools (category, price)"),
+    ("idx_materials_category_price", "materials",
+     "CREATE INDEX IF NOT EXISTS idx_materials_category_price ON materials (category, price)"),
+    # У персонажа ровно одна запись прогресса обучения
+    ("ux_tutorial_progress_player", "tutorial_progress",
+     "CREATE UNIQUE INDEX IF NOT EXISTS ux_tutorial_progress_player ON tutorial_progress (player_id)"),
+    # Один и тот же предмет в инвентаре обучения не дублируется
+    ("ux_tutorial_inventory_player_item", "tutorial_inventory",
+     "CREATE UNIQUE INDEX IF NOT EXISTS ux_tutorial_inventory_player_item "
+     "ON tutorial_inventory (player_id, item_name)"),
+    ("idx_shop_items_category_price", "shop_items",
+     "CREATE INDEX IF NOT EXISTS idx_shop_items_category_price ON shop_items (category, price)"),
+)
+
+# Перед созданием UNIQUE-индексов убираем дубли, накопившиеся в старых базах
+DEDUPE_STATEMENTS = {
+    # Оставляем самую свежую запись прогресса
+    "tutorial_progress": '''
+        DELETE FROM tutorial_progress
+        WHERE id NOT IN (SELECT MAX(id) FROM tutorial_progress GROUP BY player_id)
+    ''',
+    # Оставляем первую купленную копию предмета
+    "tutorial_inventory": '''
+        DELETE FROM tutorial_inventory
+        WHERE id NOT IN (SELECT MIN(id) FROM tutorial_inventory GROUP BY player_id, item_name)
+    ''',
+}
+
+# Горячие запросы для самопроверки через EXPLAIN QUERY PLAN: имя -> (SQL, параметры)
+HOT_QUERIES = {
+    "get_active_player": ('''
+        SELECT p.* FROM players p
+        JOIN users u ON p.user_id = u.id
+        WHERE u.telegram_id = ? AND p.is_active = TRUE
+    ''', (0,)),
+    "deactivate_user_players": (
+        'UPDATE players SET is_active = FALSE WHERE user_id = ? AND is_active = TRUE', (0,)),
+    "get_user_by_telegram_id": ('SELECT * FROM users WHERE telegram_id = ?', (0,)),
+    "get_player_inventory": ('''
+        SELECT pi.*, t.name, m.name
+        FROM player_inventory pi
+        LEFT JOIN tools t ON pi.item_type = 'tool' AND pi.item_id = t.id
+        LEFT JOIN materials m ON pi.item_type = 'material' AND pi.item_id = m.id
+        WHERE pi.player_id = ?
+    ''', (0,)),
+    "get_tools_by_category": ('SELECT * FROM tools WHERE category = ? ORDER BY price', ('',)),
+    "get_materials_by_category": ('SELECT * FROM materials WHERE category = ? ORDER BY price', ('',)),
+    "get_tutorial_progress": (
+        'SELECT current_step, has_started, completed_mask, player_balance FROM tutorial_progress WHERE player_id = ?',
+        (0,)),
+    "update_tutorial_progress": (
+        'UPDATE tutorial_progress SET current_step = ?, completed_mask = completed_mask | ?, has_started = TRUE '
+        'WHERE player_id = ?', ('', 0, 0)),
+    "buy_item_balance": (
+        'UPDATE tutorial_progress SET player_balance = player_balance - ? WHERE player_id = ?', (0, 0)),
+    "remove_from_tutorial_inventory": (
+        'DELETE FROM tutorial_inventory WHERE player_id = ? AND item_name IN (?)', (0, '')),
+    "get_tutorial_inventory": (
+        'SELECT item_name, item_type, quantity FROM tutorial_inventory WHERE player_id = ?', (0,)),
+}
+
+
+class QueryPlanError(RuntimeError):
+    pass
+
+
+def get_meta(conn, key):
+    """Служебная метка; таблицу schema_meta создает миграция 8"""
+    row = conn.execute('SELECT value FROM schema_meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn, key, value):
+    conn.execute(
+        'INSERT INTO schema_meta (key, value) VALUES (?, ?) '
+        'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+        (key, str(value))
+    )
+
+
+def create_hot_indexes(conn):
+    """Убирает дубли и создает индексы из HOT_INDEXES (выполняется внутри миграции)"""
+    for table, statement in DEDUPE_STATEMENTS.items():
+        removed = conn.execute(statement).rowcount
+        if removed:
+            print(f"🧹 Удалено {removed} дублей из {table}")
+
+    for name, table, statement in HOT_INDEXES:
+        conn.execute(statement)
+
+
+def check_query_plans(conn):
+    """Проверяет, что ни один горячий запрос не сканирует таблицу целиком.
+
+    Бросает QueryPlanError со списком запросов, упавших в SCAN.
+    """
+    problems = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        try:
+            rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        except sqlite3.OperationalError as e:
+            problems.append(f"{name}: {e}")
+            continue
+        for row in rows:
+            detail = row[-1]
+            if detail.startswith("SCAN"):
+                problems.append(f"{name}: {detail}")
+
+    if problems:
+        raise QueryPlanError(
+            "Горячие запросы без индекса:\n" + "\n".join(f"• {p}" for p in problems)
+        )
+    print(f"✅ Планы запросов проверены ({len(HOT_QUERIES)} шт.)")
@@ -0,0 +1,149 @@
+# database/seed.py
+import hashlib
+import json
+
+from database.schema import get_meta, set_meta
+
+# Стартовые характеристики классов: (mastery, luck, marketing, reputation)
+PLAYER_CLASSES = {
+    "Работяга": (25, 15, 5, 5),
+    "Менеджер": (10, 15, 25, 10),
+    "Блоггер": (5, 25, 20, 20),
+}
+DEFAULT_CLASS_STATS = (10, 10, 10, 10)
+
+# Инструменты: (name, category, price, mastery_bonus, luck_bonus, durability)
+TOOLS_COLUMNS = ("name", "category", "price", "mastery_bonus", "luck_bonus", "durability")
+TOOLS = (
+    # Дешевые инструменты
+    ("Канцелярский нож", "Ножи", 300, -5, -5, 10),
+    ("Высечные пробойники", "Пробойники", 280, 0, 0, 10),
+    ("Мультитул 3 в 1", "Торцбилы", 250, -10, -20, 10),
+    ("Сликер", "Сликеры", 200, 0, 0, 10),
+    # Средние инструменты
+    ("Нож SDI", "Ножи", 900, 10, 5, 15),
+    ("Пробойники Wuta", "Пробойники", 840, 0, 0, 18),
+    ("Торцбил Wuta", "Торцбилы", 750, 0, -5, 20),
+    # Дорогие инструменты
+    ("Шорный нож", "Ножи", 3600, 20, 10, 25),
+    ("Пробойники Sinabroks", "Пробойники", 3360, 10, 10, 28),
+    ("Профессиональный торцбил", "Торцбилы", 3000, 15, 10, 30),
+)
+
+# Материалы: (name, category, price, stage1_bonus, stage4_bonus, durability)
+MATERIALS_COLUMNS = ("name", "category", "price", "stage1_bonus", "stage4_bonus", "durability")
+MATERIALS = (
+    # Дешевые материалы
+    ("Дешевая ременная лента", "Кожа для ремней", 150, -5, -5, 1),
+    ("Дешевая фурнитура", "Фурнитура для ремней", 100, -5, -5, 1),
+    ("Пчелиный воск", "Химия", 80, 0, -25, 50),
+    # Средние материалы
+    ("Обычная ременная лента", "Кожа для ремней", 450, 0, 0, 1),
+    ("Нержавейка", "Фурнитура для ремней", 300, 0, 0, 1),
+    ("Масловосковые смеси", "Химия", 240, 0, -10, 75),
+    # Дорогие материалы
+    ("Дорогая ременная лента", "Кожа для ремней", 1800, 8, 8, 1),
+    ("Латунная фурнитура", "Фурнитура для ремней", 1200, 8, 8, 1),
+    ("Профессиональная косметика", "Химия", 960, 0, 30, 100),
+)
+
+# Товары магазина: (name, category, price, available_in_tutorial, image_path)
+SHOP_ITEMS_COLUMNS = ("name", "category", "price", "available_in_tutorial", "image_path")
+SHOP_ITEMS = (
+    # Ножи (дешевые, средние, дорогие)
+    ('Канцелярский нож', 'Ножи', 300, True, 'images/shop/knife_cheap.jpg'),
+    ('Нож SDI', 'Ножи', 900, False, 'images/shop/knife_mid.jpg'),
+    ('Шорный нож', 'Ножи', 3600, False, 'images/shop/knife_pro.jpg'),
+
+    # Нитки
+    ('Швейные МосНитки', 'Нитки', 150, True, 'images/shop/threads_cheap.jpg'),
+    ('Синтетические нитки', 'Нитки', 450, False, 'images/shop/threads_mid.jpg'),
+    ('Льняные нитки', 'Нитки', 1800, False, 'images/shop/threads_pro.jpg'),
+
+    # Пробойники
+    ('Строчные пробойники PFG', 'Пробойники', 200, False, 'images/shop/punch_line_PFG.jpg'),
+    ('Высечные пробойники', 'Пробойники', 280, True, 'images/shop/punch_set.jpg'),
+    ('Пробойники Wuta', 'Пробойники', 840, False, 'images/shop/punch_wuta.jpg'),
+    ('Пробойники Sinabroks', 'Пробойники', 3360, False, 'images/shop/punch_storybrook.jpg'),
+
+    # Торцбилы
+    ('Мультитул 3 в 1', 'Торцбилы', 250, True, 'images/shop/edge_slicker.jpg'),
+    ('Торцбил Wuta', 'Торцбилы', 750, False, 'images/shop/edge_wuta.jpg'),
+    ('Профессиональный торцбил', 'Торцбилы', 3000, False, 'images/shop/edge_pro.jpg'),
+
+    # Материалы (кожа)
+    ('Дешевая ременная заготовка', 'Материалы', 150, True, 'images/shop/leather_cheap.jpg'),
+    ('Обычная ременная заготовка', 'Материалы', 450, False, 'images/shop/leather_mid.jpg'),
+    ('Дорогая ременная заготовка', 'Материалы', 1800, False, 'images/shop/leather_expensive.jpg'),
+    ("Кожа для галантереи (дешевая)", 'Материалы', 200, False, "images/shop/leather_galanterey_cheap.jpg"),
+    ("Кожа для галантереи (средняя)", 'Материалы', 600, False, "images/shop/leather_galanterey_mid.jpg"),
+    ("Кожа для галантереи (дорогая)", 'Материалы', 2400, False, "images/shop/leather_galanterey_pro.jpg"),
+    ("Кожа для сумок (дешевая)", 'Материалы', 400, False, "images/shop/leather_bags_cheap.jpg"),
+    ("Кожа для сумок (средняя)", 'Материалы', 1200, False, "images/shop/leather_bags_mid.jpg"),
+    ("Кожа для сумок (дорогая)", 'Материалы', 4800, False, "images/shop/leather_bags_pro.jpg"),
+
+    # Фурнитура
+    ('Дешевая фурнитура для ремней', 'Фурнитура', 100, True, 'images/shop/hardware_belts.jpg'),
+    ('Нержавейка для ремней', 'Фурнитура', 300, False, 'images/shop/hardware_wallets.jpg'),
+    ('Латунная фурнитура для ремней', 'Фурнитура', 1200, False, 'images/shop/hardware_bags.jpg'),
+    ('Дешевая фурнитура для сумок', 'Фурнитура', 150, False, 'images/shop/hardware_bags_cheap.jpg'),
+    ('Средняя фурнитура для сумок', 'Фурнитура', 450, False, 'images/shop/hardware_bags_mid.jpg'),
+    ('Дорогая фурнитура для сумок', 'Фурнитура', 1800, False, 'images/shop/hardware_bags_pro.jpg'),
+
+    # Химия
+    ('Пчелиный воск', 'Химия', 80, True, 'images/shop/wax.jpg'),
+    ('Масловосковые смеси', 'Химия', 240, False, 'images/shop/wax_mix.jpg'),
+    ('Профессиональная косметика', 'Химия', 960, False, 'images/shop/pro_cosmetics.jpg'),
+)
+
+# Шаблоны заказов (players.db): (name, description, difficulty, required_mastery, base_coins, base_exp, base_rep)
+ORDER_TEMPLATES_COLUMNS = (
+    "name", "description", "difficulty", "required_mastery", "base_coins", "base_exp", "base_rep"
+)
+ORDER_TEMPLATES = (
+    ("Простой ремень", "Изготовить простой кожаный ремень", "easy", 1, 10, 5, 0),
+    ("Кошелек", "Создать кожаный кошелек", "easy", 2, 15, 8, 1),
+    ("Чехол для телефона", "Изготовить чехол для телефона", "medium", 3, 30, 15, 1),
+    ("Портмоне", "Создать кожаное портмоне", "medium", 4, 45, 20, 2),
+    ("Сумка", "Изготовить кожаную сумку", "hard", 5, 70, 35, 3),
+)
+
+
+def content_hash(columns, rows):
+    """Хэш содержимого справочника - версия для сравнения с базой"""
+    payload = json.dumps([list(columns), [list(row) for row in rows]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def seed_table(conn, table, columns, rows):
+    """Заполняет справочную таблицу, только если ее содержимое изменилось.
+
+    Строки получают id по порядку (1..N), поэтому id не меняются между запусками
+    и ссылки на них (player_inventory, player_orders) остаются валидными.
+    Возвращает (версия, были_ли_изменения).
+    """
+    digest = content_hash(columns, rows)
+    meta_key = f"seed:{table}"
+    if get_meta(conn, meta_key) == digest:
+        return digest, False
+
+    column_list = ", ".join(("id",) + tuple(columns))
+    placeholders = ", ".join("?" * (len(columns) + 1))
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns)
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(
+            f'INSERT INTO {table} ({column_list}) VALUES ({placeholders}) '
+            f'ON CONFLICT(id) DO UPDATE SET {updates}',
+            [(item_id, *row) for item_id, row in enumerate(rows, start=1)]
+        )
+        conn.execute(f'DELETE FROM {table} WHERE id > ?', (len(rows),))
+        set_meta(conn, meta_key, digest)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    print(f"🌱 Справочник {table} обновлен: {len(rows)} записей")
+    return digest, True
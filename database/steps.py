@@ -0,0 +1,77 @@
+# database/steps.py
+
+# Реестр шагов обучения: позиция в кортеже = номер бита в tutorial_progress.completed_mask.
+# Только дописываем в конец! Перестановка или удаление сломает маски в базе.
+TUTORIAL_STEPS = (
+    "start",
+    "waiting_for_shop_enter",
+    "waiting_for_approach",
+    "waiting_for_oldman_approach",
+    "waiting_for_showcase",
+    "in_shop_menu",
+    "in_shop_category",
+    "waiting_for_exit",
+    "waiting_for_belt_start",
+    "waiting_for_belt_materials",
+    "waiting_for_belt_leather",
+    "waiting_for_belt_hardware",
+    "waiting_for_belt_tools",
+    "waiting_for_belt_assembly",
+    "waiting_for_belt_quality",
+    "waiting_for_belt_sleep",
+    "waiting_for_shop_return",
+    "waiting_for_shop_view",
+    "in_shop_after_tutorial",
+    "waiting_for_holder_start",
+    "waiting_for_holder_leather",
+    "waiting_for_holder_tools",
+    "waiting_for_holder_threads",
+    "waiting_for_holder_quality",
+    "waiting_for_holder_gift",
+    "waiting_for_holder_final",
+    "waiting_for_bag_start",
+    "in_shop_bag_materials",
+    "waiting_for_bag_materials_selection",
+    "waiting_for_bag_tools_selection",
+    "waiting_for_bag_wax_selection",
+    "waiting_for_bag_threads_selection",
+    "waiting_for_bag_quality_1",
+    "waiting_for_bag_retry",
+    "in_shop_bag_retry",
+    "waiting_for_bag_retry_start",
+    "waiting_for_bag_retry_materials",
+    "waiting_for_bag_retry_tools",
+    "waiting_for_bag_retry_wax",
+    "waiting_for_bag_retry_threads",
+    "waiting_for_bag_quality_2",
+    "waiting_for_final",
+)
+
+# SQLite INTEGER - 64 бита со знаком
+assert len(TUTORIAL_STEPS) <= 63, "Шаги обучения не помещаются в маску"
+
+STEP_BITS = {step: 1 << index for index, step in enumerate(TUTORIAL_STEPS)}
+
+
+def step_bit(step):
+    """Бит шага в маске (ValueError для незарегистрированного шага)"""
+    try:
+        return STEP_BITS[step]
+    except KeyError:
+        raise ValueError(f"Неизвестный шаг обучения: {step}") from None
+
+
+def steps_to_mask(steps):
+    mask = 0
+    for step in steps:
+        mask |= step_bit(step)
+    return mask
+
+
+def mask_to_steps(mask):
+    """Выполненные шаги в порядке обучения"""
+    return [step for step in TUTORIAL_STEPS if mask & STEP_BITS[step]]
+
+
+def is_step_completed(mask, step):
+    return bool(mask & step_bit(step))
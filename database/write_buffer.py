@@ -0,0 +1,108 @@
+# database/write_buffer.py
+import threading
+
+
+class WriteBehindBuffer:
+    """Буфер отложенной записи: склеивает обновления по ключу и пишет их пачкой.
+
+    flush_fn(items) получает список (ключ, значение) и должна записать их одной транзакцией.
+    merge_fn(старое, новое) объединяет два обновления одного ключа.
+    """
+
+    def __init__(self, flush_fn, merge_fn, interval=0.5, name="write-behind"):
+        self.flush_fn = flush_fn
+        self.merge_fn = merge_fn
+        self.interval = interval
+        self.name = name
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        # Не даем двум сбросам идти одновременно (порядок записей по ключу важен)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._puts = 0
+        self._coalesced = 0
+        self._flushes = 0
+        self._written = 0
+
+    def put(self, key, value):
+        with self._lock:
+            self._puts += 1
+            if key in self._pending:
+                self._pending[key] = self.merge_fn(self._pending[key], value)
+                self._coalesced += 1
+            else:
+                self._pending[key] = value
+        self._ensure_thread()
+
+    def discard(self, key):
+        """Выбрасывает несохраненное обновление (например, если прогресс сбрасывается)"""
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def flush(self, key=None):
+        """Записывает накопленное: все ключи или только один"""
+        with self._flush_lock:
+            with self._lock:
+                if key is None:
+                    items = list(self._pending.items())
+                    self._pending.clear()
+                elif key in self._pending:
+                    items = [(key, self._pending.pop(key))]
+                else:
+                    items = []
+            if not items:
+                return 0
+            try:
+                self.flush_fn(items)
+            except Exception:
+                # Возвращаем обновления в буфер, не затирая более свежие
+                with self._lock:
+                    for item_key, value in items:
+                        if item_key in self._pending:
+                            self._pending[item_key] = self.merge_fn(value, self._pending[item_key])
+                        else:
+                            self._pending[item_key] = value
+                raise
+            with self._lock:
+                self._flushes += 1
+                self._written += len(items)
+            return len(items)
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Ошибка отложенной записи ({self.name}): {e}")
+
+    def close(self):
+        """Останавливает фоновый поток и сбрасывает все накопленное"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "puts": self._puts,
+                "coalesced": self._coalesced,
+                "flushes": self._flushes,
+                "written": self._written,
+            }
@@ -0,0 +1,220 @@
+# routers/resume.py
+from typing import Callable, NamedTuple
+
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
+
+from routers.tutorial import (
+    TutorialStates,
+    get_approach_keyboard,
+    get_final_menu_keyboard,
+    get_make_belt_keyboard,
+    get_oldman_approach_keyboard,
+    get_shop_menu_keyboard,
+    get_showcase_keyboard,
+    get_tutorial_start_keyboard,
+)
+from utils.assets import resolve_asset
+from utils.keyboards import inline_keyboard
+from utils.media import answer_photo
+
+
+class ResumeStep(NamedTuple):
+    """Как вернуть игрока на шаг обучения после перерыва"""
+    state: State
+    image: str
+    caption: str                                      # шаблон: {name}, {balance}
+    keyboard: Callable[[int], InlineKeyboardMarkup]   # баланс -> клавиатура
+
+
+def _fixed(keyboard):
+    """Клавиатура, не зависящая от баланса"""
+    return lambda balance: keyboard
+
+
+def _button(text, callback_data):
+    return _fixed(inline_keyboard((text, callback_data)))
+
+
+_BELT_PREPARE = _button("🔧 Подготовка материалов", "belt_prepare_materials")
+_BELT_TOOLS = _button("🛠️ Выбрать инструменты", "belt_select_tools")
+_SHOP_AFTER = _button("🛒 Посмотреть витрину", "view_shop_after_tutorial")
+_HOLDER_START = _button("✂️ Приступить к картхолдеру", "start_holder")
+_BAG_SHOP = _button("🛒 В магазин за материалами", "bag_go_to_shop")
+_BAG_HOME = _button("🏠 Вернуться к сумке", "bag_go_home")
+_BAG_RETRY_SHOP = _button("🛒 В магазин", "bag_retry_shop")
+_BAG_RETRY_START = _button("🔄 Начать сумку заново", "bag_retry_start")
+
+_TUTORIAL_IMAGE = "images/tutorial/return.jpg"
+_BELT_CAPTION = "👋 С возвращением, {name}!\n\nПродолжим изготовление ремня."
+_HOLDER_CAPTION = "👋 С возвращением, {name}!\n\nПродолжим работу над картхолдером."
+_BAG_CAPTION = "👋 С возвращением, {name}!\n\nПродолжим работу над сумкой."
+
+_states = TutorialStates
+
+# Шаг обучения (tutorial_progress.current_step) -> как его восстановить.
+# Выборы (кожа, инструменты, нитки) восстанавливаются с начала выбора текущего изделия.
+RESUME_STEPS = {
+    "waiting_for_shop_enter": ResumeStep(
+        _states.waiting_for_shop_enter, _TUTORIAL_IMAGE,
+        "👋 С возвращением, {name}!\n\nПродолжим с того места, где ты остановился.",
+        _fixed(get_tutorial_start_keyboard())),
+    "waiting_for_approach": ResumeStep(
+        _states.waiting_for_approach, "images/tutorial/shop_entrance.jpg",
+        "👋 С возвращением в магазин, {name}!\n\nТы остановился когда рассматривал инструменты.",
+        _fixed(get_approach_keyboard())),
+    "waiting_for_oldman_approach": ResumeStep(
+        _states.waiting_for_oldman_approach, "images/tutorial/oldman_talking.jpg",
+        "👋 С возвращением, {name}!\n\nТы как раз подошел послушать Гену.",
+        _fixed(get_oldman_approach_keyboard())),
+    "waiting_for_showcase": ResumeStep(
+        _states.waiting_for_showcase, "images/tutorial/shop_showcase.jpg",
+        "👋 С возвращением, {name}!\n\nГена как раз предлагал посмотреть на витрину.",
+        _fixed(get_showcase_keyboard())),
+    "in_shop_menu": ResumeStep(
+        _states.in_shop_menu, "images/tutorial/tools_showcase.jpg",
+        "👋 С возвращением в магазин, {name}!\n\n💰 Ваш баланс: {balance} монет\nПродолжи покупки:",
+        get_shop_menu_keyboard),
+    "waiting_for_exit": ResumeStep(
+        _states.waiting_for_exit, _TUTORIAL_IMAGE,
+        "👋 С возвращением, {name}!\nВы только что вышли из магазина.",
+        _fixed(get_make_belt_keyboard())),
+
+    # Ремень
+    "waiting_for_belt_start": ResumeStep(
+        _states.waiting_for_belt_start, _TUTORIAL_IMAGE, _BELT_CAPTION, _BELT_PREPARE),
+    "waiting_for_belt_materials": ResumeStep(
+        _states.waiting_for_belt_leather, _TUTORIAL_IMAGE, _BELT_CAPTION, _BELT_PREPARE),
+    "waiting_for_belt_hardware": ResumeStep(
+        _states.waiting_for_belt_tools, _TUTORIAL_IMAGE, _BELT_CAPTION, _BELT_TOOLS),
+    "waiting_for_belt_tools": ResumeStep(
+        _states.waiting_for_belt_tools, _TUTORIAL_IMAGE, _BELT_CAPTION, _BELT_TOOLS),
+    "waiting_for_belt_assembly": ResumeStep(
+        _states.waiting_for_belt_assembly, _TUTORIAL_IMAGE, _BELT_CAPTION,
+        _button("🔩 Установить пряжку", "belt_install_buckle")),
+    "waiting_for_belt_quality": ResumeStep(
+        _states.waiting_for_belt_quality, _TUTORIAL_IMAGE, _BELT_CAPTION,
+        _button("🔍 Оценить результат", "belt_evaluate_quality")),
+    "waiting_for_belt_sleep": ResumeStep(
+        _states.waiting_for_belt_sleep, _TUTORIAL_IMAGE,
+        "👋 С возвращением, {name}!\n\nРемень готов, пора отдохнуть.",
+        _button("😴 Отправиться спать", "belt_go_to_sleep")),
+
+    # Возвращение в магазин
+    "waiting_for_shop_return": ResumeStep(
+        _states.waiting_for_shop_return, _TUTORIAL_IMAGE,
+        "👋 С возвращением, {name}!\n\nНовый день - самое время заглянуть в магазин.",
+        _button("🛒 В магазин", "return_to_shop")),
+    "waiting_for_shop_view": ResumeStep(
+        _states.waiting_for_shop_view, _TUTORIAL_IMAGE,
+        "👋 С возвращением в магазин, {name}!\n\n💰 Ваш баланс: {balance} монет",
+        _SHOP_AFTER),
+    "in_shop_after_tutorial": ResumeStep(
+        _states.in_shop_after_tutorial, _TUTORIAL_IMAGE,
+        "👋 С возвращением в магазин, {name}!\n\n💰 Ваш баланс: {balance} монет\nПродолжи покупки:",
+        _SHOP_AFTER),
+
+    # Картхолдер
+    "waiting_for_holder_start": ResumeStep(
+        _states.waiting_for_holder_start, _TUTORIAL_IMAGE, _HOLDER_CAPTION, _HOLDER_START),
+    "waiting_for_holder_leather": ResumeStep(
+        _states.waiting_for_holder_leather, _TUTORIAL_IMAGE, _HOLDER_CAPTION, _HOLDER_START),
+    "waiting_for_holder_tools": ResumeStep(
+        _states.waiting_for_holder_leather, _TUTORIAL_IMAGE, _HOLDER_CAPTION, _HOLDER_START),
+    "waiting_for_holder_threads": ResumeStep(
+        _states.waiting_for_holder_leather, _TUTORIAL_IMAGE, _HOLDER_CAPTION, _HOLDER_START),
+    "waiting_for_holder_quality": ResumeStep(
+        _states.waiting_for_holder_quality, _TUTORIAL_IMAGE, _HOLDER_CAPTION,
+        _button("🔍 Оценить результат", "holder_evaluate_quality")),
+    "waiting_for_holder_gift": ResumeStep(
+        _states.waiting_for_holder_gift, _TUTORIAL_IMAGE,
+        "👋 С возвращением, {name}!\n\nКартхолдер готов - осталось его подарить.",
+        _button("🎁 Подарить холдер", "holder_gift")),
+    "waiting_for_holder_final": ResumeStep(
+        _states.waiting_for_holder_final, _TUTORIAL_IMAGE,
+        "👋 С возвращением, {name}!\n\nВпереди новое изделие - сумка.",
+        _button("🛒 В магазин", "holder_to_shop")),
+
+    # Сумка
+    "waiting_for_bag_start": ResumeStep(
+        _states.waiting_for_bag_start, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_SHOP),
+    "in_shop_bag_materials": ResumeStep(
+        _states.in_shop_bag_materials, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_SHOP),
+    "waiting_for_bag_materials_selection": ResumeStep(
+        _states.waiting_for_bag_materials_selection, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_HOME),
+    "waiting_for_bag_tools_selection": ResumeStep(
+        _states.waiting_for_bag_materials_selection, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_HOME),
+    "waiting_for_bag_wax_selection": ResumeStep(
+        _states.waiting_for_bag_materials_selection, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_HOME),
+    "waiting_for_bag_threads_selection": ResumeStep(
+        _states.waiting_for_bag_materials_selection, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_HOME),
+    "waiting_for_bag_quality_1": ResumeStep(
+        _states.waiting_for_bag_quality_1, _TUTORIAL_IMAGE, _BAG_CAPTION,
+        _button("🔍 Оценить результат", "bag_evaluate_quality_1")),
+
+    # Вторая попытка сумки
+    "waiting_for_bag_retry": ResumeStep(
+        _states.waiting_for_bag_retry, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_RETRY_SHOP),
+    "in_shop_bag_retry": ResumeStep(
+        _states.in_shop_bag_retry, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_RETRY_SHOP),
+    "waiting_for_bag_retry_start": ResumeStep(
+        _states.waiting_for_bag_retry_start, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_RETRY_START),
+    "waiting_for_bag_retry_materials": ResumeStep(
+        _states.waiting_for_bag_retry_start, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_RETRY_START),
+    "waiting_for_bag_retry_tools": ResumeStep(
+        _states.waiting_for_bag_retry_start, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_RETRY_START),
+    "waiting_for_bag_retry_wax": ResumeStep(
+        _states.waiting_for_bag_retry_start, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_RETRY_START),
+    "waiting_for_bag_retry_threads": ResumeStep(
+        _states.waiting_for_bag_retry_start, _TUTORIAL_IMAGE, _BAG_CAPTION, _BAG_RETRY_START),
+    "waiting_for_bag_quality_2": ResumeStep(
+        _states.waiting_for_bag_quality_2, _TUTORIAL_IMAGE, _BAG_CAPTION,
+        _button("🔍 Оценить результат", "bag_evaluate_quality_2")),
+
+    "waiting_for_final": ResumeStep(
+        _states.waiting_for_final, "images/tutorial/final_menu.jpg",
+        "👋 С возвращением, {name}!\n\nОбучение пройдено - твоя мастерская ждет заказов.",
+        _fixed(get_final_menu_keyboard())),
+}
+
+# Шаги, которые пишутся в базу под другими именами
+RESUME_STEPS["start"] = RESUME_STEPS["waiting_for_shop_enter"]
+RESUME_STEPS["in_shop_category"] = RESUME_STEPS["in_shop_menu"]
+RESUME_STEPS["waiting_for_belt_leather"] = RESUME_STEPS["waiting_for_belt_materials"]
+
+# Каждое состояние обучения обязано восстанавливаться - проверяем при импорте
+_missing = [
+    state.state.split(":", 1)[1] for state in TutorialStates.__all_states__
+    if state.state.split(":", 1)[1] not in RESUME_STEPS
+]
+assert not _missing, f"Нет шага восстановления для состояний: {_missing}"
+
+
+def check_resume_steps(steps):
+    """Проверка при старте: для всех шагов из tutorial_progress есть восстановление"""
+    unknown = sorted(step for step in steps if step not in RESUME_STEPS)
+    if unknown:
+        print(f"❌ Шаги обучения без восстановления: {', '.join(unknown)}")
+    else:
+        print(f"✅ Все сохраненные шаги обучения восстанавливаются ({len(steps)} шт.)")
+    return unknown
+
+
+async def resume_tutorial(callback: CallbackQuery, state, player_name, current_step, player_balance):
+    """Возвращает игрока на шаг обучения. False - если шаг неизвестен"""
+    step = RESUME_STEPS.get(current_step)
+    if step is None:
+        return False
+
+    await state.set_state(step.state)
+
+    caption = step.caption.format(name=player_name, balance=player_balance)
+    keyboard = step.keyboard(player_balance)
+    image_path = step.image
+    image_path = resolve_asset(image_path)
+
+    try:
+        await answer_photo(callback.message, photo=image_path, caption=caption, reply_markup=keyboard)
+    except Exception:
+        await callback.message.answer(caption, reply_markup=keyboard)
+    return True
@@ -1,32 +1,44 @@
 # routers/start.py
-from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from database.models import Database
-from routers.tutorial import get_showcase_keyboard
+from database.async_db import AsyncDatabase
 from routers.tutorial import (
     get_tutorial_start_keyboard, 
-    get_approach_keyboard,
-    get_oldman_approach_keyboard, 
-    get_shop_menu_keyboard,
     TutorialStates, 
     tutorial_db
 )
-import os
-import asyncio 
+from routers.resume import resume_tutorial
+from utils.callback_dispatch import IndexedRouter
+from utils.assets import resolve_asset
+from utils.media import answer_photo
+from utils.followups import followups
+from utils.keyboards import inline_keyboard
+
+start_router = IndexedRouter()
+db = AsyncDatabase(Database())
+
+# Глобальная задержка для текстовых сообщений без кнопок (в секундах).
+# Сообщение ставится в followups - обработчик не ждет, пока оно уйдет
+MESSAGE_DELAY = 0.5
 
-start_router = Router()
-db = Database()
 
-# Глобальная задержка для всех сообщений (в секундах)
-MESSAGE_DELAY = 0.5
+async def answer_with_keyboard(message: Message, text, photo=None, reply_markup=None):
+    """Сообщение с клавиатурой отправляем сразу, а не через followups.
 
-async def delayed_send(bot, chat_id, method, *args, **kwargs):
-    """Универсальная функция для отправки сообщений с задержкой"""
-    await asyncio.sleep(MESSAGE_DELAY)
-    return await getattr(bot, method)(chat_id, *args, **kwargs)
+    Кнопки прошлого сообщения обработчик уже убрал: если отложенное сообщение
+    не уйдет, игроку будет не на что нажать. Здесь ошибка видна сразу,
+    а без картинки отправляем хотя бы текст.
+    """
+    if photo:
+        try:
+            await answer_photo(message, photo=photo, caption=text, reply_markup=reply_markup)
+            return
+        except Exception as e:
+            print(f"⚠️ Не удалось отправить картинку ({e}), отправляем текст")
+    await message.answer(text, reply_markup=reply_markup)
 
 # Состояния для регистрации
 class RegistrationStates(StatesGroup):
@@ -43,95 +55,83 @@ class PlayerManagementStates(StatesGroup):
 
 # Клавиатура для нового пользователя
 def get_registration_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎭 Зарегистрироваться и создать персонажа", callback_data="start_registration")]
-    ])
+    keyboard = inline_keyboard(("🎭 Зарегистрироваться и создать персонажа", "start_registration"))
     return keyboard
 
 # Клавиатура для пользователя с существующими персонажами
 def get_existing_players_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="▶️ Продолжить играть", callback_data="continue_playing")],
-        [InlineKeyboardButton(text="➕ Создать нового", callback_data="create_new_character")],
-        [InlineKeyboardButton(text="👤 Посмотреть профиль персонажа", callback_data="view_profile")]
-    ])
+    keyboard = inline_keyboard(
+        ("▶️ Продолжить играть", "continue_playing"),
+        ("➕ Создать нового", "create_new_character"),
+        ("👤 Посмотреть профиль персонажа", "view_profile")
+    )
     return keyboard
 
 # Клавиатура для выбора пола 
 def get_gender_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="👨 Мужской", callback_data="gender_male")],
-        [InlineKeyboardButton(text="👩 Женский", callback_data="gender_female")]
-    ])
+    keyboard = inline_keyboard(
+        ("👨 Мужской", "gender_male"),
+        ("👩 Женский", "gender_female")
+    )
     return keyboard
 
 # Клавиатура для выбора класса
 def get_classes_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛠️ Работяга", callback_data="class_worker")],
-        [InlineKeyboardButton(text="💼 Менеджер", callback_data="class_manager")],
-        [InlineKeyboardButton(text="📱 Блоггер", callback_data="class_blogger")]
-    ])
+    keyboard = inline_keyboard(
+        ("🛠️ Работяга", "class_worker"),
+        ("💼 Менеджер", "class_manager"),
+        ("📱 Блоггер", "class_blogger")
+    )
     return keyboard
 
 # Клавиатура для подтверждения выбора класса
 def get_class_confirmation_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Выбрать этот класс", callback_data="confirm_class")],
-        [InlineKeyboardButton(text="↩️ Назад к выбору", callback_data="back_to_classes")]
-    ])
+    keyboard = inline_keyboard(
+        ("✅ Выбрать этот класс", "confirm_class"),
+        ("↩️ Назад к выбору", "back_to_classes")
+    )
     return keyboard
 
 # Клавиатура для финального подтверждения
 def get_final_confirmation_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Да, подтверждаю выбор", callback_data="final_confirm")],
-        [InlineKeyboardButton(text="↩️ Вернуться к классам", callback_data="back_to_class_info")]
-    ])
+    keyboard = inline_keyboard(
+        ("✅ Да, подтверждаю выбор", "final_confirm"),
+        ("↩️ Вернуться к классам", "back_to_class_info")
+    )
     return keyboard
 
 # Клавиатура для подтверждения удаления
 def get_deletion_confirmation_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🗑️ Да, удалить персонажа", callback_data="confirm_deletion")],
-        [InlineKeyboardButton(text="↩️ Нет, оставить", callback_data="cancel_deletion")]
-    ])
+    keyboard = inline_keyboard(
+        ("🗑️ Да, удалить персонажа", "confirm_deletion"),
+        ("↩️ Нет, оставить", "cancel_deletion")
+    )
     return keyboard
 
 # Клавиатура для ФИНАЛЬНОГО подтверждения удаления
 def get_final_deletion_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Да, удалить навсегда", callback_data="final_confirm_deletion")],
-        [InlineKeyboardButton(text="↩️ Нет, я передумал", callback_data="cancel_final_deletion")]
-    ])
+    keyboard = inline_keyboard(
+        ("✅ Да, удалить навсегда", "final_confirm_deletion"),
+        ("↩️ Нет, я передумал", "cancel_final_deletion")
+    )
     return keyboard
 
 # Клавиатура для профиля персонажа
 def get_profile_management_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="▶️ Продолжить играть", callback_data="continue_playing")],
-        [InlineKeyboardButton(text="🗑️ Удалить персонажа", callback_data="delete_character")]
-    ])
+    keyboard = inline_keyboard(
+        ("▶️ Продолжить играть", "continue_playing"),
+        ("🗑️ Удалить персонажа", "delete_character")
+    )
     return keyboard
 
 # Клавиатура основного меню игры
 def get_main_menu_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛠️ Работа", callback_data="work_menu")],
-        [InlineKeyboardButton(text="📋 Заказы", callback_data="orders_menu")],
-        [InlineKeyboardButton(text="👤 Профиль", callback_data="view_profile")],
-        [InlineKeyboardButton(text="⚙️ Настройки", callback_data="settings")]
-    ])
+    keyboard = inline_keyboard(
+        ("🛠️ Работа", "work_menu"),
+        ("📋 Заказы", "orders_menu"),
+        ("👤 Профиль", "view_profile"),
+        ("⚙️ Настройки", "settings")
+    )
     return keyboard
 
 @start_router.message(Command("start"))
@@ -141,30 +141,30 @@ async def start_command(message: Message):
     first_name = message.from_user.first_name
     
     # Добавляем/получаем пользователя в БД
-    db.add_user(user_id, username, first_name, message.from_user.last_name)
+    await db.add_user(user_id, username, first_name, message.from_user.last_name)
     
     # Проверяем есть ли у пользователя активные персонажи
-    active_players = db.get_user_players(user_id)
+    active_players = await db.get_user_players(user_id)
     
     # Пытаемся отправить картинку
     image_path = "images/welcome.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
         if active_players:
             # Уже есть персонажи - предлагаем выбор
-            await message.answer_photo(
-                photo=photo,
+            await answer_photo(
+                message,
+                photo=image_path,
                 caption=f"👋 С возвращением, {first_name}!\n\n"
                        "У тебя уже есть созданные персонажи. Что хочешь сделать?",
                 reply_markup=get_existing_players_keyboard()
             )
         else:
             # Новый пользователь - предлагаем регистрацию
-            await message.answer_photo(
-                photo=photo,
+            await answer_photo(
+                message,
+                photo=image_path,
                 caption="👋 Добро пожаловать в 'Путь кожевника'!\n\n"
                        "Здесь ты сможешь освоить ремесло кожевника, "
                        "создавать уникальные изделия и строить свою мастерскую!\n\n"
@@ -187,33 +187,23 @@ async def start_command(message: Message):
             )
 
 # Обработка кнопки "Зарегистрироваться"
-@start_router.callback_query(F.data == "start_registration")
+@start_router.on_callback("start_registration")
 async def start_registration(callback: CallbackQuery, state: FSMContext):
     # Удаляем кнопки из предыдущего сообщения
     await callback.message.edit_reply_markup(reply_markup=None)
     
-    # Задержка перед следующим сообщением
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Пытаемся отправить картинку
     image_path = "images/create_character.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption="🎭 Давай создадим твоего персонажа!\n\n"
-                   "Как зовут твоего будущего кожевника?\n"
-                   "(Выбери уникальное имя от 2 до 20 символов)",
-        )
-    except Exception as e:
-        await callback.message.answer(
-            "🎭 Давай создадим твоего персонажа!\n\n"
-            "Как зовут твоего будущего кожевника?\n"
-            "(Выбери уникальное имя от 2 до 20 символов)",
-        )
+    image_path = resolve_asset(image_path)
+    
+    await followups.schedule(
+        callback.message.chat.id,
+        "🎭 Давай создадим твоего персонажа!\n\n"
+        "Как зовут твоего будущего кожевника?\n"
+        "(Выбери уникальное имя от 2 до 20 символов)",
+        photo=image_path,
+        delay=MESSAGE_DELAY
+    )
     
     await state.set_state(RegistrationStates.waiting_for_name)
     await callback.answer()
@@ -225,22 +215,16 @@ async def process_name(message: Message, state: FSMContext):
     
     # Проверяем длину имени
     if len(name) < 2 or len(name) > 20:
-        # Задержка перед сообщением об ошибке
-        await asyncio.sleep(MESSAGE_DELAY)
-        
         # Отправляем сообщение с картинкой об ошибке
         image_path = "images/error.jpg"
-        if not os.path.exists(image_path):
-            image_path = "images/placeholder.jpg"
+        image_path = resolve_asset(image_path)
         
-        try:
-            photo = FSInputFile(image_path)
-            await message.answer_photo(
-                photo=photo,
-                caption="❌ Имя должно быть от 2 до 20 символов. Попробуй еще раз:"
-            )
-        except:
-            await message.answer("❌ Имя должно быть от 2 до 20 символов. Попробуй еще раз:")
+        await followups.schedule(
+            message.chat.id,
+            "❌ Имя должно быть от 2 до 20 символов. Попробуй еще раз:",
+            photo=image_path,
+            delay=MESSAGE_DELAY
+        )
         return
     
     # ВРЕМЕННО УБИРАЕМ ПРОВЕРКУ УНИКАЛЬНОСТИ ИМЕНИ
@@ -249,31 +233,21 @@ async def process_name(message: Message, state: FSMContext):
     # Сохраняем имя в состоянии
     await state.update_data(character_name=name)
     
-    # Задержка перед выбором пола
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Пытаемся отправить картинку выбора пола ← ИЗМЕНЕНО: было выбор класса, стало выбор пола
     image_path = "images/gender_selection.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
-    try:
-        photo = FSInputFile(image_path)
-        await message.answer_photo(
-            photo=photo,
-            caption="🎯 Отлично! Теперь выбери пол персонажа:",
-            reply_markup=get_gender_keyboard()
-        )
-    except Exception as e:
-        await message.answer(
-            "🎯 Отлично! Теперь выбери пол персонажа:",
-            reply_markup=get_gender_keyboard()
-        )
+    await answer_with_keyboard(
+        message,
+        "🎯 Отлично! Теперь выбери пол персонажа:",
+        photo=image_path,
+        reply_markup=get_gender_keyboard()
+    )
     
     await state.set_state(RegistrationStates.waiting_for_gender)  # ← ИЗМЕНЕНО: было choosing_class
 
 # Обработка выбора пола
-@start_router.callback_query(F.data.startswith("gender_"), RegistrationStates.waiting_for_gender)
+@start_router.on_callback_prefix("gender_", state=RegistrationStates.waiting_for_gender)
 async def process_gender(callback: CallbackQuery, state: FSMContext):
     gender = callback.data.split("_")[1]  # "male" или "female"
     
@@ -285,44 +259,31 @@ async def process_gender(callback: CallbackQuery, state: FSMContext):
     except:
         pass  # Игнорируем если не удалось удалить
     
-    # Задержка перед выбором класса
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Переходим к выбору класса с картинкой
     image_path = "images/classes.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption="🎯 Отлично! Теперь выбери класс персонажа:\n\n"
-                   "🛠️ **Работяга** - мастер на все руки\n"
-                   "💼 **Менеджер** - специалист по продажам\n"
-                   "📱 **Блоггер** - разорившийся инфлюенсер с фанатами",
-            reply_markup=get_classes_keyboard()
-        )
-    except Exception as e:
-        await callback.message.answer(
-            "🎯 Отлично! Теперь выбери класс персонажа:\n\n"
-            "🛠️ **Работяга** - мастер на все руки\n"
-            "💼 **Менеджер** - специалист по продажам\n"
-            "📱 **Блоггер** - разорившийся инфлюенсер с фанатами",
-            reply_markup=get_classes_keyboard()
-        )
+    image_path = resolve_asset(image_path)
+    
+    await answer_with_keyboard(
+        callback.message,
+        "🎯 Отлично! Теперь выбери класс персонажа:\n\n"
+        "🛠️ **Работяга** - мастер на все руки\n"
+        "💼 **Менеджер** - специалист по продажам\n"
+        "📱 **Блоггер** - разорившийся инфлюенсер с фанатами",
+        photo=image_path,
+        reply_markup=get_classes_keyboard()
+    )
     
     await state.set_state(RegistrationStates.choosing_class)
     await callback.answer()
 
 # Обработка кнопки "Начать играть" - ПЕРЕМЕЩЕН ИЗ TUTORIAL.PY
-@start_router.callback_query(F.data == "start_tutorial")
+@start_router.on_callback("start_tutorial")
 async def start_tutorial_handler(callback: CallbackQuery, state: FSMContext):
     """Запускает обучение для нового игрока"""
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -332,8 +293,7 @@ async def start_tutorial_handler(callback: CallbackQuery, state: FSMContext):
     player_class = active_player[3]  # класс персонажа
     
     # Инициализируем прогресс обучения для этого персонажа
-    tutorial_db.init_tutorial_progress(player_id)
-    tutorial_db.init_shop_items()
+    await tutorial_db.init_tutorial_progress(player_id)
     
     # Определяем предысторию по классу
     if player_class == "Работяга":
@@ -357,13 +317,12 @@ async def start_tutorial_handler(callback: CallbackQuery, state: FSMContext):
     
     # Пытаемся отправить картинку предыстории
     image_path = f"images/tutorial/{image_name}"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=backstory,
             reply_markup=get_tutorial_start_keyboard()
         )
@@ -378,7 +337,7 @@ async def start_tutorial_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка выбора класса
-@start_router.callback_query(F.data.startswith("class_"))
+@start_router.on_callback_prefix("class_")
 async def choose_class(callback: CallbackQuery, state: FSMContext):
     class_type = callback.data.replace("class_", "")
     
@@ -425,32 +384,22 @@ async def choose_class(callback: CallbackQuery, state: FSMContext):
     except:
         pass  # Игнорируем ошибку если не можем изменить сообщение
     
-    # Задержка перед показом информации о классе
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Пытаемся отправить картинку класса
     image_path = f"images/{image_name}"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=description,
-            reply_markup=get_class_confirmation_keyboard()
-        )
-    except Exception as e:
-        await callback.message.answer(
-            description,
-            reply_markup=get_class_confirmation_keyboard()
-        )
+    await answer_with_keyboard(
+        callback.message,
+        description,
+        photo=image_path,
+        reply_markup=get_class_confirmation_keyboard()
+    )
     
     await state.set_state(RegistrationStates.confirming_class)
     await callback.answer()
 
 # Обработка кнопки "Назад к выбору классов"
-@start_router.callback_query(F.data == "back_to_classes")
+@start_router.on_callback("back_to_classes")
 async def back_to_classes(callback: CallbackQuery, state: FSMContext):
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -458,38 +407,25 @@ async def back_to_classes(callback: CallbackQuery, state: FSMContext):
     except:
         pass
     
-    # Задержка перед возвратом к выбору
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Пытаемся отправить картинку выбора класса
     image_path = "images/classes.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption="🎯 Выбери класс персонажа:\n\n"
-                   "🛠️ **Работяга** - мастер на все руки\n"
-                   "💼 **Менеджер** - специалист по продажам\n"
-                   "📱 **Блоггер** - разорившийся инфлюенсер с фанатами",
-            reply_markup=get_classes_keyboard()
-        )
-    except Exception as e:
-        await callback.message.answer(
-            "🎯 Выбери класс персонажа:\n\n"
-            "🛠️ **Работяга** - мастер на все руки\n"
-            "💼 **Менеджер** - специалист по продажам\n"
-            "📱 **Блоггер** - разорившийся инфлюенсер с фанатами",
-            reply_markup=get_classes_keyboard()
-        )
+    image_path = resolve_asset(image_path)
+    
+    await answer_with_keyboard(
+        callback.message,
+        "🎯 Выбери класс персонажа:\n\n"
+        "🛠️ **Работяга** - мастер на все руки\n"
+        "💼 **Менеджер** - специалист по продажам\n"
+        "📱 **Блоггер** - разорившийся инфлюенсер с фанатами",
+        photo=image_path,
+        reply_markup=get_classes_keyboard()
+    )
     
     await state.set_state(RegistrationStates.choosing_class)
     await callback.answer()
 
 # Обработка кнопки "Выбрать этот класс" (переход к подтверждению)
-@start_router.callback_query(F.data == "confirm_class")
+@start_router.on_callback("confirm_class")
 async def confirm_class_selection(callback: CallbackQuery, state: FSMContext):
     # Получаем данные из состояния
     data = await state.get_data()
@@ -502,40 +438,26 @@ async def confirm_class_selection(callback: CallbackQuery, state: FSMContext):
     except:
         pass
     
-    # Задержка перед подтверждением
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Пытаемся отправить картинку подтверждения
     image_path = "images/confirmation.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=f"🎯 **Подтверждение выбора**\n\n"
-                   f"📛 Имя: {character_name}\n"
-                   f"🎯 Класс: {character_class}\n\n"
-                   f"❗️ Вы уверены, что хотите выбрать этот класс?\n"
-                   f"После подтверждения изменить класс будет невозможно!",
-            reply_markup=get_final_confirmation_keyboard()
-        )
-    except Exception as e:
-        await callback.message.answer(
-            f"🎯 **Подтверждение выбора**\n\n"
-            f"📛 Имя: {character_name}\n"
-            f"🎯 Класс: {character_class}\n\n"
-            f"❗️ Вы уверены, что хотите выбрать этот класс?\n"
-            f"После подтверждения изменить класс будет невозможно!",
-            reply_markup=get_final_confirmation_keyboard()
-        )
+    image_path = resolve_asset(image_path)
+    
+    await answer_with_keyboard(
+        callback.message,
+        f"🎯 **Подтверждение выбора**\n\n"
+        f"📛 Имя: {character_name}\n"
+        f"🎯 Класс: {character_class}\n\n"
+        f"❗️ Вы уверены, что хотите выбрать этот класс?\n"
+        f"После подтверждения изменить класс будет невозможно!",
+        photo=image_path,
+        reply_markup=get_final_confirmation_keyboard()
+    )
     
     await state.set_state(RegistrationStates.final_confirmation)
     await callback.answer()
 
 # Обработка кнопки "Вернуться к классам" (из подтверждения)
-@start_router.callback_query(F.data == "back_to_class_info")
+@start_router.on_callback("back_to_class_info")
 async def back_to_class_info(callback: CallbackQuery, state: FSMContext):
     # Получаем данные о выбранном классе
     data = await state.get_data()
@@ -547,9 +469,6 @@ async def back_to_class_info(callback: CallbackQuery, state: FSMContext):
     except:
         pass
     
-    # Задержка перед возвратом
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Создаем новый callback с нужными данными для вызова choose_class
     class CallbackMock:
         def __init__(self, original_callback, class_type):
@@ -565,7 +484,7 @@ async def back_to_class_info(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка финального подтверждения выбора
-@start_router.callback_query(F.data == "final_confirm")
+@start_router.on_callback("final_confirm")
 async def final_confirmation(callback: CallbackQuery, state: FSMContext):
     # Получаем данные из состояния
     data = await state.get_data()
@@ -580,48 +499,32 @@ async def final_confirmation(callback: CallbackQuery, state: FSMContext):
     first_name = callback.from_user.first_name
     last_name = callback.from_user.last_name
     
-    user_db_id = db.add_user(user_id, username, first_name, last_name)
+    user_db_id = await db.add_user(user_id, username, first_name, last_name)
     
     # Создаем персонажа с учетом пола ← ИЗМЕНЕНО: передаем пол в БД
     if user_db_id:
         # TODO: Обновить метод add_player в Database для приема пола
-        player_id = db.add_player(user_db_id, character_name, character_class, player_gender)
+        player_id = await db.add_player(user_db_id, character_name, character_class, player_gender)
     
     # Удаляем кнопки из предыдущего сообщения
     await callback.message.edit_reply_markup(reply_markup=None)
     
-    # Задержка перед сообщением об успехе
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Пытаемся отправить картинку успешной регистрации
     image_path = "images/registration_success.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     # Клавиатура с одной кнопкой "Начать играть"
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    start_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎮 Начать играть", callback_data="start_tutorial")]
-    ])
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=f"🎉 Персонаж создан!\n\n"
-                   f"📛 **Имя:** {character_name}\n"
-                   f"🎯 **Класс:** {character_class}\n\n"
-                   f"Чтобы начать играть нажмите кнопку ниже:",
-            reply_markup=start_keyboard
-        )
-    except Exception as e:
-        await callback.message.answer(
-            f"🎉 Персонаж создан!\n\n"
-            f"📛 **Имя:** {character_name}\n"
-            f"🎯 **Класс:** {character_class}\n\n"
-            f"Чтобы начать играть нажмите кнопку ниже:",
-            reply_markup=start_keyboard
-        )
+    start_keyboard = inline_keyboard(("🎮 Начать играть", "start_tutorial"))
+    
+    await answer_with_keyboard(
+        callback.message,
+        f"🎉 Персонаж создан!\n\n"
+        f"📛 **Имя:** {character_name}\n"
+        f"🎯 **Класс:** {character_class}\n\n"
+        f"Чтобы начать играть нажмите кнопку ниже:",
+        photo=image_path,
+        reply_markup=start_keyboard
+    )
     
     # Очищаем состояние
     await state.clear()
@@ -629,13 +532,13 @@ async def final_confirmation(callback: CallbackQuery, state: FSMContext):
 
     # Обработка кнопки "Продолжить играть"
 # Обработка кнопки "Продолжить играть" - ИСПРАВЛЕННАЯ ВЕРСИЯ
-@start_router.callback_query(F.data == "continue_playing")
+@start_router.on_callback("continue_playing")
 async def continue_playing(callback: CallbackQuery, state: FSMContext):
     """Продолжение игры с существующим персонажем"""
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -650,7 +553,7 @@ async def continue_playing(callback: CallbackQuery, state: FSMContext):
         pass
     
     # Проверяем прогресс обучения
-    tutorial_progress = tutorial_db.get_tutorial_progress(player_id)
+    tutorial_progress = await tutorial_db.get_tutorial_progress(player_id)
     
     if tutorial_progress:
         # Восстанавливаем обучение с последнего шага
@@ -662,100 +565,24 @@ async def continue_playing(callback: CallbackQuery, state: FSMContext):
         # Восстанавливаем состояние
         await state.update_data(player_id=player_id, player_balance=player_balance)
         
-        # В зависимости от текущего шага восстанавливаем соответствующий этап
-        if current_step == "waiting_for_belt_start":
-            await state.set_state(TutorialStates.waiting_for_belt_start)
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔧 Подготовка материалов", callback_data="belt_prepare_materials")]
-            ])
-            await callback.message.answer(
-                f"👋 С возвращением, {player_name}!\nПродолжим изготовление ремня.",
-                reply_markup=keyboard
-            )
-            
-        elif current_step == "in_shop_menu":
-            # Если находимся в магазине, показываем меню магазина
-            await state.set_state(TutorialStates.in_shop_menu)
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🛒 Вернуться в магазин", callback_data="view_showcase")]
-            ])
-            await callback.message.answer(
-                f"👋 С возвращением, {player_name}!\nВы находились в магазине.",
-                reply_markup=keyboard
-            )
-            
-        elif current_step == "waiting_for_exit":
-            # Если только что вышли из магазина
-            await state.set_state(TutorialStates.waiting_for_exit)
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔨 Сделать ремень", callback_data="make_belt")]
-            ])
-            await callback.message.answer(
-                f"👋 С возвращением, {player_name}!\nВы только что вышли из магазина.",
-                reply_markup=keyboard
-            )
-            
-        else:
-            # Для других состояний начинаем с начала крафта
-            await state.set_state(TutorialStates.waiting_for_belt_start)
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔧 Начать изготовление ремня", callback_data="belt_prepare_materials")]
-            ])
-            await callback.message.answer(
-                f"👋 С возвращением, {player_name}!\nПродолжим изготовление ремня.",
-                reply_markup=keyboard
-            )
+        # Восстанавливаем шаг по реестру; неизвестный шаг - начинаем крафт ремня
+        if not await resume_tutorial(callback, state, player_name, current_step, player_balance):
+            print(f"⚠️ Нет восстановления для шага {current_step}, начинаем с ремня")
+            await resume_tutorial(callback, state, player_name, "waiting_for_belt_start", player_balance)
     else:
         # Начинаем обучение заново
         await start_tutorial_handler(callback, state)
     
     await callback.answer()
 
-# Обработка кнопки "Создать нового"
-@start_router.callback_query(F.data == "create_new_character")
-async def create_new_character(callback: CallbackQuery, state: FSMContext):
-    user_id = callback.from_user.id
-    active_player = db.get_active_player(user_id)
-    
-    if not active_player:
-        await start_new_character_creation(callback, state)
-        return
-    
-    # Показываем подтверждение для создания нового
-    await show_new_character_confirmation(callback, active_player, state)
-
-# Обработка подтверждения создания нового
-@start_router.callback_query(F.data == "confirm_new_character")
-async def confirm_new_character(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    old_player_id = data.get('old_player_id')
-    
-    if old_player_id:
-        db.deactivate_player(old_player_id)
-        tutorial_db.clear_tutorial_data(old_player_id)
-    
-    await callback.message.edit_reply_markup(reply_markup=None)
-    await start_new_character_creation(callback, state)
-
-# Обработка отмены создания нового
-@start_router.callback_query(F.data == "cancel_new_character")  
-async def cancel_new_character(callback: CallbackQuery, state: FSMContext):
-    await callback.message.edit_reply_markup(reply_markup=None)
-    await callback.message.answer("Действие отменено", reply_markup=get_existing_players_keyboard())
-    await state.clear()
-
 # Обработка кнопки "Профиль"
-@start_router.callback_query(F.data == "view_profile")
+@start_router.on_callback("view_profile")
 async def view_profile(callback: CallbackQuery, state: FSMContext):
     """Просмотр профиля персонажа"""
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -792,13 +619,12 @@ async def view_profile(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем профиль с кнопками управления
     image_path = "images/profile.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=profile_text,
             reply_markup=get_profile_management_keyboard()
         )
@@ -812,13 +638,13 @@ async def view_profile(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка кнопки "Удалить персонажа" в профиле
-@start_router.callback_query(F.data == "delete_character")
+@start_router.on_callback("delete_character")
 async def delete_character(callback: CallbackQuery, state: FSMContext):
     """Подтверждение удаления персонажа"""
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -830,13 +656,12 @@ async def delete_character(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем подтверждение удаления
     image_path = "images/delete_confirmation.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=f"⚠️ **Подтверждение удаления**\n\n"
                    f"Вы действительно хотите удалить персонажа **{player_name}**?\n\n"
                    f"❗️ Это действие нельзя отменить! Все прогресс и предметы будут потеряны.",
@@ -854,13 +679,13 @@ async def delete_character(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка подтверждения удаления
-@start_router.callback_query(F.data == "confirm_deletion")
+@start_router.on_callback("confirm_deletion")
 async def confirm_deletion(callback: CallbackQuery, state: FSMContext):
     """Финальное подтверждение удаления"""
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -872,13 +697,12 @@ async def confirm_deletion(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем финальное подтверждение
     image_path = "images/final_delete.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=f"🚨 **ФИНАЛЬНОЕ ПОДТВЕРЖДЕНИЕ**\n\n"
                    f"Вы собираетесь УДАЛИТЬ персонажа **{player_name}** навсегда!\n\n"
                    f"❌ Все данные будут безвозвратно удалены\n"
@@ -901,13 +725,13 @@ async def confirm_deletion(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка финального подтверждения удаления
-@start_router.callback_query(F.data == "final_confirm_deletion")
+@start_router.on_callback("final_confirm_deletion")
 async def final_confirm_deletion(callback: CallbackQuery, state: FSMContext):
     """Выполнение удаления персонажа"""
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -916,23 +740,22 @@ async def final_confirm_deletion(callback: CallbackQuery, state: FSMContext):
     player_name = active_player[2]
     
     # Удаляем данные обучения
-    tutorial_db.clear_tutorial_data(player_id)
+    await tutorial_db.clear_tutorial_data(player_id)
     
     # Деактивируем персонажа
-    db.deactivate_player(player_id)
+    await db.deactivate_player(player_id)
     
     # Удаляем кнопки из предыдущего сообщения
     await callback.message.edit_reply_markup(reply_markup=None)
     
     # Сообщение об успешном удалении
     image_path = "images/deletion_success.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=f"🗑️ Персонаж **{player_name}** был удален.\n\n"
                    f"Все данные персонажа были безвозвратно удалены.",
             reply_markup=get_registration_keyboard()
@@ -948,7 +771,7 @@ async def final_confirm_deletion(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка отмены удаления
-@start_router.callback_query(F.data == "cancel_deletion")
+@start_router.on_callback("cancel_deletion")
 async def cancel_deletion(callback: CallbackQuery, state: FSMContext):
     """Отмена удаления персонажа"""
     await callback.message.edit_reply_markup(reply_markup=None)
@@ -956,7 +779,7 @@ async def cancel_deletion(callback: CallbackQuery, state: FSMContext):
     await state.clear()
 
 # Обработка отмены финального удаления  
-@start_router.callback_query(F.data == "cancel_final_deletion")
+@start_router.on_callback("cancel_final_deletion")
 async def cancel_final_deletion(callback: CallbackQuery, state: FSMContext):
     """Отмена финального подтверждения удаления"""
     await callback.message.edit_reply_markup(reply_markup=None)
@@ -964,11 +787,11 @@ async def cancel_final_deletion(callback: CallbackQuery, state: FSMContext):
     await state.clear()
 
 # Обработка кнопки "Создать нового" - ПРОСТОЙ И ПОНЯТНЫЙ
-@start_router.callback_query(F.data == "create_new_character")
+@start_router.on_callback("create_new_character")
 async def create_new_character(callback: CallbackQuery, state: FSMContext):
     """Создание нового персонажа с подтверждением"""
     user_id = callback.from_user.id
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     
     if not active_player:
         await start_new_character_creation(callback, state)
@@ -992,8 +815,6 @@ async def show_new_character_confirmation(callback: CallbackQuery, active_player
     except Exception as e:
         print(f"⚠️ Не удалось удалить кнопки: {e}")
     
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     # Текст подтверждения
     confirmation_text = (
         f"⚠️ **ПОДТВЕРЖДЕНИЕ СОЗДАНИЯ НОВОГО ПЕРСОНАЖА**\n\n"
@@ -1011,28 +832,20 @@ async def show_new_character_confirmation(callback: CallbackQuery, active_player
     )
     
     # Клавиатура подтверждения
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    confirmation_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Да, удалить и создать нового", callback_data="confirm_new_character")],
-        [InlineKeyboardButton(text="❌ Нет, оставить текущего", callback_data="cancel_new_character")]
-    ])
+    confirmation_keyboard = inline_keyboard(
+        ("✅ Да, удалить и создать нового", "confirm_new_character"),
+        ("❌ Нет, оставить текущего", "cancel_new_character")
+    )
     
     image_path = "images/delete_warning.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=confirmation_text,
-            reply_markup=confirmation_keyboard
-        )
-    except Exception as e:
-        await callback.message.answer(
-            confirmation_text,
-            reply_markup=confirmation_keyboard
-        )
+    await answer_with_keyboard(
+        callback.message,
+        confirmation_text,
+        photo=image_path,
+        reply_markup=confirmation_keyboard
+    )
     
     # Сохраняем ID старого персонажа для удаления
     await state.update_data(old_player_id=active_player[0])
@@ -1040,31 +853,22 @@ async def show_new_character_confirmation(callback: CallbackQuery, active_player
 # Вспомогательная функция - начало создания нового персонажа
 async def start_new_character_creation(callback: CallbackQuery, state: FSMContext):
     """Запускает процесс создания нового персонажа"""
-    await asyncio.sleep(MESSAGE_DELAY)
-    
     image_path = "images/create_character.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption="🎭 Отлично! Давай создадим твоего нового персонажа!\n\n"
-                   "Как зовут твоего будущего кожевника?\n"
-                   "(Выбери уникальное имя от 2 до 20 символов)",
-        )
-    except Exception as e:
-        await callback.message.answer(
-            "🎭 Отлично! Давай создадим твоего нового персонажа!\n\n"
-            "Как зовут твоего будущего кожевника?\n"
-            "(Выбери уникальное имя от 2 до 20 символов)",
-        )
+    image_path = resolve_asset(image_path)
+    
+    await followups.schedule(
+        callback.message.chat.id,
+        "🎭 Отлично! Давай создадим твоего нового персонажа!\n\n"
+        "Как зовут твоего будущего кожевника?\n"
+        "(Выбери уникальное имя от 2 до 20 символов)",
+        photo=image_path,
+        delay=MESSAGE_DELAY
+    )
     
     await state.set_state(RegistrationStates.waiting_for_name)
 
 # Обработка подтверждения создания нового
-@start_router.callback_query(F.data == "confirm_new_character")
+@start_router.on_callback("confirm_new_character")
 async def confirm_new_character(callback: CallbackQuery, state: FSMContext):
     """Подтвержденное создание нового персонажа"""
     data = await state.get_data()
@@ -1072,8 +876,8 @@ async def confirm_new_character(callback: CallbackQuery, state: FSMContext):
     
     # Удаляем старого персонажа если он есть
     if old_player_id:
-        db.deactivate_player(old_player_id)
-        tutorial_db.clear_tutorial_data(old_player_id)
+        await db.deactivate_player(old_player_id)
+        await tutorial_db.clear_tutorial_data(old_player_id)
         print(f"🗑️ Удален старый персонаж: {old_player_id}")
     
     # Удаляем кнопки из сообщения подтверждения
@@ -1088,7 +892,7 @@ async def confirm_new_character(callback: CallbackQuery, state: FSMContext):
     await start_new_character_creation(callback, state)
 
 # Обработка отмены создания нового  
-@start_router.callback_query(F.data == "cancel_new_character")
+@start_router.on_callback("cancel_new_character")
 async def cancel_new_character(callback: CallbackQuery, state: FSMContext):
     """Отмена создания нового персонажа"""
     # Удаляем кнопки из сообщения подтверждения
@@ -1103,8 +907,8 @@ async def cancel_new_character(callback: CallbackQuery, state: FSMContext):
     await callback.answer("✅ Создание нового персонажа отменено")
     
     # Возвращаем к выбору действий
-    await asyncio.sleep(MESSAGE_DELAY)
-    await callback.message.answer(
+    await answer_with_keyboard(
+        callback.message,
         "Что вы хотите сделать?",
         reply_markup=get_existing_players_keyboard()
     )
@@ -1115,7 +919,7 @@ async def start_tutorial(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -1125,8 +929,7 @@ async def start_tutorial(callback: CallbackQuery, state: FSMContext):
     player_class = active_player[3]  # класс персонажа
     
     # Инициализируем прогресс обучения для этого персонажа
-    tutorial_db.init_tutorial_progress(player_id)
-    tutorial_db.init_shop_items()
+    await tutorial_db.init_tutorial_progress(player_id)
     
     # Определяем предысторию по классу
     if player_class == "Работяга":
@@ -1146,13 +949,12 @@ async def start_tutorial(callback: CallbackQuery, state: FSMContext):
     
     # Пытаемся отправить картинку предыстории
     image_path = f"images/tutorial/{image_name}"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=backstory,
             reply_markup=get_tutorial_start_keyboard()
         )
@@ -1167,133 +969,27 @@ async def start_tutorial(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     
 # Заглушки для главного меню (реализуем позже)
-@start_router.callback_query(F.data == "work_menu")
+@start_router.on_callback("work_menu")
 async def work_menu(callback: CallbackQuery):
     await callback.answer("🛠️ Система работы скоро будет доступна!")
 
-@start_router.callback_query(F.data == "orders_menu")
+@start_router.on_callback("orders_menu")
 async def orders_menu(callback: CallbackQuery):
     await callback.answer("📋 Система заказов скоро будет доступна!")
 
-@start_router.callback_query(F.data == "settings")
+@start_router.on_callback("settings")
 async def settings(callback: CallbackQuery):
     await callback.answer("⚙️ Настройки скоро будут доступны!")
 
 async def return_to_last_step(callback: CallbackQuery, state: FSMContext, player_id, current_step, player_balance):
     """Возвращает игрока на последний шаг обучения"""
     user_id = callback.from_user.id
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     player_name = active_player[2] if active_player else "Игрок"
     
     # Восстанавливаем состояние
     await state.update_data(player_id=player_id, player_balance=player_balance)
     
     # ОТПРАВЛЯЕМ НОВОЕ СООБЩЕНИЕ ВМЕСТО РЕДАКТИРОВАНИЯ СТАРОГО
-    if current_step == "waiting_for_shop_enter":
-        await state.set_state(TutorialStates.waiting_for_shop_enter)
-        tutorial_db.update_tutorial_progress(player_id, "waiting_for_shop_enter")
-        
-        image_path = "images/tutorial/return.jpg"
-        if not os.path.exists(image_path):
-            image_path = "images/placeholder.jpg"
-        
-        try:
-            photo = FSInputFile(image_path)
-            await callback.message.answer_photo(
-                photo=photo,
-                caption=f"👋 С возвращением, {player_name}!\n\nПродолжим с того места, где ты остановился.",
-                reply_markup=get_tutorial_start_keyboard()
-            )
-        except:
-            await callback.message.answer(
-                f"👋 С возвращением, {player_name}!\n\nПродолжим с того места, где ты остановился.",
-                reply_markup=get_tutorial_start_keyboard()
-            )
-    
-    elif current_step == "waiting_for_approach":
-        await state.set_state(TutorialStates.waiting_for_approach)
-        tutorial_db.update_tutorial_progress(player_id, "waiting_for_approach")
-        
-        image_path = "images/tutorial/shop_entrance.jpg"
-        if not os.path.exists(image_path):
-            image_path = "images/placeholder.jpg"
-        
-        try:
-            photo = FSInputFile(image_path)
-            await callback.message.answer_photo(
-                photo=photo,
-                caption=f"👋 С возвращением в магазин, {player_name}!\n\nТы остановился когда рассматривал инструменты.",
-                reply_markup=get_approach_keyboard()
-            )
-        except:
-            await callback.message.answer(
-                f"👋 С возвращением в магазин, {player_name}!\n\nТы остановился когда рассматривал инструменты.",
-                reply_markup=get_approach_keyboard()
-            )
-    
-    elif current_step == "waiting_for_oldman_approach":
-        await state.set_state(TutorialStates.waiting_for_oldman_approach)
-        tutorial_db.update_tutorial_progress(player_id, "waiting_for_oldman_approach")
-        
-        image_path = "images/tutorial/oldman_talking.jpg"
-        if not os.path.exists(image_path):
-            image_path = "images/placeholder.jpg"
-        
-        try:
-            photo = FSInputFile(image_path)
-            await callback.message.answer_photo(
-                photo=photo,
-                caption=f"👋 С возвращением, {player_name}!\n\nТы как раз подошел послушать Гену.",
-                reply_markup=get_oldman_approach_keyboard()
-            )
-        except:
-            await callback.message.answer(
-                f"👋 С возвращением, {player_name}!\n\nТы как раз подошел послушать Гену.",
-                reply_markup=get_oldman_approach_keyboard()
-            )
-    
-    elif current_step == "waiting_for_showcase":
-        await state.set_state(TutorialStates.waiting_for_showcase)
-        tutorial_db.update_tutorial_progress(player_id, "waiting_for_showcase")
-        
-        image_path = "images/tutorial/shop_showcase.jpg"
-        if not os.path.exists(image_path):
-            image_path = "images/placeholder.jpg"
-        
-        try:
-            photo = FSInputFile(image_path)
-            await callback.message.answer_photo(
-                photo=photo,
-                caption=f"👋 С возвращением, {player_name}!\n\nГена как раз предлагал посмотреть на витрину.",
-                reply_markup=get_showcase_keyboard()
-            )
-        except:
-            await callback.message.answer(
-                f"👋 С возвращением, {player_name}!\n\nГена как раз предлагал посмотреть на витрину.",
-                reply_markup=get_showcase_keyboard()
-            )
-    
-    elif current_step in ["in_shop_menu", "in_shop_category", "waiting_for_exit"]:
-        await state.set_state(TutorialStates.in_shop_menu)
-        tutorial_db.update_tutorial_progress(player_id, "in_shop_menu")
-        
-        image_path = "images/tutorial/tools_showcase.jpg"
-        if not os.path.exists(image_path):
-            image_path = "images/placeholder.jpg"
-        
-        try:
-            photo = FSInputFile(image_path)
-            await callback.message.answer_photo(
-                photo=photo,
-                caption=f"👋 С возвращением в магазин, {player_name}!\n\n💰 Ваш баланс: {player_balance} монет\nПродолжи покупки:",
-                reply_markup=get_shop_menu_keyboard(player_balance)
-            )
-        except:
-            await callback.message.answer(
-                f"👋 С возвращением в магазин, {player_name}!\n\n💰 Ваш баланс: {player_balance} монет\nПродолжи покупки:",
-                reply_markup=get_shop_menu_keyboard(player_balance)
-            )
- 
-    
-    else:
-        await start_tutorial(callback, state)
\ No newline at end of file
+    if not await resume_tutorial(callback, state, player_name, current_step, player_balance):
+        await start_tutorial(callback, state)
@@ -1,19 +1,39 @@
 # routers/tutorial.py
-from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from database.models import Database, tutorial_db
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from database.models import (
+    Database,
+    PURCHASE_ITEM_NOT_FOUND,
+    PURCHASE_NO_PROGRESS,
+    PURCHASE_INSUFFICIENT_FUNDS,
+    PURCHASE_ALREADY_OWNED,
+)
+from database.async_db import AsyncDatabase, async_tutorial_db as tutorial_db
+from database.fsm_storage import SQLiteStorage
+from utils.callback_dispatch import IndexedRouter
+from utils.assets import asset_manifest, referenced_images, resolve_asset
+from utils.media import answer_photo, media_cache
+from utils.send_queue import send_scheduler
+from utils.followups import followups
+from utils.keyboards import inline_keyboard, shop_keyboards
+from utils.callback_data import ItemAction, ItemCallback, item_callback
+from utils.scenario import Scenario
+from utils.shop import PURCHASE_NOT_ALLOWED, ShopContext, ShopService
+from utils.quality import (
+    ORDER_DIFFICULTY,
+    QUALITY_PREVIEW_MARK,
+    format_quality_preview,
+    items_bonus,
+    quality_probabilities,
+)
 from aiogram import Bot
-from aiogram.types import Message
-import json
-import os
 import asyncio
+import random
 
-tutorial_router = Router()
-db = Database()
+tutorial_router = IndexedRouter()
+db = AsyncDatabase(Database())
 
 # Команда для администратора для перемещения по этапам
 @tutorial_router.message(Command("setstage"))
@@ -48,13 +68,13 @@ async def set_stage_command(message: Message, state: FSMContext, bot: Bot):
         stage_name = args[1]
         
         # Получаем активного игрока
-        active_player = db.get_active_player(message.from_user.id)
+        active_player = await db.get_active_player(message.from_user.id)
         if not active_player:
             await message.answer("❌ Активный персонаж не найден")
             return
         
         # Обновляем прогресс
-        tutorial_db.update_tutorial_progress(player_id, stage_name)
+        await tutorial_db.update_tutorial_progress(player_id, stage_name)
         
         # Очищаем состояние FSM
         await state.clear()
@@ -88,13 +108,13 @@ async def check_progress_command(message: Message):
         return
     
     # Получаем активного игрока
-    active_player = db.get_active_player(message.from_user.id)
+    active_player = await db.get_active_player(message.from_user.id)
     if not active_player:
         await message.answer("❌ Активный персонаж не найден")
         return
     
     player_id = active_player[0]
-    progress = tutorial_db.get_tutorial_progress(player_id)
+    progress = await tutorial_db.get_tutorial_progress(player_id)
     
     if progress:
         stage, step, completed, balance = progress
@@ -108,16 +128,244 @@ async def check_progress_command(message: Message):
     else:
         await message.answer("❌ Прогресс не найден")
 
-# Белые списки товаров для обучения
-AVAILABLE_TUTORIAL_ITEMS = {
-    "Ножи": ["Канцелярский нож"],
-    "Пробойники": ["Высечные пробойники"],
-    "Торцбилы": ["Мультитул 3 в 1"],
-    "Материалы": ["Дешевая ременная заготовка", "Пчелиный воск"],
-    "Фурнитура": ["Дешевая фурнитура для ремней"],
-    "Нитки": ["Швейные МосНитки"]
+# Команда для просмотра статистики пула соединений
+@tutorial_router.message(Command("dbstats"))
+async def db_stats_command(message: Message, state: FSMContext):
+    """Команда для просмотра счетчиков пула соединений и кэша персонажей"""
+    
+    ADMIN_IDS = [1092273052]  # Замени на свой Telegram ID
+    
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("❌ Эта команда только для администратора")
+        return
+    
+    stats = tutorial_db.pool.stats()
+    await message.answer(
+        f"🗄️ Пул соединений ({tutorial_db.db_path}):\n"
+        f"• Размер: {stats['size']} (создано {stats['created']}, занято {stats['in_use']})\n"
+        f"• Попадания: {stats['hits']} ({stats['hit_rate']:.1%})\n"
+        f"• Промахи: {stats['misses']}\n"
+        f"• Ожидания: {stats['waits']} (в среднем {stats['wait_time_avg'] * 1000:.1f} мс, "
+        f"макс. {stats['wait_time_max'] * 1000:.1f} мс)"
+    )
+    
+    cache_stats = db.player_cache.stats()
+    await message.answer(
+        f"👤 Кэш активных персонажей:\n"
+        f"• Записей: {cache_stats['size']} из {cache_stats['maxsize']} (TTL {cache_stats['ttl']:.0f} c)\n"
+        f"• Попадания: {cache_stats['hits']} ({cache_stats['hit_rate']:.1%})\n"
+        f"• Промахи: {cache_stats['misses']}, вытеснено: {cache_stats['evictions']}"
+    )
+    
+    if tutorial_db.progress_buffer is not None:
+        buffer_stats = tutorial_db.progress_buffer.stats()
+        await message.answer(
+            f"📝 Отложенная запись прогресса:\n"
+            f"• Обновлений: {buffer_stats['puts']} (склеено {buffer_stats['coalesced']})\n"
+            f"• Записано: {buffer_stats['written']} за {buffer_stats['flushes']} транзакций\n"
+            f"• В очереди: {buffer_stats['pending']}"
+        )
+    
+    media_stats = media_cache.stats()
+    await message.answer(
+        f"🖼️ Картинки (file_id):\n"
+        f"• В кэше: {media_stats['cached']}\n"
+        f"• Отправлено по file_id: {media_stats['hits']}, загружено: {media_stats['uploads']}\n"
+        f"• Устаревших file_id: {media_stats['stale']}"
+    )
+    
+    send_stats = send_scheduler.stats()
+    await message.answer(
+        f"📤 Очередь отправки:\n"
+        f"• Отправлено: {send_stats['sent']} (срочных {send_stats['sent_high']}, фоновых {send_stats['sent_low']})\n"
+        f"• В очереди: {send_stats['queued']} (макс. {send_stats['max_queued']}), чатов: {send_stats['chats']}\n"
+        f"• Задержка: в среднем {send_stats['latency_avg'] * 1000:.0f} мс, макс. {send_stats['latency_max'] * 1000:.0f} мс\n"
+        f"• Повторов после 429: {send_stats['retries']}"
+    )
+    
+    keyboard_stats = shop_keyboards.stats()
+    await message.answer(
+        f"⌨️ Клавиатуры:\n"
+        f"• Постоянных: {keyboard_stats['static']}\n"
+        f"• Категорий магазина: {keyboard_stats['size']}, попадания: {keyboard_stats['hits']} "
+        f"({keyboard_stats['hit_rate']:.1%}), собрано: {keyboard_stats['misses']}"
+    )
+    
+    followup_stats = followups.stats()
+    await message.answer(
+        f"⏳ Отложенные сообщения:\n"
+        f"• Ожидают: {followup_stats['pending']} (чатов {followup_stats['chats']})\n"
+        f"• Запланировано: {followup_stats['scheduled']}, отправлено: {followup_stats['sent']}\n"
+        f"• Отменено нажатием кнопки: {followup_stats['cancelled']}, ошибок: {followup_stats['failed']}"
+    )
+    
+    if isinstance(state.storage, SQLiteStorage):
+        fsm_stats = state.storage.stats()
+        await message.answer(
+            f"🧠 Состояния FSM:\n"
+            f"• В памяти: {fsm_stats['cache']['size']} из {fsm_stats['cache']['maxsize']} "
+            f"(простой до {fsm_stats['cache']['ttl']:.0f} c)\n"
+            f"• Попадания: {fsm_stats['cache']['hits']} ({fsm_stats['cache']['hit_rate']:.1%}), "
+            f"выгружено: {fsm_stats['cache']['evictions']}\n"
+            f"• Записано: {fsm_stats['buffer']['written']} за {fsm_stats['buffer']['flushes']} транзакций, "
+            f"в очереди: {fsm_stats['buffer']['pending']}"
+        )
+
+# Команда для пересборки манифеста картинок (после замены файлов в images/)
+@tutorial_router.message(Command("reload_assets"))
+async def reload_assets_command(message: Message):
+    """Пересканирует images/ без перезапуска бота"""
+    
+    ADMIN_IDS = [1092273052]  # Замени на свой Telegram ID
+    
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("❌ Эта команда только для администратора")
+        return
+    
+    loop = asyncio.get_running_loop()
+    added, removed, changed = await loop.run_in_executor(None, asset_manifest.scan)
+    missing = asset_manifest.report_missing(referenced_images())
+    stats = asset_manifest.stats()
+    await message.answer(
+        f"🖼️ Манифест картинок обновлен:\n"
+        f"• Всего: {stats['assets']} ({stats['bytes'] / 1024:.0f} КБ)\n"
+        f"• Новых: {len(added)}, изменено: {len(changed)}, удалено: {len(removed)}\n"
+        f"• Оптимизированных копий: {stats['optimized']}\n"
+        f"• Не хватает: {len(missing)}"
+    )
+
+# Сообщения об отказе в покупке (по PurchaseResult.status)
+PURCHASE_ERROR_MESSAGES = {
+    PURCHASE_ITEM_NOT_FOUND: "❌ Товар не найден",
+    PURCHASE_NO_PROGRESS: "❌ Ошибка: персонаж не найден",
+    PURCHASE_INSUFFICIENT_FUNDS: "❌ Недостаточно монет!",
+    PURCHASE_ALREADY_OWNED: "❌ У тебя уже есть этот предмет!",
 }
 
+shop_service = ShopService(tutorial_db)
+
+def purchase_error_message(context, result):
+    """Ответ игроку на покупку, которая не прошла"""
+    if result.status == PURCHASE_NOT_ALLOWED:
+        return context.locked_message
+    if result.status == PURCHASE_ALREADY_OWNED:
+        return context.owned_message
+    return PURCHASE_ERROR_MESSAGES[result.status]
+
+async def show_shop_category_view(context, callback: CallbackQuery, state: FSMContext):
+    """Показ категории магазина: одно чтение баланса и готовая клавиатура. Возвращает категорию"""
+    category = context.categories.get(callback.data)
+    if not category:
+        print(f"❌ Ошибка: неизвестная категория {callback.data}")
+        await callback.answer("❌ Ошибка категории")
+        return None
+    
+    data = await state.get_data()
+    player_id = data.get('player_id')
+    if not player_id:
+        await callback.answer("❌ Ошибка: персонаж не найден")
+        return None
+    
+    balance = await shop_service.balance(context, player_id)
+    caption, keyboard = shop_service.view(context, category, balance)
+    
+    try:
+        await callback.message.edit_caption(caption=caption, reply_markup=keyboard)
+    except Exception as e:
+        print(f"❌ Ошибка обновления категории: {e}")
+        await callback.answer("❌ Ошибка обновления")
+        return None
+    
+    await state.update_data(current_category=category, player_balance=balance)
+    return category
+
+async def buy_shop_item(context, callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
+    """Покупка в магазине одной транзакцией. PurchaseResult при успехе, иначе None (игроку уже ответили)"""
+    try:
+        data = await state.get_data()
+        player_id = data.get('player_id')
+        
+        # ЕСЛИ player_id НЕТ В СОСТОЯНИИ - ВОССТАНАВЛИВАЕМ
+        if not player_id:
+            active_player = await db.get_active_player(callback.from_user.id)
+            if not active_player:
+                await callback.answer("❌ Ошибка: персонаж не найден")
+                return None
+            player_id = active_player[0]
+            await state.update_data(player_id=player_id)
+        
+        result = await shop_service.purchase(context, player_id, callback_data.item_id, data.get('current_category', ''))
+        if not result.ok:
+            print(f"❌ Покупка не прошла: {result.item_name} ({result.status})")
+            await callback.answer(purchase_error_message(context, result))
+            return None
+        
+        print(f"✅ Успешная покупка: {result.item_name}, новый баланс: {result.balance}")
+        await state.update_data(player_balance=result.balance)
+        return result
+    except Exception as e:
+        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА при покупке ({context.name}): {e}")
+        import traceback
+        traceback.print_exc()
+        await callback.answer("❌ Ошибка при покупке")
+        return None
+
+async def update_shop_category_message(context, callback: CallbackQuery, category: str, balance: int, status_message: str = ""):
+    """Перерисовывает категорию магазина по известному балансу (без чтения из БД)"""
+    caption, keyboard = shop_service.view(context, category, balance, status_message)
+    await callback.message.edit_caption(caption=caption, reply_markup=keyboard)
+
+def item_toggle_rows(action, item_names, selected=()):
+    """Кнопки выбора предметов из инвентаря (🔘/✅), в callback_data - id товара в каталоге"""
+    rows = []
+    for item_name in item_names:
+        item = tutorial_db.catalog.find(item_name)
+        if item is None:
+            print(f"⚠️ Предмета нет в каталоге: {item_name}")
+            continue
+        emoji = "✅" if item_name in selected else "🔘"
+        rows.append([InlineKeyboardButton(
+            text=f"{emoji} {item_name}",
+            callback_data=item_callback(action, item)
+        )])
+    return rows
+
+async def crafting_quality(callback: CallbackQuery, order: str, item_names):
+    """Точные вероятности уровней качества для активного персонажа и выбранных предметов"""
+    player = await db.get_active_player(callback.from_user.id)
+    if not player:
+        return None
+    # players: id, user_id, name, class, level, mastery, luck, ...
+    return quality_probabilities(player[5], player[6], items_bonus(item_names), ORDER_DIFFICULTY[order])
+
+async def edit_selection_message(callback: CallbackQuery, keyboard, probabilities=None):
+    """Обновляет клавиатуру выбора и строку ожидаемого качества в подписи"""
+    message = callback.message
+    body = message.caption if message.caption is not None else message.text
+    if probabilities is not None and body is not None:
+        text = f"{body.split(QUALITY_PREVIEW_MARK)[0].rstrip()}\n\n{format_quality_preview(probabilities)}"
+        if text != body:
+            if message.caption is not None:
+                await message.edit_caption(caption=text, reply_markup=keyboard)
+            else:
+                await message.edit_text(text, reply_markup=keyboard)
+            return
+    await message.edit_reply_markup(reply_markup=keyboard)
+
+def item_select_rows(action, item_names, emoji):
+    """Кнопки выбора одного предмета из инвентаря, в callback_data - id товара в каталоге"""
+    rows = []
+    for item_name in item_names:
+        item = tutorial_db.catalog.find(item_name)
+        if item is None:
+            print(f"⚠️ Предмета нет в каталоге: {item_name}")
+            continue
+        rows.append([InlineKeyboardButton(
+            text=f"{emoji} {item_name}",
+            callback_data=item_callback(action, item)
+        )])
+    return rows
+
 # Состояния для обучения
 class TutorialStates(StatesGroup):
     waiting_for_shop_enter = State()
@@ -145,6 +393,7 @@ class TutorialStates(StatesGroup):
     waiting_for_holder_tools = State()         # Этап 15 - Выбор инструментов
     waiting_for_holder_threads = State()       # Этап 16 - Выбор ниток
     waiting_for_holder_quality = State()       # Этап 17-18 - Оценить/Подарить
+    waiting_for_holder_gift = State()          # Этап 18 - Подарить холдер
     waiting_for_holder_final = State()         # Этап 19 - Завершение
     # === СОСТОЯНИЯ ДЛЯ ТРЕТЬЕЙ ЧАСТИ ОБУЧЕНИЯ (СУМКА) ===
     waiting_for_bag_start = State()              # Этап 20
@@ -166,53 +415,85 @@ class TutorialStates(StatesGroup):
 
 # Клавиатура для начала обучения
 def get_tutorial_start_keyboard():
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛒 Зайти в магазин", callback_data="enter_shop")]
-    ])
+    keyboard = inline_keyboard(("🛒 Зайти в магазин", "enter_shop"))
     return keyboard
 
+# Вход в магазин и знакомство с Геной - шаги сценария scenarios/tutorial.json
+tutorial_scenario = Scenario.load("scenarios/tutorial.json", TutorialStates, tutorial_db)
+tutorial_scenario.register(tutorial_router)
+
 # Клавиатура для подхода к мужичку
 def get_approach_keyboard():
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="👣 Подойти поближе", callback_data="approach_closer")]
-    ])
-    return keyboard
+    return tutorial_scenario.keyboard("enter_shop")
 
 # Клавиатура для подхода к Гене
 def get_oldman_approach_keyboard():
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="👋 Подойти к мужичку", callback_data="approach_oldman")]
-    ])
-    return keyboard
+    return tutorial_scenario.keyboard("approach_closer")
 
 # Клавиатура для просмотра витрины
 def get_showcase_keyboard():
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="👀 Посмотреть на витрину", callback_data="view_showcase")]
-    ])
-    return keyboard
+    return tutorial_scenario.keyboard("approach_oldman")
 
 # Клавиатура меню магазина
 def get_shop_menu_keyboard(balance=2000):
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔪 Ножи", callback_data="shop_knives")],
-        [InlineKeyboardButton(text="🕳️ Пробойники", callback_data="shop_punches")],
-        [InlineKeyboardButton(text="🔧 Торцбилы", callback_data="shop_edges")],
-        [InlineKeyboardButton(text="🧵 Материалы", callback_data="shop_materials")],
-        [InlineKeyboardButton(text="📎 Фурнитура", callback_data="shop_hardware")],
-        [InlineKeyboardButton(text="🚪 Выйти из магазина", callback_data="shop_exit")]
-    ])
+    return tutorial_scenario.keyboard("view_showcase")
+
+# Клавиатура магазина после обучения (этапы 10-12)
+def get_shop_after_menu_keyboard():
+    keyboard = inline_keyboard(
+        ("🔪 Ножи", "shop_after_knives"),
+        ("🕳️ Пробойники", "shop_after_punches"),
+        ("🔧 Торцбилы", "shop_after_edges"),
+        ("🧵 Материалы", "shop_after_materials"),
+        ("📎 Фурнитура", "shop_after_hardware"),
+        ("🧶 Нитки", "shop_after_threads"),
+        ("🧪 Химия", "shop_after_chemistry"),
+        ("🚪 Выйти из магазина", "shop_after_exit")
+    )
+    return keyboard
+
+# Клавиатура магазина для сумки (этап 21)
+def get_bag_shop_menu_keyboard():
+    keyboard = inline_keyboard(
+        ("🔪 Ножи", "shop_bag_knives"),
+        ("🕳️ Пробойники", "shop_bag_punches"),
+        ("🔧 Торцбилы", "shop_bag_edges"),
+        ("🧵 Материалы", "shop_bag_materials"),
+        ("📎 Фурнитура", "shop_bag_hardware"),
+        ("🧶 Нитки", "shop_bag_threads"),
+        ("🧪 Химия", "shop_bag_chemistry"),
+        ("🚪 Выйти из магазина", "bag_shop_exit")
+    )
+    return keyboard
+
+# Клавиатура магазина второй попытки сумки (этап 29)
+def get_bag_retry_shop_menu_keyboard():
+    keyboard = inline_keyboard(
+        ("🧵 Материалы для сумок", "shop_bag_retry_materials"),
+        ("📎 Фурнитура для сумок", "shop_bag_retry_hardware"),
+        ("🧶 Нитки", "shop_bag_retry_threads"),
+        ("🧪 Химия", "shop_bag_retry_chemistry"),
+        ("🚪 Вернуться домой (купите все материалы)", "bag_retry_shop_not_ready")
+    )
+    return keyboard
+
+# Клавиатура финального меню обучения (этап 37)
+def get_final_menu_keyboard():
+    keyboard = inline_keyboard(
+        ("📋 Принять заказ", "soon_available"),
+        ("🛠️ Мой инвентарь", "soon_available"),
+        ("🏪 Магазин", "soon_available"),
+        ("📊 Мой профиль", "soon_available")
+    )
     return keyboard
 
 # Клавиатура для кнопки "Сделать ремень"
 def get_make_belt_keyboard():
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔨 Сделать ремень", callback_data="make_belt")]
-    ])
+    keyboard = inline_keyboard(("🔨 Сделать ремень", "make_belt"))
     return keyboard
 
 # Обработка кнопки "Сделать ремень" - Этап 1
-@tutorial_router.callback_query(F.data == "make_belt")
+@tutorial_router.on_callback("make_belt")
 async def make_belt_handler(callback: CallbackQuery, state: FSMContext):
     """Начало изготовления ремня - Этап 1"""
     print("🎯 ОТЛАДКА: Обработчик make_belt вызван")
@@ -223,7 +504,7 @@ async def make_belt_handler(callback: CallbackQuery, state: FSMContext):
     
     if not player_id:
         # Если player_id нет в состоянии, получаем из БД
-        active_player = db.get_active_player(callback.from_user.id)
+        active_player = await db.get_active_player(callback.from_user.id)
         if active_player:
             player_id = active_player[0]
             await state.update_data(player_id=player_id)
@@ -233,7 +514,7 @@ async def make_belt_handler(callback: CallbackQuery, state: FSMContext):
             return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_start")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_start")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -251,20 +532,16 @@ async def make_belt_handler(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для перехода к следующему этапу
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage1_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔧 Подготовка материалов", callback_data="belt_prepare_materials")]
-    ])
+    stage1_keyboard = inline_keyboard(("🔧 Подготовка материалов", "belt_prepare_materials"))
     
     # Отправляем сообщение этапа 1
     image_path = "images/tutorial/belt_start.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage1_text,
             reply_markup=stage1_keyboard
         )
@@ -282,7 +559,7 @@ async def make_belt_handler(callback: CallbackQuery, state: FSMContext):
     print("✅ Состояние установлено: waiting_for_belt_start")
 
 # Обработка кнопки "Подготовка материалов" - Этап 2
-@tutorial_router.callback_query(F.data == "belt_prepare_materials")
+@tutorial_router.on_callback("belt_prepare_materials")
 async def belt_prepare_materials(callback: CallbackQuery, state: FSMContext):
     """Подготовка материалов для ремня - Этап 2"""
     print("🎯 ОТЛАДКА: belt_prepare_materials вызван")
@@ -296,7 +573,7 @@ async def belt_prepare_materials(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_materials")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_materials")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -316,28 +593,16 @@ async def belt_prepare_materials(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    leather_items = [item[0] for item in inventory if "ременная" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    leathers = tutorial_db.catalog.with_role("belt_leather")
+    leather_items = [item[0] for item in inventory if item[0] in leathers]
     
     print(f"🎒 ОТЛАДКА: Найдены кожи в инвентаре: {leather_items}")
     
     # Создаем клавиатуру с доступными кожами - ИСПРАВЛЕННЫЙ КОД
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    from aiogram.types import InlineKeyboardMarkup
     
-    keyboard_buttons = []
-    for item_name in leather_items:
-        # ИСПРАВЛЕНИЕ: используем короткие callback_data
-        if item_name == "Дешевая ременная заготовка":
-            callback_data = "select_leather_cheap"  # ✅ КОРОТКИЙ callback_data
-        else:
-            # Для других кож тоже используем короткие названия
-            short_name = item_name.lower().replace(' ', '_').replace('дешевая', 'cheap').replace('ременная', 'belt').replace('заготовка', 'leather')[:20]
-            callback_data = f"select_leather_{short_name}"
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🧵 {item_name}", 
-            callback_data=callback_data  # ✅ КОРОТКИЙ callback_data
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_BELT_LEATHER, leather_items, "🧵")
     
     stage2_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
@@ -346,13 +611,12 @@ async def belt_prepare_materials(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 2
     image_path = "images/tutorial/belt_materials.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage2_text,
             reply_markup=stage2_keyboard
         )
@@ -380,8 +644,8 @@ async def belt_prepare_materials(callback: CallbackQuery, state: FSMContext):
     print("✅ Состояние установлено: waiting_for_belt_leather")
 
 # Обработка выбора кожи для ремня - Этап 3
-@tutorial_router.callback_query(F.data.startswith("select_leather_"))
-async def select_belt_leather(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_BELT_LEATHER)
+async def select_belt_leather(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор кожи для ремня - Этап 3"""
     print("🎯 ОТЛАДКА: select_belt_leather вызван")
     
@@ -393,17 +657,12 @@ async def select_belt_leather(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем короткий код кожи из callback_data
-    leather_code = callback.data.replace("select_leather_", "")
-    print(f"🎒 ОТЛАДКА: Получен код кожи: {leather_code}")
-    
-    # Преобразуем код в полное название
-    leather_map = {
-        "cheap": "Дешевая ременная заготовка",
-        # добавьте другие коды по мере необходимости
-    }
-    
-    leather_name = leather_map.get(leather_code, "Дешевая ременная заготовка")  # по умолчанию
+    # Кожа по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    leather_name = item.name
     
     print(f"🎒 ОТЛАДКА: Выбрана кожа: {leather_name}")
     
@@ -411,7 +670,7 @@ async def select_belt_leather(callback: CallbackQuery, state: FSMContext):
     await state.update_data(selected_leather=leather_name)
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_leather")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_leather")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -424,26 +683,16 @@ async def select_belt_leather(callback: CallbackQuery, state: FSMContext):
     stage3_text = "Теперь выберите фурнитуру"
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    hardware_items = [item[0] for item in inventory if "фурнитура" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    hardware = tutorial_db.catalog.of_kind("hardware")
+    hardware_items = [item[0] for item in inventory if item[0] in hardware]
     
     print(f"🎒 ОТЛАДКА: Найдена фурнитура в инвентаре: {hardware_items}")
     
     # Создаем клавиатуру с доступной фурнитурой (тоже с короткими callback_data)
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    from aiogram.types import InlineKeyboardMarkup
     
-    keyboard_buttons = []
-    for item_name in hardware_items:
-        # Используем короткие callback_data для фурнитуры
-        if item_name == "Дешевая фурнитура для ремней":
-            callback_data = "select_hardware_cheap"
-        else:
-            callback_data = f"select_hardware_{item_name.replace(' ', '_').lower()[:15]}"
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"📎 {item_name}", 
-            callback_data=callback_data
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_BELT_HARDWARE, hardware_items, "📎")
     
     stage3_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
@@ -451,13 +700,12 @@ async def select_belt_leather(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 3
     image_path = "images/tutorial/belt_hardware.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage3_text,
             reply_markup=stage3_keyboard
         )
@@ -476,8 +724,8 @@ async def select_belt_leather(callback: CallbackQuery, state: FSMContext):
     print("✅ Состояние установлено: waiting_for_belt_hardware")
 
 # Обработка выбора фурнитуры для ремня - Этап 4
-@tutorial_router.callback_query(F.data.startswith("select_hardware_"))
-async def select_belt_hardware(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_BELT_HARDWARE)
+async def select_belt_hardware(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор фурнитуры для ремня - Этап 4"""
     # Получаем данные игрока
     data = await state.get_data()
@@ -487,14 +735,18 @@ async def select_belt_hardware(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название выбранной фурнитуры
-    hardware_name = callback.data.replace("select_hardware_", "").replace("_", " ")
+    # Фурнитура по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    hardware_name = item.name
     
     # Сохраняем выбранную фурнитуру в состоянии
     await state.update_data(selected_hardware=hardware_name)
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_hardware")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_hardware")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -511,20 +763,16 @@ async def select_belt_hardware(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для перехода к выбору инструментов
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage4_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛠️ Выбрать инструменты", callback_data="belt_select_tools")]
-    ])
+    stage4_keyboard = inline_keyboard(("🛠️ Выбрать инструменты", "belt_select_tools"))
     
     # Отправляем сообщение этапа 4
     image_path = "images/tutorial/belt_tools.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage4_text,
             reply_markup=stage4_keyboard
         )
@@ -539,7 +787,7 @@ async def select_belt_hardware(callback: CallbackQuery, state: FSMContext):
     await callback.answer(f"✅ Выбрано: {hardware_name}")
 
 # Обработка кнопки "Выбрать инструменты" - Этап 5
-@tutorial_router.callback_query(F.data == "belt_select_tools")
+@tutorial_router.on_callback("belt_select_tools")
 async def belt_select_tools(callback: CallbackQuery, state: FSMContext):
     """Выбор инструментов для ремня - Этап 5"""
     # Получаем данные игрока
@@ -551,7 +799,7 @@ async def belt_select_tools(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_tools")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_tools")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -560,15 +808,11 @@ async def belt_select_tools(callback: CallbackQuery, state: FSMContext):
         pass
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
     
     # Фильтруем только инструменты
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        # Ищем инструменты по ключевым словам
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул", "торцбил"]):
-            tool_items.append(item_name)
+    tools = tutorial_db.catalog.of_kind("tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Инициализируем список выбранных инструментов в состоянии
     await state.update_data(selected_tools=[])
@@ -576,12 +820,7 @@ async def belt_select_tools(callback: CallbackQuery, state: FSMContext):
     # Создаем клавиатуру для выбора инструментов
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🔘 {tool_name}", 
-            callback_data=f"toggle_tool_{tool_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_TOOL, tool_items)
     
     # Кнопка продолжения (пока неактивна - нужно выбрать все инструменты)
     keyboard_buttons.append([InlineKeyboardButton(
@@ -601,13 +840,12 @@ async def belt_select_tools(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 5
     image_path = "images/tutorial/tools_selection.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage5_text,
             reply_markup=tools_keyboard
         )
@@ -622,8 +860,8 @@ async def belt_select_tools(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка toggle выбора инструментов - Этап 5
-@tutorial_router.callback_query(F.data.startswith("toggle_tool_"))
-async def toggle_tool_selection(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.TOGGLE_TOOL)
+async def toggle_tool_selection(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Toggle выбор/отмена выбора инструмента"""
     # Получаем данные из состояния
     data = await state.get_data()
@@ -634,8 +872,12 @@ async def toggle_tool_selection(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название инструмента
-    tool_name = callback.data.replace("toggle_tool_", "").replace("_", " ")
+    # Предмет по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    tool_name = item.name
     
     # Toggle выбор инструмента
     if tool_name in selected_tools:
@@ -651,24 +893,14 @@ async def toggle_tool_selection(callback: CallbackQuery, state: FSMContext):
     await state.update_data(selected_tools=selected_tools)
     
     # Получаем инвентарь игрока для обновления клавиатуры
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул", "торцбил"]):
-            tool_items.append(item_name)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    tools = tutorial_db.catalog.of_kind("tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Создаем обновленную клавиатуру
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        # Определяем эмодзи в зависимости от выбора
-        emoji = "✅" if tool_name in selected_tools else "🔘"
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"{emoji} {tool_name}", 
-            callback_data=f"toggle_tool_{tool_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_TOOL, tool_items, selected_tools)
     
     # Проверяем, выбраны ли все обязательные инструменты
     required_tools = ["Канцелярский нож", "Мультитул 3 в 1", "Высечные пробойники"]
@@ -688,15 +920,18 @@ async def toggle_tool_selection(callback: CallbackQuery, state: FSMContext):
     
     updated_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
+    # Ожидаемое качество с новым выбором
+    probabilities = await crafting_quality(callback, "Ремень", [data.get('selected_leather'), data.get('selected_hardware'), *selected_tools])
+    
     # Обновляем сообщение с новой клавиатурой
     try:
-        await callback.message.edit_reply_markup(reply_markup=updated_keyboard)
+        await edit_selection_message(callback, updated_keyboard, probabilities)
     except Exception as e:
         print(f"⚠️ Не удалось обновить клавиатуру: {e}")
         await callback.answer("Обновите сообщение")
 
 # Обработка попытки продолжить без выбора всех инструментов
-@tutorial_router.callback_query(F.data == "tools_not_selected")
+@tutorial_router.on_callback("tools_not_selected")
 async def tools_not_selected(callback: CallbackQuery, state: FSMContext):
     """Обработка попытки продолжить без выбора всех инструментов"""
     # Получаем данные из состояния
@@ -714,7 +949,7 @@ async def tools_not_selected(callback: CallbackQuery, state: FSMContext):
         await callback.answer("✅ Все инструменты выбраны, можно продолжать")
 
 # Обработка подтверждения выбора инструментов - Этап 6
-@tutorial_router.callback_query(F.data == "belt_tools_confirmed")
+@tutorial_router.on_callback("belt_tools_confirmed")
 async def belt_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     """Подтверждение выбора инструментов и переход к сборке - Этап 6"""
     # Получаем данные игрока
@@ -733,7 +968,7 @@ async def belt_tools_confirmed(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_assembly")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_assembly")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -750,20 +985,16 @@ async def belt_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для установки пряжки
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage6_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔩 Установить пряжку", callback_data="belt_install_buckle")]
-    ])
+    stage6_keyboard = inline_keyboard(("🔩 Установить пряжку", "belt_install_buckle"))
     
     # Отправляем сообщение этапа 6
     image_path = "images/tutorial/belt_assembly.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage6_text,
             reply_markup=stage6_keyboard
         )
@@ -778,7 +1009,7 @@ async def belt_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     await callback.answer("✅ Инструменты выбраны!")
 
 # Обработка кнопки "Установить пряжку" - Этап 7
-@tutorial_router.callback_query(F.data == "belt_install_buckle")
+@tutorial_router.on_callback("belt_install_buckle")
 async def belt_install_buckle(callback: CallbackQuery, state: FSMContext):
     """Установка пряжки на ремень - Этап 7"""
     # Получаем данные игрока
@@ -790,7 +1021,7 @@ async def belt_install_buckle(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_quality")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_quality")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -805,20 +1036,16 @@ async def belt_install_buckle(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для оценки результата
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage7_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Оценить результат", callback_data="belt_evaluate_quality")]
-    ])
+    stage7_keyboard = inline_keyboard(("📊 Оценить результат", "belt_evaluate_quality"))
     
     # Отправляем сообщение этапа 7
     image_path = "images/tutorial/belt_buckle.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage7_text,
             reply_markup=stage7_keyboard
         )
@@ -833,7 +1060,7 @@ async def belt_install_buckle(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка кнопки "Оценить результат" - Этап 8
-@tutorial_router.callback_query(F.data == "belt_evaluate_quality")
+@tutorial_router.on_callback("belt_evaluate_quality")
 async def belt_evaluate_quality(callback: CallbackQuery, state: FSMContext):
     """Оценка качества ремня - Этап 8"""
     # Получаем данные игрока
@@ -845,7 +1072,7 @@ async def belt_evaluate_quality(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_sleep")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_belt_sleep")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -858,21 +1085,17 @@ async def belt_evaluate_quality(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение с качеством
     image_path = "images/tutorial/quality_snosnoe.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=quality_text
         )
     except Exception as e:
         await callback.message.answer(quality_text)
     
-    # Ждем 2 секунды и отправляем следующее сообщение
-    await asyncio.sleep(2)
-    
     # Текст после оценки качества
     stage8_text = (
         "«Могло быть и хуже» – подумали вы. Местами резанули лишнего, торцбилом порвали края местами. "
@@ -882,30 +1105,23 @@ async def belt_evaluate_quality(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для перехода ко сну
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage8_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="😴 Отправиться спать", callback_data="belt_go_to_sleep")]
-    ])
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=stage8_text,
-            reply_markup=stage8_keyboard
-        )
-    except Exception as e:
-        await callback.message.answer(
-            stage8_text,
-            reply_markup=stage8_keyboard
-        )
+    stage8_keyboard = inline_keyboard(("😴 Отправиться спать", "belt_go_to_sleep"))
+    
+    # Следующее сообщение придет через 2 секунды, обработчик не ждет
+    await followups.schedule(
+        callback.message.chat.id,
+        stage8_text,
+        photo=image_path,
+        reply_markup=stage8_keyboard,
+        delay=2
+    )
     
     # Устанавливаем следующее состояние
     await state.set_state(TutorialStates.waiting_for_belt_sleep)
     await callback.answer()
 
 # Обработка кнопки "Отправиться спать" - Этап 9
-@tutorial_router.callback_query(F.data == "belt_go_to_sleep")
+@tutorial_router.on_callback("belt_go_to_sleep")
 async def belt_go_to_sleep(callback: CallbackQuery, state: FSMContext):
     """Завершение дня и переход к следующему дню - Этап 9"""
     # Получаем данные игрока
@@ -917,7 +1133,7 @@ async def belt_go_to_sleep(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_shop_return")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_shop_return")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -933,20 +1149,16 @@ async def belt_go_to_sleep(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для перехода в магазин
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage9_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🏪 Отправиться в магазин", callback_data="return_to_shop")]
-    ])
+    stage9_keyboard = inline_keyboard(("🏪 Отправиться в магазин", "return_to_shop"))
     
     # Отправляем сообщение этапа 9
     image_path = "images/tutorial/friends_meeting.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage9_text,
             reply_markup=stage9_keyboard
         )
@@ -961,7 +1173,7 @@ async def belt_go_to_sleep(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка кнопки "Отправиться в магазин" - Этап 10
-@tutorial_router.callback_query(F.data == "return_to_shop")
+@tutorial_router.on_callback("return_to_shop")
 async def return_to_shop(callback: CallbackQuery, state: FSMContext):
     """Возврат в магазин после изготовления ремня - Этап 10"""
     # Получаем данные игрока
@@ -973,7 +1185,7 @@ async def return_to_shop(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_shop_view")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_shop_view")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -989,20 +1201,16 @@ async def return_to_shop(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для просмотра витрины
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage10_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="👀 Посмотреть витрину", callback_data="view_shop_after_tutorial")]
-    ])
+    stage10_keyboard = inline_keyboard(("👀 Посмотреть витрину", "view_shop_after_tutorial"))
     
     # Отправляем сообщение этапа 10
     image_path = "images/tutorial/shop_return.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage10_text,
             reply_markup=stage10_keyboard
         )
@@ -1017,7 +1225,7 @@ async def return_to_shop(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка кнопки "Посмотреть витрину" - Этап 11 - ИСПРАВЛЕННАЯ ВЕРСИЯ
-@tutorial_router.callback_query(F.data == "view_shop_after_tutorial")
+@tutorial_router.on_callback("view_shop_after_tutorial")
 async def view_shop_after_tutorial(callback: CallbackQuery, state: FSMContext):
     """Просмотр витрины магазина после обучения - Этап 11"""
     print("🎯 ОТЛАДКА: view_shop_after_tutorial вызван")
@@ -1031,10 +1239,10 @@ async def view_shop_after_tutorial(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "in_shop_after_tutorial")
+    await tutorial_db.update_tutorial_progress(player_id, "in_shop_after_tutorial")
     
     # Получаем баланс игрока
-    progress = tutorial_db.get_tutorial_progress(player_id)
+    progress = await tutorial_db.get_tutorial_progress(player_id)
     balance = progress[3] if progress else 2000
     
     # Удаляем кнопки из предыдущего сообщения
@@ -1047,45 +1255,19 @@ async def view_shop_after_tutorial(callback: CallbackQuery, state: FSMContext):
     # Текст для этапа 11
     stage11_text = "Добрый день, что вы хотели бы приобрести?"
     
-    # Создаем клавиатуру магазина (ВСЕ товары доступны) с правильными иконками
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    
-    # Получаем ВСЕ категории товаров с правильными иконками
-    all_categories = [
-        ("🔪 Ножи", "shop_after_knives"),
-        ("🕳️ Пробойники", "shop_after_punches"), 
-        ("🔧 Торцбилы", "shop_after_edges"),
-        ("🧵 Материалы", "shop_after_materials"),
-        ("📎 Фурнитура", "shop_after_hardware"),
-        ("🧶 Нитки", "shop_after_threads"),  # Новая категория с новой иконкой
-        ("🧪 Химия", "shop_after_chemistry")  # Новая категория с новой иконкой
-    ]
-    
-    keyboard_buttons = []
-    for category_text, callback_data in all_categories:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=category_text, 
-            callback_data=callback_data
-        )])
-    
-    keyboard_buttons.append([InlineKeyboardButton(
-        text="🚪 Выйти из магазина", 
-        callback_data="shop_after_exit"
-    )])
-    
-    shop_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+    # Клавиатура магазина (ВСЕ товары доступны) с правильными иконками
+    shop_keyboard = get_shop_after_menu_keyboard()
     
     print(f"⌨️ ОТЛАДКА: Создана клавиатура магазина после обучения")
     
     # Отправляем сообщение этапа 11
     image_path = "images/tutorial/shop_after_tutorial.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=f"{stage11_text}\n\n💰 Ваш баланс: {balance} монет",
             reply_markup=shop_keyboard
         )
@@ -1104,112 +1286,41 @@ async def view_shop_after_tutorial(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     print("✅ Состояние установлено: in_shop_after_tutorial")
 
-# Обработка категорий магазина после обучения - Этап 11 - ИСПРАВЛЕННАЯ ВЕРСИЯ
-@tutorial_router.callback_query(F.data.startswith("shop_after_") & ~F.data.in_(["shop_after_exit"]))
-async def show_shop_after_category(callback: CallbackQuery, state: FSMContext):
-    """Показ категорий товаров в магазине после обучения с фильтрацией покупок"""
-    print(f"🎯 ОТЛАДКА: show_shop_after_category вызван с {callback.data}")
-    
-    category_map = {
+# СПИСОК РАЗРЕШЕННЫХ ТОВАРОВ ДЛЯ КАРТХОЛДЕРА
+SHOP_AFTER_ALLOWED_ITEMS = frozenset({
+    "Строчные пробойники PFG",      # категория "Пробойники"
+    "Кожа для галантереи (дешевая)", # категория "Материалы"  
+    "Швейные МосНитки"              # категория "Нитки"
+})
+
+SHOP_AFTER = ShopContext(
+    name="after_tutorial",
+    action=ItemAction.BUY_AFTER,
+    categories={
         "shop_after_knives": "Ножи",
-        "shop_after_punches": "Пробойники", 
+        "shop_after_punches": "Пробойники",
         "shop_after_edges": "Торцбилы",
         "shop_after_materials": "Материалы",
         "shop_after_hardware": "Фурнитура",
         "shop_after_threads": "Нитки",
-        "shop_after_chemistry": "Химия"
-    }
-    
-    category = category_map.get(callback.data)
-    if not category:
-        print(f"❌ Ошибка: неизвестная категория {callback.data}")
-        await callback.answer("❌ Ошибка категории")
-        return
-    
-    print(f"🎯 ОТЛАДКА: Открываем категорию после обучения: {category}")
-    
-    # Получаем данные игрока
-    data = await state.get_data()
-    player_id = data.get('player_id')
-    
-    if not player_id:
-        await callback.answer("❌ Ошибка: персонаж не найден")
-        return
-    
-    # Получаем баланс
-    progress = tutorial_db.get_tutorial_progress(player_id)
-    balance = progress[3] if progress else 2000
-    
-    # Получаем ВСЕ товары категории из БД
-    all_category_items = tutorial_db.get_shop_items_by_category(category)
-    
-    # СПИСОК РАЗРЕШЕННЫХ ТОВАРОВ ДЛЯ КАРТХОЛДЕРА
-    ALLOWED_ITEMS = [
-        "Строчные пробойники PFG",      # категория "Пробойники"
-        "Кожа для галантереи (дешевая)", # категория "Материалы"  
-        "Швейные МосНитки"              # категория "Нитки"
-    ]
-    
-    # Создаем клавиатуру со ВСЕМИ товарами, но с разными callback_data
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    
-    builder = InlineKeyboardBuilder()
-    
-    for item in all_category_items:
-        item_name = item[0]
-        item_price = item[1]
-        
-        can_afford = balance >= item_price
-        is_allowed = item_name in ALLOWED_ITEMS
-        
-        item_text = f"{item_name} - {item_price} монет"
-        
-        if not can_afford:
-            item_text += " ❌"
-        elif not is_allowed:
-            item_text += " 🔒"
-        
-        # Определяем callback_data в зависимости от доступности
-        if not is_allowed:
-            # Товар не разрешен для покупки
-            callback_data = "not_needed"
-        elif not can_afford:
-            # Не хватает денег
-            callback_data = "cant_afford"
-        else:
-            # Можно купить
-            short_name = item_name.lower().replace(' ', '_').replace('(', '').replace(')', '').replace('строчные', 'line').replace('пробойники', 'punch').replace('кожа', 'leather').replace('галантереи', 'galanterey').replace('швейные', 'sewing').replace('моснитки', 'mos').replace('для', 'for')[:20]
-            callback_data = f"buy_after_{short_name}"
-        
-        builder.button(
-            text=item_text,
-            callback_data=callback_data
-        )
-    
-    builder.button(text="🔙 Назад", callback_data="back_to_shop_after_menu")
-    builder.adjust(1)
-    keyboard = builder.as_markup()
-    
-    # Обновляем сообщение
-    try:
-        await callback.message.edit_caption(
-            caption=f"🏪 Магазин - {category}\n\n"
-                   f"💰 Ваш баланс: {balance} монет\n"
-                   f"📋 Все товары (🔒 - сейчас не нужны):\n"
-                   f"Выберите товар:",
-            reply_markup=keyboard
-        )
-        print(f"✅ Категория {category} обновлена (фильтрация покупок применена)")
-    except Exception as e:
-        print(f"❌ Ошибка обновления категории: {e}")
-        await callback.answer("❌ Ошибка обновления")
-        return
-    
-    await state.update_data(current_category=category, player_balance=balance)
-    await callback.answer()
+        "shop_after_chemistry": "Химия",
+    },
+    allowed=SHOP_AFTER_ALLOWED_ITEMS,
+    locked_callback="not_needed",
+    locked_message="❌ Товар не найден",
+    back_callback="back_to_shop_after_menu",
+    hint="📋 Все товары (🔒 - сейчас не нужны):",
+)
+
+# Обработка категорий магазина после обучения - Этап 11
+@tutorial_router.on_callback_prefix("shop_after_")
+async def show_shop_after_category(callback: CallbackQuery, state: FSMContext):
+    """Показ категорий товаров в магазине после обучения"""
+    if await show_shop_category_view(SHOP_AFTER, callback, state):
+        await callback.answer()
 
 # Обработка кнопки "Назад" в магазине после обучения
-@tutorial_router.callback_query(F.data == "back_to_shop_after_menu")
+@tutorial_router.on_callback("back_to_shop_after_menu")
 async def back_to_shop_after_menu(callback: CallbackQuery, state: FSMContext):
     """Возврат в главное меню магазина после обучения - РЕДАКТИРОВАНИЕ текущего сообщения"""
     print("🎯 ОТЛАДКА: back_to_shop_after_menu вызван - редактирование текущего сообщения")
@@ -1218,33 +1329,10 @@ async def back_to_shop_after_menu(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         player_id = data.get('player_id')
         
-        progress = tutorial_db.get_tutorial_progress(player_id)
+        progress = await tutorial_db.get_tutorial_progress(player_id)
         balance = progress[3] if progress else 2000
         
-        # Полный список всех категорий
-        all_categories = [
-            ("🔪 Ножи", "shop_after_knives"),
-            ("🕳️ Пробойники", "shop_after_punches"), 
-            ("🔧 Торцбилы", "shop_after_edges"),
-            ("🧵 Материалы", "shop_after_materials"),
-            ("📎 Фурнитура", "shop_after_hardware"),
-            ("🧶 Нитки", "shop_after_threads"),
-            ("🧪 Химия", "shop_after_chemistry")
-        ]
-        
-        keyboard_buttons = []
-        for category_text, callback_data in all_categories:
-            keyboard_buttons.append([InlineKeyboardButton(
-                text=category_text, 
-                callback_data=callback_data
-            )])
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text="🚪 Выйти из магазина", 
-            callback_data="shop_after_exit"
-        )])
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        keyboard = get_shop_after_menu_keyboard()
         
         # РЕДАКТИРУЕМ текущее сообщение вместо создания нового
         await callback.message.edit_caption(
@@ -1260,163 +1348,23 @@ async def back_to_shop_after_menu(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Произошла ошибка", show_alert=True)
 
 # Обработка нажатия на заблокированные товары в магазине после обучения
-@tutorial_router.callback_query(F.data == "not_needed")
+@tutorial_router.on_callback("not_needed")
 async def not_needed_item(callback: CallbackQuery):
     """Обработка нажатия на ненужные товары"""
     await callback.answer("❌ Сейчас мне это не нужно", show_alert=True)
 
 # Обработка покупки товаров в магазине после обучения
-@tutorial_router.callback_query(F.data.startswith("buy_after_"))
-async def buy_after_tutorial(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.BUY_AFTER)
+async def buy_after_tutorial(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Покупка товаров в магазине после обучения"""
-    print(f"🎯 ОТЛАДКА: buy_after_tutorial вызван с {callback.data}")
-    
-    try:
-        data = await state.get_data()
-        player_id = data.get('player_id')
-        current_category = data.get('current_category', '')
-        
-        if not player_id:
-            await callback.answer("❌ Ошибка: персонаж не найден")
-            return
-        
-        # Получаем короткое название товара из callback_data
-        short_name = callback.data.replace("buy_after_", "")
-        print(f"🛒 ОТЛАДКА: Короткое название товара: {short_name}")
-        
-        # Получаем текущий баланс
-        progress = tutorial_db.get_tutorial_progress(player_id)
-        balance = progress[3] if progress else 2000
-        
-        # Получаем ВСЕ товары категории
-        all_category_items = tutorial_db.get_shop_items_by_category(current_category)
-        print(f"📦 ОТЛАДКА: Все товары в категории {current_category}:")
-        for item in all_category_items:
-            print(f"  - {item[0]}")
-        
-        # Ищем товар по короткому названию
-        short_to_full_map = {
-            "line_punch_pfg": "Строчные пробойники PFG",
-            "leather_for_galanter": "Кожа для галантереи (дешевая)",
-            "leather_galanterey": "Кожа для галантереи (дешевая)", 
-            "sewing_mos": "Швейные МосНитки"
-        }
-
-        full_item_name = short_to_full_map.get(short_name)
-        item_info = None
-        
-        if full_item_name:
-            for item in all_category_items:
-                if item[0] == full_item_name:
-                    item_info = item
-                    break
-        
-        # ЕСЛИ ТОВАР НЕ НАЙДЕН - ВЫХОДИМ
-        if not item_info:
-            print(f"❌ Товар не найден: {short_name}")
-            await callback.answer("❌ Товар не найден")
-            return
-        
-        item_name = item_info[0]
-        item_price = item_info[1]
-        
-        print(f"✅ Найден товар: {item_name} за {item_price} монет")
-        
-        # Проверяем баланс
-        if balance < item_price:
-            await callback.answer("❌ Недостаточно монет!")
-            return
-        
-        # Проверяем инвентарь на дубликаты
-        inventory = tutorial_db.get_tutorial_inventory(player_id)
-        for inv_item in inventory:
-            if len(inv_item) > 0 and inv_item[0] == item_name:
-                await callback.answer("❌ У тебя уже есть этот предмет!")
-                return
-        
-        # Выполняем покупку
-        new_balance = balance - item_price
-        success = tutorial_db.add_to_tutorial_inventory(player_id, item_name, current_category)
-        
-        if success:
-            # Обновляем баланс
-            tutorial_db.update_player_balance(player_id, new_balance)
-            
-            # Обновляем сообщение магазина
-            await update_shop_after_category_message(callback, current_category, new_balance, f"✅ Куплено: {item_name}")
-            
-            await state.update_data(player_balance=new_balance)
-            await callback.answer(f"✅ Куплено: {item_name}")
-            print(f"✅ Успешная покупка: {item_name}")
-        else:
-            await callback.answer("❌ Ошибка при покупке")
-            print(f"❌ Ошибка при добавлении в инвентарь: {item_name}")
-            
-    except Exception as e:
-        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА в buy_after_tutorial: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        await callback.answer("❌ Ошибка при покупке")
-
-# Вспомогательная функция для обновления сообщения магазина после обучения
-async def update_shop_after_category_message(callback: CallbackQuery, category: str, balance: int, status_message: str = ""):
-    """Обновляет сообщение категории магазина после обучения"""
-    all_category_items = tutorial_db.get_shop_items_by_category(category)
-    
-    # ДОБАВЛЯЕМ СПИСОК РАЗРЕШЕННЫХ ТОВАРОВ
-    ALLOWED_ITEMS = [
-        "Строчные пробойники PFG",
-        "Кожа для галантереи (дешевая)", 
-        "Швейные МосНитки"
-    ]
-    
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    
-    builder = InlineKeyboardBuilder()
-    for item in all_category_items:
-        item_name = item[0]
-        item_price = item[1]
-        
-        can_afford = balance >= item_price
-        is_allowed = item_name in ALLOWED_ITEMS  # ПРОВЕРЯЕМ РАЗРЕШЕНИЕ
-        
-        item_text = f"{item_name} - {item_price} монет"
-        
-        if not can_afford:
-            item_text += " ❌"
-        elif not is_allowed:
-            item_text += " 🔒"  # ЗАМОК ДЛЯ НЕРАЗРЕШЕННЫХ ТОВАРОВ
-        
-        # Определяем callback_data в зависимости от доступности
-        if not is_allowed:
-            callback_data = "not_needed"
-        elif not can_afford:
-            callback_data = "cant_afford"
-        else:
-            short_name = item_name.lower().replace(' ', '_').replace('(', '').replace(')', '').replace('строчные', 'line').replace('пробойники', 'punch').replace('кожа', 'leather').replace('галантереи', 'galanterey').replace('швейные', 'sewing').replace('моснитки', 'mos').replace('для', 'for')[:20]
-            callback_data = f"buy_after_{short_name}"
-        
-        builder.button(
-            text=item_text,
-            callback_data=callback_data
-        )
-    
-    builder.button(text="🔙 Назад", callback_data="back_to_shop_after_menu")
-    builder.adjust(1)
-    keyboard = builder.as_markup()
-    
-    caption = f"🏪 Магазин - {category}\n\n"
-    if status_message:
-        caption += f"{status_message}\n"
-    caption += f"💰 Ваш баланс: {balance} монет\nВыберите товар:"
-    
-    await callback.message.edit_caption(
-        caption=caption,
-        reply_markup=keyboard
-    )
+    result = await buy_shop_item(SHOP_AFTER, callback, state, callback_data)
+    if result:
+        category = tutorial_db.catalog.get(callback_data.item_id).category
+        await update_shop_category_message(SHOP_AFTER, callback, category, result.balance, f"✅ Куплено: {result.item_name}")
+        await callback.answer(f"✅ Куплено: {result.item_name}")
 
 # Обработка кнопки "Приступить" для картхолдера - Этап 14 (ПОЛНАЯ ВЕРСИЯ)
-@tutorial_router.callback_query(F.data == "start_holder")
+@tutorial_router.on_callback("start_holder")
 async def start_holder_craft(callback: CallbackQuery, state: FSMContext):
     """Начало изготовления картхолдера - Этап 14"""
     print("🎯 ОТЛАДКА: start_holder_craft вызван")
@@ -1429,7 +1377,7 @@ async def start_holder_craft(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_leather")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_leather")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -1442,44 +1390,16 @@ async def start_holder_craft(callback: CallbackQuery, state: FSMContext):
     stage14_text = "Выберите кожу из которой будете делать изделие"
     
     # Получаем инвентарь игрока (кожи для галантереи)
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    leather_items = [item[0] for item in inventory if any(keyword in item[0].lower() for keyword in ["кожа", "галантерея", "заготовка"])]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    leathers = tutorial_db.catalog.of_kind("leather")
+    leather_items = [item[0] for item in inventory if item[0] in leathers]
     
     print(f"🎒 ОТЛАДКА: Найдены кожи в инвентаре: {leather_items}")
     
     # Создаем клавиатуру с доступными кожами
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    
-    keyboard_buttons = []
-    for item_name in leather_items:
-        # СОЗДАЕМ ПРОСТЫЕ И ПОНЯТНЫЕ КОДЫ ДЛЯ КАЖДОЙ КОЖИ
-        if item_name == "Дешевая ременная заготовка":
-            callback_data = "select_holder_leather_belt_cheap"
-        elif item_name == "Обычная ременная заготовка":
-            callback_data = "select_holder_leather_belt_mid"
-        elif item_name == "Дорогая ременная заготовка":
-            callback_data = "select_holder_leather_belt_pro"
-        elif item_name == "Кожа для галантереи (дешевая)":
-            callback_data = "select_holder_leather_galanterey_cheap"
-        elif item_name == "Кожа для галантереи (средняя)":
-            callback_data = "select_holder_leather_galanterey_mid"
-        elif item_name == "Кожа для галантереи (дорогая)":
-            callback_data = "select_holder_leather_galanterey_pro"
-        elif item_name == "Кожа для сумок (дешевая)":
-            callback_data = "select_holder_leather_bags_cheap"
-        elif item_name == "Кожа для сумок (средняя)":
-            callback_data = "select_holder_leather_bags_mid"
-        elif item_name == "Кожа для сумок (дорогая)":
-            callback_data = "select_holder_leather_bags_pro"
-        else:
-            # Для неизвестных кож используем общий формат
-            short_name = item_name.lower().replace(' ', '_').replace('(', '').replace(')', '')[:15]
-            callback_data = f"select_holder_leather_{short_name}"
+    from aiogram.types import InlineKeyboardMarkup
     
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🧵 {item_name}", 
-            callback_data=callback_data
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_HOLDER_LEATHER, leather_items, "🧵")
     stage14_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
 
     print(f"⌨️ ОТЛАДКА: Создана клавиатура выбора кожи: {[btn[0].text for btn in keyboard_buttons]}")
@@ -1487,13 +1407,12 @@ async def start_holder_craft(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 14
     image_path = "images/tutorial/holder_leather.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage14_text,
             reply_markup=stage14_keyboard
         )
@@ -1512,7 +1431,7 @@ async def start_holder_craft(callback: CallbackQuery, state: FSMContext):
     print("✅ Состояние установлено: waiting_for_holder_leather")
 
 # Обработка выхода из магазина после обучения - Этап 12-13
-@tutorial_router.callback_query(F.data == "shop_after_exit")
+@tutorial_router.on_callback("shop_after_exit")
 async def shop_after_exit(callback: CallbackQuery, state: FSMContext):
     """Выход из магазина после обучения - Этап 12-13"""
     print("🎯 ОТЛАДКА: shop_after_exit вызван")
@@ -1524,8 +1443,9 @@ async def shop_after_exit(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    thread_items = [item[0] for item in inventory if "нитки" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    threads = tutorial_db.catalog.of_kind("thread")
+    thread_items = [item[0] for item in inventory if item[0] in threads]
     
     print(f"🎒 ОТЛАДКА: Проверка ниток в инвентаре: {thread_items}")
     
@@ -1538,7 +1458,7 @@ async def shop_after_exit(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_start")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_start")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -1551,24 +1471,20 @@ async def shop_after_exit(callback: CallbackQuery, state: FSMContext):
     stage13_text = "Закупив все необходимое, вы отправились домой делать картхолдер другу"
     
     # Клавиатура для начала изготовления картхолдера
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     
     # СОЗДАЕМ ПРОСТУЮ КНОПКУ С КОРОТКИМ callback_data
-    stage13_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔨 Приступить", callback_data="start_holder")]
-    ])
+    stage13_keyboard = inline_keyboard(("🔨 Приступить", "start_holder"))
     
     print("⌨️ Создана кнопка 'Приступить' с callback_data: start_holder")
     
     # Отправляем сообщение этапа 13
     image_path = "images/tutorial/holder_start.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage13_text,
             reply_markup=stage13_keyboard
         )
@@ -1587,8 +1503,8 @@ async def shop_after_exit(callback: CallbackQuery, state: FSMContext):
     print("✅ Состояние установлено: waiting_for_holder_start")
 
 # Обработка выбора кожи для картхолдера - Этап 15 - ИСПРАВЛЕННАЯ ВЕРСИЯ
-@tutorial_router.callback_query(F.data.startswith("select_holder_leather_"))
-async def select_holder_leather(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_HOLDER_LEATHER)
+async def select_holder_leather(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор кожи для картхолдера - Этап 15"""
     print("🎯 ОТЛАДКА: select_holder_leather вызван")
     
@@ -1599,32 +1515,17 @@ async def select_holder_leather(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем код кожи из callback_data
-    leather_code = callback.data.replace("select_holder_leather_", "")
-    print(f"🎒 ОТЛАДКА: Получен код кожи: '{leather_code}'")
-    
-    # ПРОСТАЯ ПРОВЕРКА ПО СОДЕРЖАНИЮ НАЗВАНИЯ
-    if "galanterey" in leather_code:
-        # Это галантерейная кожа - подходит
-        leather_name = "Кожа для галантереи"
-        if "cheap" in leather_code:
-            leather_name += " (дешевая)"
-        elif "mid" in leather_code:
-            leather_name += " (средняя)" 
-        elif "pro" in leather_code:
-            leather_name += " (дорогая)"
-    elif "belt" in leather_code or "ременная" in leather_code:
-        # Это ременная заготовка - НЕ подходит
-        await callback.answer("❌ Этот материал не подходит для картхолдера! Выберите галантерейную кожу.", show_alert=True)
+    # Кожа по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Неизвестный материал", show_alert=True)
         return
-    elif "bags" in leather_code or "сумок" in leather_code:
-        # Это кожа для сумок - НЕ подходит  
+    
+    # Для картхолдера подходит только галантерейная кожа
+    if not item.name.startswith("Кожа для галантереи"):
         await callback.answer("❌ Этот материал не подходит для картхолдера! Выберите галантерейную кожу.", show_alert=True)
         return
-    else:
-        # Неизвестный материал
-        await callback.answer("❌ Неизвестный материал", show_alert=True)
-        return
+    leather_name = item.name
     
     print(f"🎒 ОТЛАДКА: Определена кожа: {leather_name}")
     
@@ -1632,7 +1533,7 @@ async def select_holder_leather(callback: CallbackQuery, state: FSMContext):
     await state.update_data(selected_holder_leather=leather_name)
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_tools")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_tools")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -1648,14 +1549,11 @@ async def select_holder_leather(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
     
     # Фильтруем только инструменты
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул", "торцбил"]):
-            tool_items.append(item_name)
+    tools = tutorial_db.catalog.of_kind("tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Инициализируем список выбранных инструментов в состоянии
     await state.update_data(selected_holder_tools=[])
@@ -1663,24 +1561,7 @@ async def select_holder_leather(callback: CallbackQuery, state: FSMContext):
     # Создаем клавиатуру для выбора инструментов
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        # Используем простые callback_data
-        if tool_name == "Канцелярский нож":
-            callback_data = "toggle_holder_tool_knife"
-        elif tool_name == "Строчные пробойники PFG":
-            callback_data = "toggle_holder_tool_punch"
-        elif tool_name == "Мультитул 3 в 1":
-            callback_data = "toggle_holder_tool_multitool"
-        elif tool_name == "Высечные пробойники":
-            callback_data = "toggle_holder_tool_punch_set"
-        else:
-            callback_data = f"toggle_holder_tool_{tool_name.replace(' ', '_').lower()[:15]}"
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🔘 {tool_name}", 
-            callback_data=callback_data
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_HOLDER_TOOL, tool_items)
     
     # Кнопка продолжения (пока неактивна)
     keyboard_buttons.append([InlineKeyboardButton(
@@ -1692,13 +1573,12 @@ async def select_holder_leather(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 15
     image_path = "images/tutorial/holder_tools.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage15_text,
             reply_markup=tools_keyboard
         )
@@ -1717,8 +1597,8 @@ async def select_holder_leather(callback: CallbackQuery, state: FSMContext):
     print("✅ Состояние установлено: waiting_for_holder_tools")
 
 # Обработка toggle выбора инструментов для картхолдера - Этап 15
-@tutorial_router.callback_query(F.data.startswith("toggle_holder_tool_"))
-async def toggle_holder_tool_selection(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.TOGGLE_HOLDER_TOOL)
+async def toggle_holder_tool_selection(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Toggle выбор/отмена выбора инструмента для картхолдера"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -1728,25 +1608,12 @@ async def toggle_holder_tool_selection(callback: CallbackQuery, state: FSMContex
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # ИСПРАВЛЕНИЕ: Получаем код инструмента и преобразуем в полное название
-    tool_code = callback.data.replace("toggle_holder_tool_", "")
-    print(f"🔧 ОТЛАДКА: Получен код инструмента: '{tool_code}'")
-    
-    # ПРЕОБРАЗУЕМ КОД В ПОЛНОЕ НАЗВАНИЕ
-    tool_map = {
-        "knife": "Канцелярский нож",
-        "punch": "Строчные пробойники PFG", 
-        "multitool": "Мультитул 3 в 1",
-        "punch_set": "Высечные пробойники"
-    }
-    
-    # Получаем полное название инструмента
-    tool_name = tool_map.get(tool_code)
-    if not tool_name:
-        # Если код не найден, используем как есть (для других инструментов)
-        tool_name = tool_code.replace('_', ' ')
-    
-    print(f"🔧 ОТЛАДКА: Преобразовано в: '{tool_name}'")
+    # Предмет по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    tool_name = item.name
     
     # Toggle выбор инструмента
     if tool_name in selected_tools:
@@ -1760,23 +1627,14 @@ async def toggle_holder_tool_selection(callback: CallbackQuery, state: FSMContex
     await state.update_data(selected_holder_tools=selected_tools)
     
     # Получаем инвентарь игрока для обновления клавиатуры
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул", "торцбил"]):
-            tool_items.append(item_name)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    tools = tutorial_db.catalog.of_kind("tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Создаем обновленную клавиатуру
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        emoji = "✅" if tool_name in selected_tools else "🔘"
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"{emoji} {tool_name}", 
-            callback_data=f"toggle_holder_tool_{tool_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_HOLDER_TOOL, tool_items, selected_tools)
     
     # Проверяем выбранные инструменты
     required_tools = ["Канцелярский нож", "Строчные пробойники PFG", "Мультитул 3 в 1"]
@@ -1807,15 +1665,18 @@ async def toggle_holder_tool_selection(callback: CallbackQuery, state: FSMContex
     
     updated_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
+    # Ожидаемое качество с новым выбором
+    probabilities = await crafting_quality(callback, "Картхолдер", [data.get('selected_holder_leather'), *selected_tools])
+    
     # Обновляем сообщение с новой клавиатурой
     try:
-        await callback.message.edit_reply_markup(reply_markup=updated_keyboard)
+        await edit_selection_message(callback, updated_keyboard, probabilities)
     except Exception as e:
         print(f"⚠️ Не удалось обновить клавиатуру: {e}")
         await callback.answer("Обновите сообщение")
 
 # Обработка попытки продолжить без правильного выбора инструментов
-@tutorial_router.callback_query(F.data == "holder_tools_not_selected")
+@tutorial_router.on_callback("holder_tools_not_selected")
 async def holder_tools_not_selected(callback: CallbackQuery, state: FSMContext):
     """Обработка попытки продолжить без правильного выбора инструментов"""
     data = await state.get_data()
@@ -1836,7 +1697,7 @@ async def holder_tools_not_selected(callback: CallbackQuery, state: FSMContext):
         await callback.answer("✅ Все инструменты выбраны правильно")
 
 # Обработка подтверждения выбора инструментов для картхолдера - Этап 16
-@tutorial_router.callback_query(F.data == "holder_tools_confirmed")
+@tutorial_router.on_callback("holder_tools_confirmed")
 async def holder_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     """Подтверждение выбора инструментов для картхолдера - Этап 16"""
     data = await state.get_data()
@@ -1860,7 +1721,7 @@ async def holder_tools_confirmed(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_threads")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_threads")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -1878,22 +1739,16 @@ async def holder_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока (нитки)
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    thread_items = [item[0] for item in inventory if "нитки" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    threads = tutorial_db.catalog.of_kind("thread")
+    thread_items = [item[0] for item in inventory if item[0] in threads]
     
     print(f"🎒 ОТЛАДКА: Найдены нитки в инвентаре: {thread_items}")
     
     # СОЗДАЕМ КЛАВИАТУРУ С ДОСТУПНЫМИ НИТКАМИ
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    from aiogram.types import InlineKeyboardMarkup
     
-    keyboard_buttons = []
-    for item_name in thread_items:
-        # Используем короткие callback_data
-        short_name = item_name.lower().replace(' ', '_').replace('(', '').replace(')', '').replace('швейные', 'sewing').replace('моснитки', 'mos')[:20]
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🧵 {item_name}", 
-            callback_data=f"select_thread_{short_name}"
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_HOLDER_THREAD, thread_items, "🧵")
     
     stage16_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
@@ -1901,13 +1756,12 @@ async def holder_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 16
     image_path = "images/tutorial/holder_stitch.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage16_text,
             reply_markup=stage16_keyboard
         )
@@ -1926,8 +1780,8 @@ async def holder_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     print("✅ Состояние установлено: waiting_for_holder_threads")
 
 # Обработка выбора ниток для картхолдера - Этап 17
-@tutorial_router.callback_query(F.data.startswith("select_thread_"))
-async def select_holder_threads(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_HOLDER_THREAD)
+async def select_holder_threads(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор ниток для картхолдера - Этап 17"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -1936,11 +1790,15 @@ async def select_holder_threads(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название выбранных ниток
-    thread_name = callback.data.replace("select_thread_", "").replace("_", " ")
+    # Нитки по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    thread_name = item.name
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_quality")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_quality")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -1957,20 +1815,16 @@ async def select_holder_threads(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для оценки результата
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage17_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Оценить результат", callback_data="holder_evaluate_quality")]
-    ])
+    stage17_keyboard = inline_keyboard(("📊 Оценить результат", "holder_evaluate_quality"))
     
     # Отправляем сообщение этапа 17
     image_path = "images/tutorial/holder_quality.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage17_text,
             reply_markup=stage17_keyboard
         )
@@ -1985,7 +1839,7 @@ async def select_holder_threads(callback: CallbackQuery, state: FSMContext):
     await callback.answer(f"✅ Выбрано: {thread_name}")
 
 # Обработка оценки качества картхолдера - Этап 18
-@tutorial_router.callback_query(F.data == "holder_evaluate_quality")
+@tutorial_router.on_callback("holder_evaluate_quality")
 async def holder_evaluate_quality(callback: CallbackQuery, state: FSMContext):
     """Оценка качества картхолдера - Этап 18"""
     data = await state.get_data()
@@ -1996,7 +1850,7 @@ async def holder_evaluate_quality(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_gift")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_gift")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -2004,51 +1858,33 @@ async def holder_evaluate_quality(callback: CallbackQuery, state: FSMContext):
     except:
         pass
 
-    # ДОБАВЛЯЕМ ЗАДЕРЖКУ 2 СЕКУНДЫ
-    await asyncio.sleep(2)
-
     # Сообщение с качеством
     quality_text = "Качество заказа – *Обычное*"
     
     # Отправляем сообщение с качеством
     image_path = "images/tutorial/quality_ordinary.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=quality_text
-        )
-    except Exception as e:
-        await callback.message.answer(quality_text)
+    # Оба сообщения приходят через 2 секунды, обработчик не ждет
+    await followups.schedule(callback.message.chat.id, quality_text, photo=image_path, delay=2)
     
     # Клавиатура для подарка
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    quality_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎁 Подарить холдер", callback_data="holder_gift")]
-    ])
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption="Нажмите чтобы подарить картхолдер другу",
-            reply_markup=quality_keyboard
-        )
-    except Exception as e:
-        await callback.message.answer(
-            "Нажмите чтобы подарить картхолдер другу",
-            reply_markup=quality_keyboard
-        )
+    quality_keyboard = inline_keyboard(("🎁 Подарить холдер", "holder_gift"))
+    
+    await followups.schedule(
+        callback.message.chat.id,
+        "Нажмите чтобы подарить картхолдер другу",
+        photo=image_path,
+        reply_markup=quality_keyboard,
+        delay=2
+    )
     
     # Устанавливаем следующее состояние
     await state.set_state(TutorialStates.waiting_for_holder_gift)
     await callback.answer()
 
 # Обработка подарка картхолдера и завершение - Этап 19
-@tutorial_router.callback_query(F.data == "holder_gift")
+@tutorial_router.on_callback("holder_gift")
 async def holder_gift(callback: CallbackQuery, state: FSMContext):
     """Подарок картхолдера и завершение обучения - Этап 19"""
     data = await state.get_data()
@@ -2059,13 +1895,13 @@ async def holder_gift(callback: CallbackQuery, state: FSMContext):
         return
     
     # Начисляем награду 2000 монет
-    progress = tutorial_db.get_tutorial_progress(player_id)
+    progress = await tutorial_db.get_tutorial_progress(player_id)
     current_balance = progress[3] if progress else 2000
     new_balance = current_balance + 2000
-    tutorial_db.update_player_balance(player_id, new_balance)
+    await tutorial_db.update_player_balance(player_id, new_balance)
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_final")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_holder_final")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -2081,20 +1917,16 @@ async def holder_gift(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для перехода в магазин (задел для третьей части)
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    stage19_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🏪 В магазин", callback_data="holder_to_shop")]
-    ])
+    stage19_keyboard = inline_keyboard(("🏪 В магазин", "holder_to_shop"))
     
     # Отправляем сообщение этапа 19
     image_path = "images/tutorial/holder_final.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage19_text,
             reply_markup=stage19_keyboard
         )
@@ -2113,7 +1945,7 @@ async def holder_gift(callback: CallbackQuery, state: FSMContext):
 # =============================================================================
 
 # Обработка кнопки "В магазин" из финала картхолдера - Этап 20
-@tutorial_router.callback_query(F.data == "holder_to_shop")
+@tutorial_router.on_callback("holder_to_shop")
 async def holder_to_shop(callback: CallbackQuery, state: FSMContext):
     """Переход в магазин для покупки материалов для сумки - Этап 20"""
     print("🎯 ОТЛАДКА: holder_to_shop вызван - начало третьей части")
@@ -2126,7 +1958,7 @@ async def holder_to_shop(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_start")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_start")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -2143,19 +1975,16 @@ async def holder_to_shop(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для перехода в магазин
-    stage20_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛒 Купить материалы для сумки", callback_data="bag_go_to_shop")]
-    ])
+    stage20_keyboard = inline_keyboard(("🛒 Купить материалы для сумки", "bag_go_to_shop"))
     
     # Отправляем сообщение этапа 20
     image_path = "images/tutorial/bag_start.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage20_text,
             reply_markup=stage20_keyboard
         )
@@ -2170,7 +1999,7 @@ async def holder_to_shop(callback: CallbackQuery, state: FSMContext):
 
 # Обработка кнопки "Купить материалы для сумки" - Этап 21
 # Обработка кнопки "Купить материалы для сумки" - Этап 21
-@tutorial_router.callback_query(F.data == "bag_go_to_shop")
+@tutorial_router.on_callback("bag_go_to_shop")
 async def bag_go_to_shop(callback: CallbackQuery, state: FSMContext):
     """Магазин для покупки материалов сумки - Этап 21"""
     print("🎯 ОТЛАДКА: bag_go_to_shop вызван")
@@ -2183,10 +2012,10 @@ async def bag_go_to_shop(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "in_shop_bag_materials")
+    await tutorial_db.update_tutorial_progress(player_id, "in_shop_bag_materials")
     
     # Получаем баланс
-    progress = tutorial_db.get_tutorial_progress(player_id)
+    progress = await tutorial_db.get_tutorial_progress(player_id)
     balance = progress[3] if progress else 2000
     
     # Удаляем кнопки из предыдущего сообщения
@@ -2198,41 +2027,16 @@ async def bag_go_to_shop(callback: CallbackQuery, state: FSMContext):
     # Текст для этапа 21
     stage21_text = "Для изготовления сумки вам понадобятся фурнитура и воск. Выберите категорию:"
     
-    # Клавиатура магазина (ПОЛНЫЙ КАТАЛОГ КАК В ЭТАПЕ 10)
-    all_categories = [
-        ("🔪 Ножи", "shop_bag_knives"),
-        ("🕳️ Пробойники", "shop_bag_punches"), 
-        ("🔧 Торцбилы", "shop_bag_edges"),
-        ("🧵 Материалы", "shop_bag_materials"),
-        ("📎 Фурнитура", "shop_bag_hardware"),
-        ("🧶 Нитки", "shop_bag_threads"),
-        ("🧪 Химия", "shop_bag_chemistry")
-    ]
-    
-    keyboard_buttons = []
-    for category_text, callback_data in all_categories:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=category_text, 
-            callback_data=callback_data
-        )])
-    
-    # Кнопка "Выйти из магазина"
-    keyboard_buttons.append([InlineKeyboardButton(
-        text="🚪 Выйти из магазина", 
-        callback_data="bag_shop_exit"
-    )])
-    
-    shop_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+    shop_keyboard = get_bag_shop_menu_keyboard()
     
     # Отправляем сообщение этапа 21
     image_path = "images/tutorial/bag_shop.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=f"{stage21_text}\n\n💰 Ваш баланс: {balance} монет",
             reply_markup=shop_keyboard
         )
@@ -2246,252 +2050,70 @@ async def bag_go_to_shop(callback: CallbackQuery, state: FSMContext):
     await state.update_data(player_balance=balance)
     await callback.answer()
 
-# Обработка категорий магазина для сумки
-@tutorial_router.callback_query(F.data.startswith("shop_bag_") & ~F.data.in_(["bag_shop_exit"]))
-async def show_bag_shop_category(callback: CallbackQuery, state: FSMContext):
-    """Показ категорий товаров для сумки"""
-    print(f"🎯 ОТЛАДКА: show_bag_shop_category вызван с {callback.data}")
-    
-    category_map = {
+# СПИСОК РАЗРЕШЕННЫХ ТОВАРОВ ДЛЯ СУМКИ (этап 21)
+BAG_SHOP_ALLOWED_ITEMS = frozenset({
+    "Дешевая фурнитура для сумок",  # категория "Фурнитура"
+    "Пчелиный воск",                # категория "Химия"
+})
+
+SHOP_BAG = ShopContext(
+    name="bag",
+    action=ItemAction.BUY_BAG,
+    categories={
         "shop_bag_knives": "Ножи",
-        "shop_bag_punches": "Пробойники", 
+        "shop_bag_punches": "Пробойники",
         "shop_bag_edges": "Торцбилы",
         "shop_bag_materials": "Материалы",
         "shop_bag_hardware": "Фурнитура",
         "shop_bag_threads": "Нитки",
-        "shop_bag_chemistry": "Химия"
-    }
-    
-    category = category_map.get(callback.data)
-    if not category:
-        await callback.answer("❌ Ошибка категории")
-        return
-    
-    data = await state.get_data()
-    player_id = data.get('player_id')
-    
-    if not player_id:
-        await callback.answer("❌ Ошибка: персонаж не найден")
-        return
-    
-    # Получаем баланс
-    progress = tutorial_db.get_tutorial_progress(player_id)
-    balance = progress[3] if progress else 2000
-    
-    # Получаем ВСЕ товары категории из БД
-    all_category_items = tutorial_db.get_shop_items_by_category(category)
-    
-    # СПИСОК РАЗРЕШЕННЫХ ТОВАРОВ ДЛЯ СУМКИ (этап 21)
-    ALLOWED_ITEMS_STAGE_21 = [
-        "Дешевая фурнитура для сумок",  # категория "Фурнитура"
-        "Пчелиный воск"                 # категория "Химия"
-    ]
-    
-    # Создаем клавиатуру со ВСЕМИ товарами, но с разными callback_data
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    
-    builder = InlineKeyboardBuilder()
-    
-    for item in all_category_items:
-        item_name = item[0]
-        item_price = item[1]
-        
-        can_afford = balance >= item_price
-        is_allowed = item_name in ALLOWED_ITEMS_STAGE_21
-        
-        item_text = f"{item_name} - {item_price} монет"
-        
-        if not can_afford:
-            item_text += " ❌"
-        elif not is_allowed:
-            item_text += " 🔒"
-        
-        # Определяем callback_data в зависимости от доступности
-        if not is_allowed:
-            # Товар не разрешен для покупки
-            callback_data = "not_needed"
-        elif not can_afford:
-            # Не хватает денег
-            callback_data = "cant_afford"
-        else:
-            if item_name == "Дешевая фурнитура для сумок":
-                callback_data = "buy_bag_cheap_bags_hardware"
-            elif item_name == "Пчелиный воск":
-                callback_data = "buy_bag_beeswax"
-            else:
-                # Для других товаров (на всякий случай)
-                short_name = item_name.lower().replace(' ', '_')[:20]
-                callback_data = f"buy_bag_{short_name}"
-        
-        builder.button(
-            text=item_text,
-            callback_data=callback_data
-        )
-    
-    
-    builder.button(text="🔙 Назад", callback_data="back_to_bag_shop_menu")
-    builder.adjust(1)
-    keyboard = builder.as_markup()
-    
-    # Обновляем сообщение
-    try:
-        await callback.message.edit_caption(
-            caption=f"🏪 Магазин - {category}\n\n💰 Ваш баланс: {balance} монет\n📋 Все товары (🔒 - сейчас не нужны):\nВыберите товар:",
-            reply_markup=keyboard
-        )
-        print(f"✅ Категория {category} обновлена")
-    except Exception as e:
-        print(f"❌ Ошибка обновления категории: {e}")
-        await callback.answer("❌ Ошибка обновления")
-        return
-    
-    await state.update_data(current_category=category, player_balance=balance)
-    await callback.answer()
+        "shop_bag_chemistry": "Химия",
+    },
+    allowed=BAG_SHOP_ALLOWED_ITEMS,
+    locked_callback="not_needed",
+    locked_message="❌ Товар не найден",
+    back_callback="back_to_bag_shop_menu",
+    hint="📋 Все товары (🔒 - сейчас не нужны):",
+)
 
-# Обработка покупки товаров для сумки - ДОБАВИТЬ ЭТОТ КОД
-@tutorial_router.callback_query(F.data.startswith("buy_bag_"))
-async def buy_bag_item(callback: CallbackQuery, state: FSMContext):
+# Обработка категорий магазина для сумки
+@tutorial_router.on_callback_prefix("shop_bag_")
+async def show_bag_shop_category(callback: CallbackQuery, state: FSMContext):
+    """Показ категорий товаров для сумки"""
+    if await show_shop_category_view(SHOP_BAG, callback, state):
+        await callback.answer()
+
+# Обработка покупки товаров для сумки
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.BUY_BAG)
+async def buy_bag_item(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Покупка товаров для сумки"""
-    print(f"🎯 ОТЛАДКА: buy_bag_item вызван с {callback.data}")
-    
-    try:
-        data = await state.get_data()
-        player_id = data.get('player_id')
-        current_category = data.get('current_category', '')
-        
-        if not player_id:
-            await callback.answer("❌ Ошибка: персонаж не найден")
-            return
-        
-        # Получаем callback_data
-        callback_data = callback.data.replace("buy_bag_", "")
-        print(f"🛒 ОТЛАДКА: Callback_data товара: '{callback_data}'")
-        
-        # Получаем текущий баланс
-        progress = tutorial_db.get_tutorial_progress(player_id)
-        balance = progress[3] if progress else 2000
-        
-        # Получаем ВСЕ товары категории
-        all_category_items = tutorial_db.get_shop_items_by_category(current_category)
-        print(f"📦 ОТЛАДКА: Все товары в категории {current_category}:")
-        for item in all_category_items:
-            print(f"  - {item[0]}")
-        
-        # Прямое сопоставление callback_data с полными названиями
-        callback_to_item_map = {
-            "cheap_bags_hardware": "Дешевая фурнитура для сумок",
-            "beeswax": "Пчелиный воск"
-        }
-        
-        # Ищем товар по полному названию
-        full_item_name = callback_to_item_map.get(callback_data)
-        item_info = None
-        
-        if full_item_name:
-            for item in all_category_items:
-                if item[0] == full_item_name:
-                    item_info = item
-                    break
-        
-        if not item_info:
-            print(f"❌ Товар не найден: {callback_data}")
-            await callback.answer("❌ Товар не найден")
-            return
-        
-        item_name = item_info[0]
-        item_price = item_info[1]
-        
-        print(f"✅ Найден товар: {item_name} за {item_price} монет")
-        
-        # Проверяем баланс
-        if balance < item_price:
-            await callback.answer("❌ Недостаточно монет!")
-            return
-        
-        # Проверяем инвентарь на дубликаты
-        inventory = tutorial_db.get_tutorial_inventory(player_id)
-        for inv_item in inventory:
-            if len(inv_item) > 0 and inv_item[0] == item_name:
-                await callback.answer("❌ У тебя уже есть этот предмет!")
-                return
-        
-        # Выполняем покупку
-        new_balance = balance - item_price
-        success = tutorial_db.add_to_tutorial_inventory(player_id, item_name, current_category)
-        
-        if success:
-            # Обновляем баланс
-            tutorial_db.update_player_balance(player_id, new_balance)
-            
-            # Обновляем сообщение магазина
-            await back_to_bag_shop_menu(callback, state)
-            
-            await state.update_data(player_balance=new_balance)
-            await callback.answer(f"✅ Куплено: {item_name}")
-            print(f"✅ Успешная покупка: {item_name}")
-        else:
-            await callback.answer("❌ Ошибка при покупке")
-            print(f"❌ Ошибка при добавлении в инвентарь: {item_name}")
-            
-    except Exception as e:
-        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА в buy_bag_item: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        await callback.answer("❌ Ошибка при покупке")
+    result = await buy_shop_item(SHOP_BAG, callback, state, callback_data)
+    if result:
+        # Возвращаемся в меню магазина с новым балансом
+        await show_bag_shop_menu(callback, result.balance)
+        await callback.answer(f"✅ Куплено: {result.item_name}")
+
+# Главное меню магазина сумки по известному балансу
+async def show_bag_shop_menu(callback: CallbackQuery, balance):
+    await callback.message.edit_caption(
+        caption=f"Для изготовления сумки вам понадобятся фурнитура и воск. Выберите категорию:\n\n💰 Ваш баланс: {balance} монет",
+        reply_markup=get_bag_shop_menu_keyboard()
+    )
 
 # Обработка кнопки "Назад" в магазине сумки
-@tutorial_router.callback_query(F.data == "back_to_bag_shop_menu")
+@tutorial_router.on_callback("back_to_bag_shop_menu")
 async def back_to_bag_shop_menu(callback: CallbackQuery, state: FSMContext):
     """Возврат в главное меню магазина сумки"""
-    print("🎯 ОТЛАДКА: back_to_bag_shop_menu вызван")
-    
     try:
         data = await state.get_data()
-        player_id = data.get('player_id')
-        
-        progress = tutorial_db.get_tutorial_progress(player_id)
-        balance = progress[3] if progress else 2000
-        
-        # Полный каталог категорий
-        all_categories = [
-            ("🔪 Ножи", "shop_bag_knives"),
-            ("🕳️ Пробойники", "shop_bag_punches"), 
-            ("🔧 Торцбилы", "shop_bag_edges"),
-            ("🧵 Материалы", "shop_bag_materials"),
-            ("📎 Фурнитура", "shop_bag_hardware"),
-            ("🧶 Нитки", "shop_bag_threads"),
-            ("🧪 Химия", "shop_bag_chemistry")
-        ]
-        
-        keyboard_buttons = []
-        for category_text, callback_data in all_categories:
-            keyboard_buttons.append([InlineKeyboardButton(
-                text=category_text, 
-                callback_data=callback_data
-            )])
-        
-        # Кнопка "Выйти из магазина"
-        keyboard_buttons.append([InlineKeyboardButton(
-            text="🚪 Выйти из магазина", 
-            callback_data="bag_shop_exit"
-        )])
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-        
-        await callback.message.edit_caption(
-            caption=f"Для изготовления сумки вам понадобятся фурнитура и воск. Выберите категорию:\n\n💰 Ваш баланс: {balance} монет",
-            reply_markup=keyboard
-        )
-        
-        print("✅ Успешный возврат в главное меню магазина сумки")
+        balance = await shop_service.balance(SHOP_BAG, data.get('player_id'))
+        await show_bag_shop_menu(callback, balance)
         await callback.answer()
-        
     except Exception as e:
         print(f"❌ Ошибка в back_to_bag_shop_menu: {e}")
         await callback.answer("❌ Произошла ошибка", show_alert=True)
 
 # Обработка кнопки "Выйти из магазина" для сумки - Этап 21
-@tutorial_router.callback_query(F.data == "bag_shop_exit")
+@tutorial_router.on_callback("bag_shop_exit")
 async def bag_shop_exit(callback: CallbackQuery, state: FSMContext):
     """Выход из магазина с проверкой покупок - Этап 21"""
     print("🎯 ОТЛАДКА: bag_shop_exit вызван")
@@ -2504,7 +2126,7 @@ async def bag_shop_exit(callback: CallbackQuery, state: FSMContext):
         return
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
     inventory_items = [item[0] for item in inventory]
     
     # Обязательные товары для этапа 21
@@ -2530,7 +2152,7 @@ async def bag_shop_exit(callback: CallbackQuery, state: FSMContext):
     
     # Все товары куплены - можно выходить
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_materials_selection")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_materials_selection")
     
     # Редактируем сообщение магазина
     await callback.message.edit_caption(
@@ -2544,7 +2166,7 @@ async def bag_shop_exit(callback: CallbackQuery, state: FSMContext):
     await bag_go_home(callback, state)
 
 # Обработка кнопки "Вернуться домой" - Этап 22
-@tutorial_router.callback_query(F.data == "bag_go_home")
+@tutorial_router.on_callback("bag_go_home")
 async def bag_go_home(callback: CallbackQuery, state: FSMContext):
     """Начало мини-игры изготовления сумки - Этап 22"""
     print("🎯 ОТЛАДКА: bag_go_home вызван")
@@ -2557,7 +2179,7 @@ async def bag_go_home(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_materials_selection")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_materials_selection")
     
     # Удаляем кнопки из предыдущего сообщения
     try:
@@ -2572,19 +2194,15 @@ async def bag_go_home(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    material_items = [item[0] for item in inventory if any(keyword in item[0].lower() for keyword in ["кожа", "фурнитура"])]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    materials = tutorial_db.catalog.with_role("bag_material")
+    material_items = [item[0] for item in inventory if item[0] in materials]
     
     # Инициализируем список выбранных материалов
     await state.update_data(selected_bag_materials=[])
     
     # Создаем клавиатуру выбора материалов
-    keyboard_buttons = []
-    for item_name in material_items:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🔘 {item_name}", 
-            callback_data=f"toggle_bag_material_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_MATERIAL, material_items)
     
     # Кнопка продолжения
     keyboard_buttons.append([InlineKeyboardButton(
@@ -2596,13 +2214,12 @@ async def bag_go_home(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 22
     image_path = "images/tutorial/bag_materials.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage22_text,
             reply_markup=materials_keyboard
         )
@@ -2616,8 +2233,8 @@ async def bag_go_home(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка toggle выбора материалов для сумки - Этап 22
-@tutorial_router.callback_query(F.data.startswith("toggle_bag_material_"))
-async def toggle_bag_material_selection(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.TOGGLE_BAG_MATERIAL)
+async def toggle_bag_material_selection(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Toggle выбор материалов для сумки"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -2627,8 +2244,12 @@ async def toggle_bag_material_selection(callback: CallbackQuery, state: FSMConte
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название материала
-    material_name = callback.data.replace("toggle_bag_material_", "").replace("_", " ")
+    # Предмет по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    material_name = item.name
     
     # Toggle выбор материала
     if material_name in selected_materials:
@@ -2642,17 +2263,12 @@ async def toggle_bag_material_selection(callback: CallbackQuery, state: FSMConte
     await state.update_data(selected_bag_materials=selected_materials)
     
     # Получаем инвентарь для обновления клавиатуры
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    material_items = [item[0] for item in inventory if any(keyword in item[0].lower() for keyword in ["кожа", "фурнитура"])]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    materials = tutorial_db.catalog.with_role("bag_material")
+    material_items = [item[0] for item in inventory if item[0] in materials]
     
     # Создаем обновленную клавиатуру
-    keyboard_buttons = []
-    for item_name in material_items:
-        emoji = "✅" if item_name in selected_materials else "🔘"
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"{emoji} {item_name}", 
-            callback_data=f"toggle_bag_material_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_MATERIAL, material_items, selected_materials)
     
     # Проверяем выбранные материалы
     required_materials = ["Кожа для сумок (дешевая)", "Дешевая фурнитура для сумок"]
@@ -2678,7 +2294,7 @@ async def toggle_bag_material_selection(callback: CallbackQuery, state: FSMConte
         await callback.answer("Обновите сообщение")
 
 # Обработка попытки продолжить без выбора материалов
-@tutorial_router.callback_query(F.data == "bag_materials_not_selected")
+@tutorial_router.on_callback("bag_materials_not_selected")
 async def bag_materials_not_selected(callback: CallbackQuery, state: FSMContext):
     """Обработка попытки продолжить без выбора материалов"""
     data = await state.get_data()
@@ -2694,7 +2310,7 @@ async def bag_materials_not_selected(callback: CallbackQuery, state: FSMContext)
         await callback.answer("✅ Все материалы выбраны")
 
 # Обработка подтверждения выбора материалов - Этап 23
-@tutorial_router.callback_query(F.data == "bag_materials_confirmed")
+@tutorial_router.on_callback("bag_materials_confirmed")
 async def bag_materials_confirmed(callback: CallbackQuery, state: FSMContext):
     """Подтверждение выбора материалов - переход к выбору инструментов - Этап 23"""
     data = await state.get_data()
@@ -2712,7 +2328,7 @@ async def bag_materials_confirmed(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_tools_selection")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_tools_selection")
     
     # Удаляем кнопки
     try:
@@ -2727,35 +2343,15 @@ async def bag_materials_confirmed(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул"]):
-            tool_items.append(item_name)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    tools = tutorial_db.catalog.with_role("bag_tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Инициализируем список выбранных инструментов
     await state.update_data(selected_bag_tools=[])
     
     # Создаем клавиатуру выбора инструментов
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        # Создаем простые callback_data как в картхолдере
-        if tool_name == "Канцелярский нож":
-            callback_data = "toggle_bag_tool_knife"
-        elif tool_name == "Строчные пробойники PFG":
-            callback_data = "toggle_bag_tool_punch"
-        elif tool_name == "Высечные пробойники":
-            callback_data = "toggle_bag_tool_punch_set"
-        elif tool_name == "Мультитул 3 в 1":
-            callback_data = "toggle_bag_tool_multitool"
-        else:
-            callback_data = f"toggle_bag_tool_{tool_name.replace(' ', '_').lower()[:15]}"
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🔘 {tool_name}", 
-            callback_data=callback_data
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_TOOL, tool_items)
     
     # Кнопка продолжения
     keyboard_buttons.append([InlineKeyboardButton(
@@ -2767,13 +2363,12 @@ async def bag_materials_confirmed(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 23
     image_path = "images/tutorial/bag_tools.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage23_text,
             reply_markup=tools_keyboard
         )
@@ -2787,8 +2382,8 @@ async def bag_materials_confirmed(callback: CallbackQuery, state: FSMContext):
     await callback.answer("✅ Материалы выбраны!")
 
 # Обработка toggle выбора инструментов для сумки - Этап 23
-@tutorial_router.callback_query(F.data.startswith("toggle_bag_tool_"))
-async def toggle_bag_tool_selection(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.TOGGLE_BAG_TOOL)
+async def toggle_bag_tool_selection(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Toggle выбор инструментов для сумки"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -2798,19 +2393,12 @@ async def toggle_bag_tool_selection(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем код инструмента и преобразуем в название
-    tool_code = callback.data.replace("toggle_bag_tool_", "")
-    
-    tool_map = {
-        "knife": "Канцелярский нож",
-        "punch": "Строчные пробойники PFG", 
-        "punch_set": "Высечные пробойники",
-        "multitool": "Мультитул 3 в 1"
-    }
-    
-    tool_name = tool_map.get(tool_code)
-    if not tool_name:
-        tool_name = tool_code.replace('_', ' ')
+    # Предмет по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    tool_name = item.name
     
     # Toggle выбор инструмента
     if tool_name in selected_tools:
@@ -2824,34 +2412,12 @@ async def toggle_bag_tool_selection(callback: CallbackQuery, state: FSMContext):
     await state.update_data(selected_bag_tools=selected_tools)
     
     # Получаем инвентарь для обновления клавиатуры
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул"]):
-            tool_items.append(item_name)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    tools = tutorial_db.catalog.with_role("bag_tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Создаем обновленную клавиатуру
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        emoji = "✅" if tool_name in selected_tools else "🔘"
-        
-        # Создаем callback_data как при первоначальном создании
-        if tool_name == "Канцелярский нож":
-            callback_data = "toggle_bag_tool_knife"
-        elif tool_name == "Строчные пробойники PFG":
-            callback_data = "toggle_bag_tool_punch"
-        elif tool_name == "Высечные пробойники":
-            callback_data = "toggle_bag_tool_punch_set"
-        elif tool_name == "Мультитул 3 в 1":
-            callback_data = "toggle_bag_tool_multitool"
-        else:
-            callback_data = f"toggle_bag_tool_{tool_name.replace(' ', '_').lower()[:15]}"
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"{emoji} {tool_name}", 
-            callback_data=callback_data
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_TOOL, tool_items, selected_tools)
     
     # Проверяем выбранные инструменты
     required_tools = ["Канцелярский нож", "Строчные пробойники PFG", "Высечные пробойники", "Мультитул 3 в 1"]
@@ -2877,7 +2443,7 @@ async def toggle_bag_tool_selection(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Обновите сообщение")
 
 # Обработка попытки продолжить без выбора инструментов
-@tutorial_router.callback_query(F.data == "bag_tools_not_selected")
+@tutorial_router.on_callback("bag_tools_not_selected")
 async def bag_tools_not_selected(callback: CallbackQuery, state: FSMContext):
     """Обработка попытки продолжить без выбора инструментов"""
     data = await state.get_data()
@@ -2893,7 +2459,7 @@ async def bag_tools_not_selected(callback: CallbackQuery, state: FSMContext):
         await callback.answer("✅ Все инструменты выбраны")
 
 # Обработка подтверждения выбора инструментов - Этап 24
-@tutorial_router.callback_query(F.data == "bag_tools_confirmed")
+@tutorial_router.on_callback("bag_tools_confirmed")
 async def bag_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     """Подтверждение выбора инструментов - переход к обработке кожи - Этап 24"""
     data = await state.get_data()
@@ -2911,7 +2477,7 @@ async def bag_tools_confirmed(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_wax_selection")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_wax_selection")
     
     # Удаляем кнопки
     try:
@@ -2926,28 +2492,23 @@ async def bag_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока (воск)
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    wax_items = [item[0] for item in inventory if "воск" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    waxes = tutorial_db.catalog.with_role("wax")
+    wax_items = [item[0] for item in inventory if item[0] in waxes]
     
     # Создаем клавиатуру выбора воска
-    keyboard_buttons = []
-    for item_name in wax_items:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🧴 {item_name}", 
-            callback_data=f"select_bag_wax_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_BAG_WAX, wax_items, "🧴")
     
     wax_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
     # Отправляем сообщение этапа 24
     image_path = "images/tutorial/bag_wax.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage24_text,
             reply_markup=wax_keyboard
         )
@@ -2961,8 +2522,8 @@ async def bag_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     await callback.answer("✅ Инструменты выбраны!")
 
 # Обработка выбора воска - Этап 25
-@tutorial_router.callback_query(F.data.startswith("select_bag_wax_"))
-async def select_bag_wax(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_BAG_WAX)
+async def select_bag_wax(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор воска для обработки кожи - Этап 25"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -2971,11 +2532,15 @@ async def select_bag_wax(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название воска
-    wax_name = callback.data.replace("select_bag_wax_", "").replace("_", " ")
+    # Воск по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    wax_name = item.name
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_threads_selection")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_threads_selection")
     
     # Удаляем кнопки
     try:
@@ -2990,28 +2555,23 @@ async def select_bag_wax(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока (нитки)
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    thread_items = [item[0] for item in inventory if "нитки" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    threads = tutorial_db.catalog.of_kind("thread")
+    thread_items = [item[0] for item in inventory if item[0] in threads]
     
     # Создаем клавиатуру выбора ниток
-    keyboard_buttons = []
-    for item_name in thread_items:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🧵 {item_name}", 
-            callback_data=f"select_bag_thread_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_BAG_THREAD, thread_items, "🧵")
     
     threads_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
     # Отправляем сообщение этапа 25
     image_path = "images/tutorial/bag_threads.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage25_text,
             reply_markup=threads_keyboard
         )
@@ -3025,8 +2585,8 @@ async def select_bag_wax(callback: CallbackQuery, state: FSMContext):
     await callback.answer(f"✅ Выбрано: {wax_name}")
 
 # Обработка выбора ниток - Этап 26
-@tutorial_router.callback_query(F.data.startswith("select_bag_thread_"))
-async def select_bag_thread(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_BAG_THREAD)
+async def select_bag_thread(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор ниток для сборки - Этап 26"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -3035,11 +2595,15 @@ async def select_bag_thread(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название ниток
-    thread_name = callback.data.replace("select_bag_thread_", "").replace("_", " ")
+    # Нитки по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    thread_name = item.name
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_quality_1")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_quality_1")
     
     # Удаляем кнопки
     try:
@@ -3057,19 +2621,16 @@ async def select_bag_thread(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для оценки результата
-    stage26_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Оценить результат", callback_data="bag_evaluate_quality_1")]
-    ])
+    stage26_keyboard = inline_keyboard(("📊 Оценить результат", "bag_evaluate_quality_1"))
     
     # Отправляем сообщение этапа 26
     image_path = "images/tutorial/bag_result_1.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage26_text,
             reply_markup=stage26_keyboard
         )
@@ -3083,7 +2644,7 @@ async def select_bag_thread(callback: CallbackQuery, state: FSMContext):
     await callback.answer(f"✅ Выбрано: {thread_name}")
 
 # Обработка оценки качества первой попытки - Этап 27
-@tutorial_router.callback_query(F.data == "bag_evaluate_quality_1")
+@tutorial_router.on_callback("bag_evaluate_quality_1")
 async def bag_evaluate_quality_1(callback: CallbackQuery, state: FSMContext):
     """Оценка качества первой попытки сумки - Этап 27"""
     data = await state.get_data()
@@ -3094,7 +2655,7 @@ async def bag_evaluate_quality_1(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry")
     
     # Удаляем кнопки
     try:
@@ -3107,35 +2668,21 @@ async def bag_evaluate_quality_1(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение с качеством
     image_path = "images/tutorial/quality_reject.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=quality_text
         )
     except Exception as e:
         await callback.message.answer(quality_text)
     
     # Автоматическое списание материалов
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    for item in inventory:
-        if item[0] in ["Кожа для сумок (дешевая)", "Дешевая фурнитура для сумок"]:
-            # Удаляем материал из инвентаря
-            conn = tutorial_db.get_connection()
-            try:
-                conn.execute(
-                    'DELETE FROM tutorial_inventory WHERE player_id = ? AND item_name = ?',
-                    (player_id, item[0])
-                )
-                conn.commit()
-            finally:
-                conn.close()
-    
-    # Ждем 2 секунды
-    await asyncio.sleep(2)
+    await tutorial_db.remove_from_tutorial_inventory(
+        player_id, ["Кожа для сумок (дешевая)", "Дешевая фурнитура для сумок"]
+    )
     
     # Текст для этапа 28
     stage28_text = (
@@ -3145,35 +2692,29 @@ async def bag_evaluate_quality_1(callback: CallbackQuery, state: FSMContext):
     )
     
     # Пополняем баланс на 1000 монет
-    progress = tutorial_db.get_tutorial_progress(player_id)
+    progress = await tutorial_db.get_tutorial_progress(player_id)
     current_balance = progress[3] if progress else 2000
     new_balance = current_balance + 1000
-    tutorial_db.update_player_balance(player_id, new_balance)
+    await tutorial_db.update_player_balance(player_id, new_balance)
     
     # Клавиатура для перехода в магазин
-    stage28_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛒 Купить материалы получше", callback_data="bag_retry_shop")]
-    ])
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=stage28_text,
-            reply_markup=stage28_keyboard
-        )
-    except Exception as e:
-        await callback.message.answer(
-            stage28_text,
-            reply_markup=stage28_keyboard
-        )
+    stage28_keyboard = inline_keyboard(("🛒 Купить материалы получше", "bag_retry_shop"))
+    
+    # Сообщение придет через 2 секунды, обработчик не ждет
+    await followups.schedule(
+        callback.message.chat.id,
+        stage28_text,
+        photo=image_path,
+        reply_markup=stage28_keyboard,
+        delay=2
+    )
     
     await state.set_state(TutorialStates.waiting_for_bag_retry)
     await state.update_data(player_balance=new_balance)
     await callback.answer(f"✅ Получено 1000 монет! Новый баланс: {new_balance}")
 
 # Обработка кнопки "Купить материалы получше" - Этап 29
-@tutorial_router.callback_query(F.data == "bag_retry_shop")
+@tutorial_router.on_callback("bag_retry_shop")
 async def bag_retry_shop(callback: CallbackQuery, state: FSMContext):
     """Вторая закупка в магазине - Этап 29"""
     print("🎯 ОТЛАДКА: bag_retry_shop вызван")
@@ -3186,10 +2727,10 @@ async def bag_retry_shop(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "in_shop_bag_retry")
+    await tutorial_db.update_tutorial_progress(player_id, "in_shop_bag_retry")
     
     # Получаем баланс
-    progress = tutorial_db.get_tutorial_progress(player_id)
+    progress = await tutorial_db.get_tutorial_progress(player_id)
     balance = progress[3] if progress else 3000  # +1000 от премии
     
     # Удаляем кнопки
@@ -3201,38 +2742,16 @@ async def bag_retry_shop(callback: CallbackQuery, state: FSMContext):
     # Текст для этапа 29
     stage29_text = "Для второй попытки выберите качественные материалы:"
     
-    # Клавиатура магазина
-    allowed_categories = [
-        ("🧵 Материалы для сумок", "shop_bag_retry_materials"),
-        ("📎 Фурнитура для сумок", "shop_bag_retry_hardware"),
-        ("🧶 Нитки", "shop_bag_retry_threads"),
-        ("🧪 Химия", "shop_bag_retry_chemistry")
-    ]
-    
-    keyboard_buttons = []
-    for category_text, callback_data in allowed_categories:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=category_text, 
-            callback_data=callback_data
-        )])
-    
-    # Кнопка "Вернуться домой"
-    keyboard_buttons.append([InlineKeyboardButton(
-        text="🚪 Вернуться домой (купите все материалы)", 
-        callback_data="bag_retry_shop_not_ready"
-    )])
-    
-    shop_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+    shop_keyboard = get_bag_retry_shop_menu_keyboard()
     
     # Отправляем сообщение этапа 29
     image_path = "images/tutorial/bag_retry_shop.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=f"{stage29_text}\n\n💰 Ваш баланс: {balance} монет",
             reply_markup=shop_keyboard
         )
@@ -3246,235 +2765,76 @@ async def bag_retry_shop(callback: CallbackQuery, state: FSMContext):
     await state.update_data(player_balance=balance)
     await callback.answer()
 
-# Обработка категорий магазина для второй попытки
-@tutorial_router.callback_query(F.data.startswith("shop_bag_retry_"))
-async def show_bag_retry_shop_category(callback: CallbackQuery, state: FSMContext):
-    """Показ категорий товаров для второй попытки"""
-    print(f"🎯 ОТЛАДКА: show_bag_retry_shop_category вызван с {callback.data}")
-    
-    category_map = {
+# СПИСОК ТОВАРОВ ДЛЯ ВТОРОЙ ПОПЫТКИ СУМКИ (этап 30)
+BAG_RETRY_SHOP_ALLOWED_ITEMS = frozenset({
+    "Кожа для сумок (средняя)",     # категория "Материалы"
+    "Средняя фурнитура для сумок",  # категория "Фурнитура"
+    "Синтетические нитки",          # категория "Нитки"
+    "Масловосковые смеси",          # категория "Химия"
+})
+
+# Во второй попытке показываем только нужные товары
+SHOP_BAG_RETRY = ShopContext(
+    name="bag_retry",
+    action=ItemAction.BUY_BAG_RETRY,
+    categories={
         "shop_bag_retry_materials": "Материалы",
         "shop_bag_retry_hardware": "Фурнитура",
         "shop_bag_retry_threads": "Нитки",
-        "shop_bag_retry_chemistry": "Химия"
-    }
-    
-    category = category_map.get(callback.data)
-    if not category:
-        await callback.answer("❌ Ошибка категории")
-        return
-    
-    data = await state.get_data()
-    player_id = data.get('player_id')
-    
-    if not player_id:
-        await callback.answer("❌ Ошибка: персонаж не найден")
-        return
-    
-    # Получаем баланс
-    progress = tutorial_db.get_tutorial_progress(player_id)
-    balance = progress[3] if progress else 3000
-    
-    # Получаем товары категории
-    all_category_items = tutorial_db.get_shop_items_by_category(category)
-    
-    # Фильтруем только нужные товары для второй попытки
-    allowed_items = []
-    for item in all_category_items:
-        item_name = item[0]
-        if category == "Материалы" and "сумок" in item_name.lower() and "средняя" in item_name.lower():
-            allowed_items.append(item)
-        elif category == "Фурнитура" and "сумок" in item_name.lower() and "средняя" in item_name.lower():
-            allowed_items.append(item)
-        elif category == "Нитки" and "синтетические" in item_name.lower():
-            allowed_items.append(item)
-        elif category == "Химия" and "масловосковые" in item_name.lower():
-            allowed_items.append(item)
-    
-    # Создаем клавиатуру
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    
-    builder = InlineKeyboardBuilder()
-    
-    if allowed_items:
-        for item in allowed_items:
-            item_name = item[0]
-            item_price = item[1]
-            
-            can_afford = balance >= item_price
-            item_text = f"{item_name} - {item_price} монет"
-            
-            if not can_afford:
-                item_text += " ❌"
-            
-            callback_data = f"buy_bag_retry_{item_name.replace(' ', '_')}" if can_afford else "cant_afford"
-            
-            builder.button(
-                text=item_text,
-                callback_data=callback_data
-            )
-    else:
-        builder.button(
-            text="🚫 Нет подходящих товаров",
-            callback_data="not_needed"
-        )
-    
-    builder.button(text="🔙 Назад", callback_data="back_to_bag_retry_shop_menu")
-    builder.adjust(1)
-    keyboard = builder.as_markup()
-    
-    # Обновляем сообщение
-    try:
-        await callback.message.edit_caption(
-            caption=f"🏪 Магазин - {category}\n\n💰 Ваш баланс: {balance} монет\nВыберите товар:",
-            reply_markup=keyboard
-        )
-    except Exception as e:
-        await callback.answer("❌ Ошибка обновления")
-        return
-    
-    await state.update_data(current_category=category, player_balance=balance)
-    await callback.answer()
+        "shop_bag_retry_chemistry": "Химия",
+    },
+    allowed=BAG_RETRY_SHOP_ALLOWED_ITEMS,
+    locked_callback="not_needed",
+    locked_message="❌ Товар не найден",
+    back_callback="back_to_bag_retry_shop_menu",
+    only_allowed=True,
+    default_balance=3000,
+)
+
+# Обработка категорий магазина для второй попытки
+@tutorial_router.on_callback_prefix("shop_bag_retry_")
+async def show_bag_retry_shop_category(callback: CallbackQuery, state: FSMContext):
+    """Показ категорий товаров для второй попытки"""
+    if await show_shop_category_view(SHOP_BAG_RETRY, callback, state):
+        await callback.answer()
+
+# Главное меню магазина второй попытки по известному балансу
+async def show_bag_retry_shop_menu(callback: CallbackQuery, balance):
+    await callback.message.edit_caption(
+        caption=f"Для второй попытки выберите качественные материалы:\n\n💰 Ваш баланс: {balance} монет",
+        reply_markup=get_bag_retry_shop_menu_keyboard()
+    )
 
 # Обработка кнопки "Назад" в магазине второй попытки
-@tutorial_router.callback_query(F.data == "back_to_bag_retry_shop_menu")
+@tutorial_router.on_callback("back_to_bag_retry_shop_menu")
 async def back_to_bag_retry_shop_menu(callback: CallbackQuery, state: FSMContext):
     """Возврат в главное меню магазина второй попытки"""
-    print("🎯 ОТЛАДКА: back_to_bag_retry_shop_menu вызван")
-    
     try:
         data = await state.get_data()
-        player_id = data.get('player_id')
-        
-        progress = tutorial_db.get_tutorial_progress(player_id)
-        balance = progress[3] if progress else 3000
-        
-        # Проверяем инвентарь
-        inventory = tutorial_db.get_tutorial_inventory(player_id)
-        inventory_items = [item[0] for item in inventory]
-        
-        # Проверяем куплены ли все нужные товары
-        required_items = [
-            "Кожа для сумок (средняя)",
-            "Средняя фурнитура для сумок", 
-            "Синтетические нитки",
-            "Масловосковые смеси"
-        ]
-        has_all_items = all(item in inventory_items for item in required_items)
-        
-        # Клавиатура магазина
-        allowed_categories = [
-            ("🧵 Материалы для сумок", "shop_bag_retry_materials"),
-            ("📎 Фурнитура для сумок", "shop_bag_retry_hardware"),
-            ("🧶 Нитки", "shop_bag_retry_threads"),
-            ("🧪 Химия", "shop_bag_retry_chemistry")
-        ]
-        
-        keyboard_buttons = []
-        for category_text, callback_data in allowed_categories:
-            keyboard_buttons.append([InlineKeyboardButton(
-                text=category_text, 
-                callback_data=callback_data
-            )])
-        
-        # Кнопка "Вернуться домой"
-        if has_all_items:
-            keyboard_buttons.append([InlineKeyboardButton(
-                text="🚪 Вернуться домой", 
-                callback_data="bag_retry_go_home"
-            )])
-        else:
-            keyboard_buttons.append([InlineKeyboardButton(
-                text="🚪 Вернуться домой (купите все материалы)", 
-                callback_data="bag_retry_shop_not_ready"
-            )])
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-        
-        await callback.message.edit_caption(
-            caption=f"Для второй попытки выберите качественные материалы:\n\n💰 Ваш баланс: {balance} монет",
-            reply_markup=keyboard
-        )
-        
+        balance = await shop_service.balance(SHOP_BAG_RETRY, data.get('player_id'))
+        await show_bag_retry_shop_menu(callback, balance)
         await callback.answer()
-        
     except Exception as e:
         print(f"❌ Ошибка в back_to_bag_retry_shop_menu: {e}")
         await callback.answer("❌ Произошла ошибка", show_alert=True)
 
 # Обработка покупки товаров для второй попытки
-@tutorial_router.callback_query(F.data.startswith("buy_bag_retry_"))
-async def buy_bag_retry_item(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.BUY_BAG_RETRY)
+async def buy_bag_retry_item(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Покупка товаров для второй попытки сумки"""
-    print(f"🎯 ОТЛАДКА: buy_bag_retry_item вызван с {callback.data}")
-    
-    try:
-        data = await state.get_data()
-        player_id = data.get('player_id')
-        current_category = data.get('current_category', '')
-        
-        if not player_id:
-            await callback.answer("❌ Ошибка: персонаж не найден")
-            return
-        
-        # Получаем название товара
-        item_name = callback.data.replace("buy_bag_retry_", "").replace("_", " ")
-        
-        # Получаем баланс
-        progress = tutorial_db.get_tutorial_progress(player_id)
-        balance = progress[3] if progress else 3000
-        
-        # Получаем товары категории
-        all_category_items = tutorial_db.get_shop_items_by_category(current_category)
-        
-        # Ищем товар
-        item_info = None
-        for item in all_category_items:
-            if item[0] == item_name:
-                item_info = item
-                break
-        
-        if not item_info:
-            await callback.answer("❌ Товар не найден")
-            return
-        
-        item_price = item_info[1]
-        
-        # Проверяем баланс
-        if balance < item_price:
-            await callback.answer("❌ Недостаточно монет!")
-            return
-        
-        # Проверяем инвентарь
-        inventory = tutorial_db.get_tutorial_inventory(player_id)
-        for inv_item in inventory:
-            if len(inv_item) > 0 and inv_item[0] == item_name:
-                await callback.answer("❌ У тебя уже есть этот предмет!")
-                return
-        
-        # Выполняем покупку
-        new_balance = balance - item_price
-        success = tutorial_db.add_to_tutorial_inventory(player_id, item_name, current_category)
-        
-        if success:
-            tutorial_db.update_player_balance(player_id, new_balance)
-            await back_to_bag_retry_shop_menu(callback, state)
-            await callback.answer(f"✅ Куплено: {item_name}")
-        else:
-            await callback.answer("❌ Ошибка при покупке")
-            
-    except Exception as e:
-        print(f"❌ Ошибка в buy_bag_retry_item: {e}")
-        await callback.answer("❌ Ошибка при покупке")
+    result = await buy_shop_item(SHOP_BAG_RETRY, callback, state, callback_data)
+    if result:
+        await show_bag_retry_shop_menu(callback, result.balance)
+        await callback.answer(f"✅ Куплено: {result.item_name}")
 
 # Обработка попытки выйти без всех материалов (вторая попытка)
-@tutorial_router.callback_query(F.data == "bag_retry_shop_not_ready")
+@tutorial_router.on_callback("bag_retry_shop_not_ready")
 async def bag_retry_shop_not_ready(callback: CallbackQuery, state: FSMContext):
     """Обработка попытки выйти без всех материалов для второй попытки"""
     data = await state.get_data()
     player_id = data.get('player_id')
     
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
     inventory_items = [item[0] for item in inventory]
     
     required_items = [
@@ -3492,7 +2852,7 @@ async def bag_retry_shop_not_ready(callback: CallbackQuery, state: FSMContext):
         await callback.answer("✅ Все материалы куплены, можно возвращаться домой")
 
 # Обработка кнопки "Вернуться домой" (вторая попытка) - Этап 30
-@tutorial_router.callback_query(F.data == "bag_retry_go_home")
+@tutorial_router.on_callback("bag_retry_go_home")
 async def bag_retry_go_home(callback: CallbackQuery, state: FSMContext):
     """Начало второй мини-игры изготовления сумки - Этап 30"""
     print("🎯 ОТЛАДКА: bag_retry_go_home вызван")
@@ -3505,7 +2865,7 @@ async def bag_retry_go_home(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_start")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_start")
     
     # Удаляем кнопки
     try:
@@ -3521,19 +2881,16 @@ async def bag_retry_go_home(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для начала работы
-    stage30_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔨 Приступить к работе", callback_data="bag_retry_start")]
-    ])
+    stage30_keyboard = inline_keyboard(("🔨 Приступить к работе", "bag_retry_start"))
     
     # Отправляем сообщение этапа 30
     image_path = "images/tutorial/bag_retry_start.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage30_text,
             reply_markup=stage30_keyboard
         )
@@ -3547,7 +2904,7 @@ async def bag_retry_go_home(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка кнопки "Приступить к работе" - Этап 31
-@tutorial_router.callback_query(F.data == "bag_retry_start")
+@tutorial_router.on_callback("bag_retry_start")
 async def bag_retry_start(callback: CallbackQuery, state: FSMContext):
     """Начало выбора материалов для второй попытки - Этап 31"""
     data = await state.get_data()
@@ -3558,7 +2915,7 @@ async def bag_retry_start(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_materials")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_materials")
     
     # Удаляем кнопки
     try:
@@ -3573,19 +2930,15 @@ async def bag_retry_start(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    material_items = [item[0] for item in inventory if any(keyword in item[0].lower() for keyword in ["кожа", "фурнитура"])]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    materials = tutorial_db.catalog.with_role("bag_material")
+    material_items = [item[0] for item in inventory if item[0] in materials]
     
     # Инициализируем список выбранных материалов
     await state.update_data(selected_bag_retry_materials=[])
     
     # Создаем клавиатуру выбора материалов
-    keyboard_buttons = []
-    for item_name in material_items:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🔘 {item_name}", 
-            callback_data=f"toggle_bag_retry_material_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_RETRY_MATERIAL, material_items)
     
     # Кнопка продолжения
     keyboard_buttons.append([InlineKeyboardButton(
@@ -3597,13 +2950,12 @@ async def bag_retry_start(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение этапа 31
     image_path = "images/tutorial/bag_retry_materials.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage31_text,
             reply_markup=materials_keyboard
         )
@@ -3617,8 +2969,8 @@ async def bag_retry_start(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработка toggle выбора материалов для второй попытки - Этап 31
-@tutorial_router.callback_query(F.data.startswith("toggle_bag_retry_material_"))
-async def toggle_bag_retry_material_selection(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.TOGGLE_BAG_RETRY_MATERIAL)
+async def toggle_bag_retry_material_selection(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Toggle выбор материалов для второй попытки сумки"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -3628,8 +2980,12 @@ async def toggle_bag_retry_material_selection(callback: CallbackQuery, state: FS
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название материала
-    material_name = callback.data.replace("toggle_bag_retry_material_", "").replace("_", " ")
+    # Предмет по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    material_name = item.name
     
     # Toggle выбор материала
     if material_name in selected_materials:
@@ -3643,17 +2999,12 @@ async def toggle_bag_retry_material_selection(callback: CallbackQuery, state: FS
     await state.update_data(selected_bag_retry_materials=selected_materials)
     
     # Получаем инвентарь для обновления клавиатуры
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    material_items = [item[0] for item in inventory if any(keyword in item[0].lower() for keyword in ["кожа", "фурнитура"])]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    materials = tutorial_db.catalog.with_role("bag_material")
+    material_items = [item[0] for item in inventory if item[0] in materials]
     
     # Создаем обновленную клавиатуру
-    keyboard_buttons = []
-    for item_name in material_items:
-        emoji = "✅" if item_name in selected_materials else "🔘"
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"{emoji} {item_name}", 
-            callback_data=f"toggle_bag_retry_material_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_RETRY_MATERIAL, material_items, selected_materials)
     
     # Проверяем выбранные материалы
     required_materials = ["Кожа для сумок (средняя)", "Средняя фурнитура для сумок"]
@@ -3672,14 +3023,17 @@ async def toggle_bag_retry_material_selection(callback: CallbackQuery, state: FS
     
     updated_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
+    # Ожидаемое качество с новым выбором
+    probabilities = await crafting_quality(callback, "Сумка", [*selected_materials, *data.get('selected_bag_retry_tools', [])])
+    
     # Обновляем сообщение
     try:
-        await callback.message.edit_reply_markup(reply_markup=updated_keyboard)
+        await edit_selection_message(callback, updated_keyboard, probabilities)
     except Exception as e:
         await callback.answer("Обновите сообщение")
 
 # Обработка попытки продолжить без выбора материалов (вторая попытка)
-@tutorial_router.callback_query(F.data == "bag_retry_materials_not_selected")
+@tutorial_router.on_callback("bag_retry_materials_not_selected")
 async def bag_retry_materials_not_selected(callback: CallbackQuery, state: FSMContext):
     """Обработка попытки продолжить без выбора материалов для второй попытки"""
     data = await state.get_data()
@@ -3695,7 +3049,7 @@ async def bag_retry_materials_not_selected(callback: CallbackQuery, state: FSMCo
         await callback.answer("✅ Все материалы выбраны")
 
 # Обработка подтверждения выбора материалов (вторая попытка) - Этап 32
-@tutorial_router.callback_query(F.data == "bag_retry_materials_confirmed")
+@tutorial_router.on_callback("bag_retry_materials_confirmed")
 async def bag_retry_materials_confirmed(callback: CallbackQuery, state: FSMContext):
     """Подтверждение выбора материалов - переход к выбору инструментов - Этап 32"""
     data = await state.get_data()
@@ -3713,7 +3067,7 @@ async def bag_retry_materials_confirmed(callback: CallbackQuery, state: FSMConte
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_tools")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_tools")
     
     # Удаляем кнопки
     try:
@@ -3728,35 +3082,15 @@ async def bag_retry_materials_confirmed(callback: CallbackQuery, state: FSMConte
     )
     
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул"]):
-            tool_items.append(item_name)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    tools = tutorial_db.catalog.with_role("bag_tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Инициализируем список выбранных инструментов
     await state.update_data(selected_bag_retry_tools=[])
     
     # Создаем клавиатуру выбора инструментов
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        # Создаем простые callback_data
-        if tool_name == "Канцелярский нож":
-            callback_data = "toggle_bag_retry_tool_knife"
-        elif tool_name == "Строчные пробойники PFG":
-            callback_data = "toggle_bag_retry_tool_punch"
-        elif tool_name == "Высечные пробойники":
-            callback_data = "toggle_bag_retry_tool_punch_set"
-        elif tool_name == "Мультитул 3 в 1":
-            callback_data = "toggle_bag_retry_tool_multitool"
-        else:
-            callback_data = f"toggle_bag_retry_tool_{tool_name.replace(' ', '_').lower()[:15]}"
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🔘 {tool_name}", 
-            callback_data=callback_data
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_RETRY_TOOL, tool_items)
     
     # Кнопка продолжения
     keyboard_buttons.append([InlineKeyboardButton(
@@ -3768,13 +3102,12 @@ async def bag_retry_materials_confirmed(callback: CallbackQuery, state: FSMConte
     
     # Отправляем сообщение этапа 32
     image_path = "images/tutorial/bag_retry_tools.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage32_text,
             reply_markup=tools_keyboard
         )
@@ -3788,8 +3121,8 @@ async def bag_retry_materials_confirmed(callback: CallbackQuery, state: FSMConte
     await callback.answer("✅ Материалы выбраны!")
 
 # Обработка toggle выбора инструментов для второй попытки - Этап 32
-@tutorial_router.callback_query(F.data.startswith("toggle_bag_retry_tool_"))
-async def toggle_bag_retry_tool_selection(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.TOGGLE_BAG_RETRY_TOOL)
+async def toggle_bag_retry_tool_selection(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Toggle выбор инструментов для второй попытки сумки"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -3799,19 +3132,12 @@ async def toggle_bag_retry_tool_selection(callback: CallbackQuery, state: FSMCon
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем код инструмента и преобразуем в название
-    tool_code = callback.data.replace("toggle_bag_retry_tool_", "")
-    
-    tool_map = {
-        "knife": "Канцелярский нож",
-        "punch": "Строчные пробойники PFG", 
-        "punch_set": "Высечные пробойники",
-        "multitool": "Мультитул 3 в 1"
-    }
-    
-    tool_name = tool_map.get(tool_code)
-    if not tool_name:
-        tool_name = tool_code.replace('_', ' ')
+    # Предмет по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    tool_name = item.name
     
     # Toggle выбор инструмента
     if tool_name in selected_tools:
@@ -3825,34 +3151,12 @@ async def toggle_bag_retry_tool_selection(callback: CallbackQuery, state: FSMCon
     await state.update_data(selected_bag_retry_tools=selected_tools)
     
     # Получаем инвентарь для обновления клавиатуры
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    tool_items = []
-    for item in inventory:
-        item_name = item[0]
-        if any(keyword in item_name.lower() for keyword in ["нож", "пробойник", "мультитул"]):
-            tool_items.append(item_name)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    tools = tutorial_db.catalog.with_role("bag_tool")
+    tool_items = [item[0] for item in inventory if item[0] in tools]
     
     # Создаем обновленную клавиатуру
-    keyboard_buttons = []
-    for tool_name in tool_items:
-        emoji = "✅" if tool_name in selected_tools else "🔘"
-        
-        # Создаем callback_data как при первоначальном создании
-        if tool_name == "Канцелярский нож":
-            callback_data = "toggle_bag_retry_tool_knife"
-        elif tool_name == "Строчные пробойники PFG":
-            callback_data = "toggle_bag_retry_tool_punch"
-        elif tool_name == "Высечные пробойники":
-            callback_data = "toggle_bag_retry_tool_punch_set"
-        elif tool_name == "Мультитул 3 в 1":
-            callback_data = "toggle_bag_retry_tool_multitool"
-        else:
-            callback_data = f"toggle_bag_retry_tool_{tool_name.replace(' ', '_').lower()[:15]}"
-        
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"{emoji} {tool_name}", 
-            callback_data=callback_data
-        )])
+    keyboard_buttons = item_toggle_rows(ItemAction.TOGGLE_BAG_RETRY_TOOL, tool_items, selected_tools)
     
     # Проверяем выбранные инструменты
     required_tools = ["Канцелярский нож", "Строчные пробойники PFG", "Высечные пробойники", "Мультитул 3 в 1"]
@@ -3871,14 +3175,17 @@ async def toggle_bag_retry_tool_selection(callback: CallbackQuery, state: FSMCon
     
     updated_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
+    # Ожидаемое качество с новым выбором
+    probabilities = await crafting_quality(callback, "Сумка", [*data.get('selected_bag_retry_materials', []), *selected_tools])
+    
     # Обновляем сообщение
     try:
-        await callback.message.edit_reply_markup(reply_markup=updated_keyboard)
+        await edit_selection_message(callback, updated_keyboard, probabilities)
     except Exception as e:
         await callback.answer("Обновите сообщение")
 
 # Обработка попытки продолжить без выбора инструментов (вторая попытка)
-@tutorial_router.callback_query(F.data == "bag_retry_tools_not_selected")
+@tutorial_router.on_callback("bag_retry_tools_not_selected")
 async def bag_retry_tools_not_selected(callback: CallbackQuery, state: FSMContext):
     """Обработка попытки продолжить без выбора инструментов для второй попытки"""
     data = await state.get_data()
@@ -3894,7 +3201,7 @@ async def bag_retry_tools_not_selected(callback: CallbackQuery, state: FSMContex
         await callback.answer("✅ Все инструменты выбраны")
 
 # Обработка подтверждения выбора инструментов (вторая попытка) - Этап 33
-@tutorial_router.callback_query(F.data == "bag_retry_tools_confirmed")
+@tutorial_router.on_callback("bag_retry_tools_confirmed")
 async def bag_retry_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     """Подтверждение выбора инструментов - переход к обработке кожи - Этап 33"""
     data = await state.get_data()
@@ -3912,7 +3219,7 @@ async def bag_retry_tools_confirmed(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_wax")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_wax")
     
     # Удаляем кнопки
     try:
@@ -3930,28 +3237,23 @@ async def bag_retry_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока (масловосковые смеси)
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    wax_items = [item[0] for item in inventory if "масловосковые" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    waxes = tutorial_db.catalog.with_role("wax_mix")
+    wax_items = [item[0] for item in inventory if item[0] in waxes]
     
     # Создаем клавиатуру выбора
-    keyboard_buttons = []
-    for item_name in wax_items:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🧴 {item_name}", 
-            callback_data=f"select_bag_retry_wax_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_BAG_RETRY_WAX, wax_items, "🧴")
     
     wax_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
     # Отправляем сообщение этапа 33
     image_path = "images/tutorial/bag_retry_wax.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage33_text,
             reply_markup=wax_keyboard
         )
@@ -3965,8 +3267,8 @@ async def bag_retry_tools_confirmed(callback: CallbackQuery, state: FSMContext):
     await callback.answer("✅ Инструменты выбраны!")
 
 # Обработка выбора масловосковой смеси - Этап 34
-@tutorial_router.callback_query(F.data.startswith("select_bag_retry_wax_"))
-async def select_bag_retry_wax(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_BAG_RETRY_WAX)
+async def select_bag_retry_wax(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор масловосковой смеси - Этап 34"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -3975,11 +3277,15 @@ async def select_bag_retry_wax(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название смеси
-    wax_name = callback.data.replace("select_bag_retry_wax_", "").replace("_", " ")
+    # Воск по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    wax_name = item.name
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_threads")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_retry_threads")
     
     # Удаляем кнопки
     try:
@@ -3994,28 +3300,23 @@ async def select_bag_retry_wax(callback: CallbackQuery, state: FSMContext):
     )
     
     # Получаем инвентарь игрока (нитки)
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
-    thread_items = [item[0] for item in inventory if "нитки" in item[0].lower()]
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
+    threads = tutorial_db.catalog.of_kind("thread")
+    thread_items = [item[0] for item in inventory if item[0] in threads]
     
     # Создаем клавиатуру выбора ниток
-    keyboard_buttons = []
-    for item_name in thread_items:
-        keyboard_buttons.append([InlineKeyboardButton(
-            text=f"🧵 {item_name}", 
-            callback_data=f"select_bag_retry_thread_{item_name.replace(' ', '_')}"
-        )])
+    keyboard_buttons = item_select_rows(ItemAction.SELECT_BAG_RETRY_THREAD, thread_items, "🧵")
     
     threads_keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
     # Отправляем сообщение этапа 34
     image_path = "images/tutorial/bag_retry_threads.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage34_text,
             reply_markup=threads_keyboard
         )
@@ -4029,8 +3330,8 @@ async def select_bag_retry_wax(callback: CallbackQuery, state: FSMContext):
     await callback.answer(f"✅ Выбрано: {wax_name}")
 
 # Обработка выбора ниток (вторая попытка) - Этап 35
-@tutorial_router.callback_query(F.data.startswith("select_bag_retry_thread_"))
-async def select_bag_retry_thread(callback: CallbackQuery, state: FSMContext):
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.SELECT_BAG_RETRY_THREAD)
+async def select_bag_retry_thread(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
     """Выбор ниток для сборки (вторая попытка) - Этап 35"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -4039,11 +3340,15 @@ async def select_bag_retry_thread(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
     
-    # Получаем название ниток
-    thread_name = callback.data.replace("select_bag_retry_thread_", "").replace("_", " ")
+    # Нитки по id из callback_data
+    item = tutorial_db.catalog.get(callback_data.item_id)
+    if item is None:
+        await callback.answer("❌ Предмет не найден")
+        return
+    thread_name = item.name
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_quality_2")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_bag_quality_2")
     
     # Удаляем кнопки
     try:
@@ -4062,19 +3367,16 @@ async def select_bag_retry_thread(callback: CallbackQuery, state: FSMContext):
     )
     
     # Клавиатура для оценки результата
-    stage35_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Оценить результат", callback_data="bag_evaluate_quality_2")]
-    ])
+    stage35_keyboard = inline_keyboard(("📊 Оценить результат", "bag_evaluate_quality_2"))
     
     # Отправляем сообщение этапа 35
     image_path = "images/tutorial/bag_result_2.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=stage35_text,
             reply_markup=stage35_keyboard
         )
@@ -4088,7 +3390,7 @@ async def select_bag_retry_thread(callback: CallbackQuery, state: FSMContext):
     await callback.answer(f"✅ Выбрано: {thread_name}")
 
 # Обработка оценки качества второй попытки - Этап 36
-@tutorial_router.callback_query(F.data == "bag_evaluate_quality_2")
+@tutorial_router.on_callback("bag_evaluate_quality_2")
 async def bag_evaluate_quality_2(callback: CallbackQuery, state: FSMContext):
     """Оценка качества второй попытки сумки - Этап 36"""
     data = await state.get_data()
@@ -4099,7 +3401,7 @@ async def bag_evaluate_quality_2(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем прогресс
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_final")
+    await tutorial_db.update_tutorial_progress(player_id, "waiting_for_final")
     
     # Удаляем кнопки
     try:
@@ -4107,8 +3409,8 @@ async def bag_evaluate_quality_2(callback: CallbackQuery, state: FSMContext):
     except:
         pass
     
-    # Рандом 50/50 обычный/отличный
-    import random
+    # Рандом 50/50 обычный/отличный: исход обучения не зависит от формулы,
+    # она только подсказывает ожидаемое качество при выборе предметов
     quality = "Обычное" if random.random() < 0.5 else "Отличное"
     
     # Сообщение с качеством
@@ -4116,51 +3418,32 @@ async def bag_evaluate_quality_2(callback: CallbackQuery, state: FSMContext):
     
     # Отправляем сообщение с качеством
     image_path = f"images/tutorial/quality_{quality.lower()}.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=quality_text
         )
     except Exception as e:
         await callback.message.answer(quality_text)
     
     # Автоматическое списание материалов
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
     materials_to_remove = [
         "Кожа для сумок (средняя)",
         "Средняя фурнитура для сумок", 
         "Масловосковые смеси"
     ]
+    await tutorial_db.remove_from_tutorial_inventory(player_id, materials_to_remove)
     
-    for material in materials_to_remove:
-        for item in inventory:
-            if item[0] == material:
-                # Удаляем материал из инвентаря
-                conn = tutorial_db.get_connection()
-                try:
-                    conn.execute(
-                        'DELETE FROM tutorial_inventory WHERE player_id = ? AND item_name = ?',
-                        (player_id, material)
-                    )
-                    conn.commit()
-                finally:
-                    conn.close()
-                break
-    
-    # Ждем 2 секунды
-    await asyncio.sleep(2)
-    
-    # Переход к финалу обучения (этап 37)
-    await show_final_menu(callback, state)
+    # Переход к финалу обучения (этап 37) через 2 секунды
+    await show_final_menu(callback, state, delay=2)
     
     await callback.answer()
 
 # Финальное меню обучения - Этап 37
-async def show_final_menu(callback: CallbackQuery, state: FSMContext):
+async def show_final_menu(callback: CallbackQuery, state: FSMContext, delay=0):
     """Финальное меню обучения - Этап 37"""
     data = await state.get_data()
     player_id = data.get('player_id')
@@ -4176,58 +3459,47 @@ async def show_final_menu(callback: CallbackQuery, state: FSMContext):
     )
     
     # Главное игровое меню
-    final_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📋 Принять заказ", callback_data="soon_available")],
-        [InlineKeyboardButton(text="🛠️ Мой инвентарь", callback_data="soon_available")],
-        [InlineKeyboardButton(text="🏪 Магазин", callback_data="soon_available")],
-        [InlineKeyboardButton(text="📊 Мой профиль", callback_data="soon_available")]
-    ])
+    final_keyboard = get_final_menu_keyboard()
     
     # Отправляем финальное сообщение
     image_path = "images/tutorial/final_menu.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=stage37_text,
-            reply_markup=final_keyboard
-        )
-    except Exception as e:
-        await callback.message.answer(
-            stage37_text,
-            reply_markup=final_keyboard
-        )
+    image_path = resolve_asset(image_path)
+    
+    await followups.schedule(
+        callback.message.chat.id,
+        stage37_text,
+        photo=image_path,
+        reply_markup=final_keyboard,
+        delay=delay
+    )
 
 # Обработка кнопок "скоро станет доступно"
-@tutorial_router.callback_query(F.data == "soon_available")
+@tutorial_router.on_callback("soon_available")
 async def soon_available(callback: CallbackQuery):
     """Обработка кнопок которые пока не реализованы"""
     await callback.answer("🔧 Эта функция скоро станет доступна!", show_alert=True)
 
 
 # Обработка нажатия на заблокированные товары
-@tutorial_router.callback_query(F.data == "not_available")
+@tutorial_router.on_callback("not_available")
 async def not_available(callback: CallbackQuery):
     await callback.answer("❌ Пока не могу себе позволить", show_alert=True)
 
-@tutorial_router.callback_query(F.data == "cant_afford")
+@tutorial_router.on_callback("cant_afford")
 async def cant_afford(callback: CallbackQuery):
     await callback.answer("❌ Недостаточно денег для покупки!", show_alert=True)
 
-@tutorial_router.callback_query(F.data == "not_in_tutorial")
+@tutorial_router.on_callback("not_in_tutorial")
 async def not_in_tutorial(callback: CallbackQuery):
     await callback.answer("❌ Сейчас я не могу себе позволить", show_alert=True)
 
 # Начало обучения
-@tutorial_router.callback_query(F.data == "start_tutorial")
+@tutorial_router.on_callback("start_tutorial")
 async def start_tutorial(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     
     # Получаем активного персонажа
-    active_player = db.get_active_player(user_id)
+    active_player = await db.get_active_player(user_id)
     if not active_player:
         await callback.answer("❌ Ошибка: персонаж не найден")
         return
@@ -4235,192 +3507,20 @@ async def start_tutorial(callback: CallbackQuery, state: FSMContext):
     player_id = active_player[0]  # ID персонажа
     
     # Инициализируем прогресс обучения для этого персонажа
-    tutorial_db.init_tutorial_progress(player_id)
-    tutorial_db.init_shop_items()
+    await tutorial_db.init_tutorial_progress(player_id)
     
     # Удаляем кнопки из предыдущего сообщения
     await callback.message.edit_reply_markup(reply_markup=None)
     
     # СРАЗУ переходим к входу в магазин (показываем описание магазина)
-    await enter_shop(callback, state)
+    await tutorial_scenario.run("enter_shop", callback, state)
     
     await state.set_state(TutorialStates.waiting_for_shop_enter)
     await state.update_data(player_id=player_id, player_balance=2000)
     await callback.answer()
 
-# Обработка входа в магазин
-@tutorial_router.callback_query(F.data == "enter_shop")
-async def enter_shop(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    player_id = data.get('player_id')
-
-    await state.set_state(TutorialStates.waiting_for_approach)
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_approach")
-    
-    active_player = db.get_active_player(callback.from_user.id)
-    player_name = active_player[2] if active_player else "Игрок"
-    
-    # Удаляем кнопки из предыдущего сообщения
-    await callback.message.edit_reply_markup(reply_markup=None)
-    
-    # Пытаемся отправить картинку магазина
-    image_path = "images/tutorial/shop_entrance.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=f"Войдя в магазин вы видете вдоль стен кожи, подвешенные на крючок. С другой стороны, были стеллажи, на которых кожа лежала в рулонах. Отдельно в углу были витрины с какими-то причудливыми инструментами. Похожие вы видели на Youtube, но эти отличалась.\n\nПобродя по магазину, вы поняли, что вообще не понимаете с чего начать и что выбрать. Десятки разных кож. Цветные и не цветные, мягкие и плотные, гладкие и с текстурой, а выбрать нечего. Девушки-сотрудницы, бегали, мимо и вы уже решил прийти в другой раз.\n\nНо тут вы увидели мужичка, который что-то бойко рассказывал одному из посетителей. Вы решили подойти поближе и послушать.",
-            reply_markup=get_approach_keyboard()
-        )
-    except Exception as e:
-        await callback.message.answer(
-            f"Войдя в магазин вы видете вдоль стен кожи, подвешенные на крючок. С другой стороны, были стеллажи, на которых кожа лежала в рулонах. Отдельно в углу были витрины с какими-то причудливыми инструментами. Похожие вы видели на Youtube, но эти отличалась.\n\nПобродя по магазину, вы поняли, что вообще не понимаете с чего начать и что выбрать. Десятки разных кож. Цветные и не цветные, мягкие и плотные, гладкие и с текстурой, а выбрать нечего. Девушки-сотрудницы, бегали, мимо и вы уже решил прийти в другой раз.\n\nНо тут вы увидели мужичка, который что-то бойко рассказывал одному из посетителей. Вы решили подойти поближе и послушать.",
-            reply_markup=get_approach_keyboard()
-        )
-    
-    await state.set_state(TutorialStates.waiting_for_approach)
-    tutorial_db.update_tutorial_progress(data.get('player_id'), "waiting_for_approach")
-    await callback.answer()
-
-# Обработка подхода поближе
-@tutorial_router.callback_query(F.data == "approach_closer")
-async def approach_closer(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    player_id = data.get('player_id')
-    
-    await state.set_state(TutorialStates.waiting_for_oldman_approach)
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_oldman_approach")
-
-    active_player = db.get_active_player(callback.from_user.id)
-    player_name = active_player[2] if active_player else "Игрок"
-    
-    # Удаляем кнопки из предыдущего сообщения
-    await callback.message.edit_reply_markup(reply_markup=None)
-    
-    # Пытаемся отправить картинку
-    image_path = "images/tutorial/oldman_talking.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=f"Встав в паре шагов, вы стали слушать, делая вид, что что-то выбираете. Мужичок очень увлеченно рассказывал, как он обрабатывает края кошелька. Что-то про то, что у него КМС, правда вы так и не поняли по какому виду спорта. И какой-то сликер.\n\nБуквально через минуту, его собеседник убежал, а вы решили, поросите у мужичка совет с чего начать.",
-            reply_markup=get_oldman_approach_keyboard()
-        )
-    except Exception as e:
-        await callback.message.answer(
-            f"Встав в паре шагов, вы стали слушать, делая вид, что что-то выбираете. Мужичок очень увлеченно рассказывал, как он обрабатывает края кошелька. Что-то про то, что у него КМС, правда вы так и не поняли по какому виду спорта. И какой-то сликер.\n\nБуквально через минуту, его собеседник убежал, а вы решили, поросите у мужичка совет с чего начать.",
-            reply_markup=get_oldman_approach_keyboard()
-        )
-    
-    await state.set_state(TutorialStates.waiting_for_oldman_approach)
-    tutorial_db.update_tutorial_progress(data.get('player_id'), "waiting_for_oldman_approach")
-    await callback.answer()
-
-# Обработка подхода к Гене
-@tutorial_router.callback_query(F.data == "approach_oldman")
-async def approach_oldman(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    player_id = data.get('player_id')
-    
-    await state.set_state(TutorialStates.waiting_for_showcase)
-    tutorial_db.update_tutorial_progress(player_id, "waiting_for_showcase")
-    
-    active_player = db.get_active_player(callback.from_user.id)
-    player_name = active_player[2] if active_player else "Игрок"
-    
-    # Удаляем кнопки из предыдущего сообщения
-    await callback.message.edit_reply_markup(reply_markup=None)
-    
-    # Первое сообщение без кнопок
-    image_path = "images/tutorial/oldman_close.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=f"Вы подошли, поздоровались и попросили помочь с выбором первых инструментов и кожи"
-        )
-    except Exception as e:
-        await callback.message.answer(
-            f"Вы подошли, поздоровались и попросили помочь с выбором первых инструментов и кожи"
-        )
-    
-    # Ждем 3 секунды и отправляем второе сообщение с кнопкой
-    await asyncio.sleep(3)
-    
-    image_path = "images/tutorial/shop_showcase.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=f"Ну здарова! Меня Геннадием Борисовичем звать. Но зови меня просто Гена. Давай по порядку. Говоришь ремень себе хочешь сделать?\n\nТогда смотри. Много инструментов тебе не надо: нож, пробойник, молоток, торцбил, сликер и отвертка, которой винтики закрутишь. Сколько у тебя денег? Ух, не много. Придется поскромнее прикупить. Я-то уже давно занимаюсь, у меня профессиональные инструменты от Wuta. Не знаешь? Ну когда-нибудь дорастешь.\n\n(продолжая рассказывать, что-то Геннадий Борисович отвел вас к витрине с инструментами)",
-            reply_markup=get_showcase_keyboard()
-        )
-    except Exception as e:
-        await callback.message.answer(
-            f"Ну здарова! Меня Геннадием Борисовичем звать. Но зови меня просто Гена. Давай по порядку. Говоришь ремень себе хочешь сделать?\n\nТогда смотри. Много инструментов тебе не надо: нож, пробойник, молоток, торцбил, сликер и отвертка, которой винтики закрутишь. Сколько у тебя денег? Ух, не много. Придется поскромнее прикупить. Я-то уже давно занимаюсь, у меня профессиональные инструменты от Wuta. Не знаешь? Ну когда-нибудь дорастешь.\n\n(продолжая рассказывать, что-то Геннадий Борисович отвел вас к витрине с инструментами)",
-            reply_markup=get_showcase_keyboard()
-        )
-    
-    await state.set_state(TutorialStates.waiting_for_showcase)
-    tutorial_db.update_tutorial_progress(data.get('player_id'), "waiting_for_showcase")
-    await callback.answer()
-
-# Обработка просмотра витрины
-@tutorial_router.callback_query(F.data == "view_showcase")
-async def view_showcase(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    player_id = data.get('player_id')
-
-    await state.set_state(TutorialStates.in_shop_menu)
-    tutorial_db.update_tutorial_progress(player_id, "in_shop_menu")
-    
-    active_player = db.get_active_player(callback.from_user.id)
-    player_name = active_player[2] if active_player else "Игрок"
-    
-    # Получаем баланс из БД
-    progress = tutorial_db.get_tutorial_progress(player_id)
-    balance = progress[3] if progress else 2000  # player_balance
-    
-    # Удаляем кнопки из предыдущего сообщения
-    await callback.message.edit_reply_markup(reply_markup=None)
-    
-    # Пытаемся отправить картинку витрины
-    image_path = "images/tutorial/tools_showcase.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
-    
-    try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=f"Вы рассматриваете витрину, узнавая некоторые инструменты, которые видели на Youtube. Они были меньше, чем казалось.\n\nБыли там инструменты и дешевые, и очень дорогие, как буд-то из золота. Например, рядом друг с другом лежала штука похожая на вилку за 400 монет и за 20 000 монет. Без понятия в чем разница.\n\n- Давай соберем тебе набор: выбирай пока самые дешевые, на больше у тебя денег не хватит.\nБери: нож, высечной пробойник, торцбил, сликер. По материалам: ременную ленту дешёвую, пряжку из нержавейки и КМЦ клей. Должно хватить\n\n💰 Ваш текущий баланс: {balance} монет",
-            reply_markup=get_shop_menu_keyboard(balance)
-        )
-    except Exception as e:
-        await callback.message.answer(
-            f"Вы рассматриваете витрину, узнавая некоторые инструменты, которые видели на Youtube. Они были меньше, чем казалось.\n\nБыли там инструменты и дешевые, и очень дорогие, как буд-то из золота. Например, рядом друг с другом лежала штука похожая на вилку за 400 монет и за 20 000 монет. Без понятия в чем разница.\n\n- Давай соберем тебе набор: выбирай пока самые дешевые, на больше у тебя денег не хватит.\nБери: нож, высечной пробойник, торцбил, сликер. По материалам: ременную ленту дешёвую, пряжку из нержавейки и КМЦ клей. Должно хватить\n\n💰 Ваш текущий баланс: {balance} монет",
-            reply_markup=get_shop_menu_keyboard(balance)
-        )
-    
-    await state.set_state(TutorialStates.in_shop_menu)
-    tutorial_db.update_tutorial_progress(data.get('player_id'), "in_shop_menu")
-    await state.update_data(player_balance=balance)
-    await callback.answer()
-
 # Обработчик кнопки "Назад" в магазине
-@tutorial_router.callback_query(F.data == "back_to_shop_menu")
+@tutorial_router.on_callback("back_to_shop_menu")
 async def back_to_shop_menu(callback: CallbackQuery, state: FSMContext):
     """Возврат в главное меню магазина"""
     try:
@@ -4428,7 +3528,7 @@ async def back_to_shop_menu(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         player_id = data.get('player_id')
         
-        progress = tutorial_db.get_tutorial_progress(player_id)
+        progress = await tutorial_db.get_tutorial_progress(player_id)
         balance = progress[3] if progress else 2000
         
         # Создаем клавиатуру главного меню магазина
@@ -4447,14 +3547,14 @@ async def back_to_shop_menu(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Произошла ошибка", show_alert=True)
 
 # Обработка выхода из магазина (проверка инвентаря) - ОБНОВЛЕННАЯ
-@tutorial_router.callback_query(F.data == "shop_exit")
+@tutorial_router.on_callback("shop_exit")
 async def shop_exit(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     player_id = data.get('player_id')
     
     if not player_id:
         print("🔄 player_id не найден в состоянии, получаем из БД...")
-        active_player = db.get_active_player(callback.from_user.id)
+        active_player = await db.get_active_player(callback.from_user.id)
         if active_player:
             player_id = active_player[0]
             await state.update_data(player_id=player_id)
@@ -4464,7 +3564,7 @@ async def shop_exit(callback: CallbackQuery, state: FSMContext):
             await callback.answer("❌ Ошибка: персонаж не найден")
             return
     # Получаем инвентарь игрока
-    inventory = tutorial_db.get_tutorial_inventory(player_id)
+    inventory = await tutorial_db.get_tutorial_inventory(player_id)
     inventory_items = [item[0] for item in inventory]  # список названий товаров
     
     print(f"🎒 ПРОВЕРКА ИНВЕНТАРЯ ПРИ ВЫХОДЕ: {inventory_items}")
@@ -4505,17 +3605,16 @@ async def shop_exit(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     
     # Отправляем новое сообщение с текстом про Гену
-    active_player = db.get_active_player(callback.from_user.id)
+    active_player = await db.get_active_player(callback.from_user.id)
     player_name = active_player[2] if active_player else "Игрок"
     
     image_path = "images/tutorial/exit_shop.jpg"
-    if not os.path.exists(image_path):
-        image_path = "images/placeholder.jpg"
+    image_path = resolve_asset(image_path)
     
     try:
-        photo = FSInputFile(image_path)
-        await callback.message.answer_photo(
-            photo=photo,
+        await answer_photo(
+            callback.message,
+            photo=image_path,
             caption=f"Вы вышли из магазина с Геной.\n\n- Ну вроде все что надо купил, вот держи ссылку на одно видео, там парень показывает, как он делает ремень. Не очень профессионально, но Бог с ним. Тебе хватит, чтоб понять, как работать.\n\nПопрощавшись и поблагодарив, вы вернулись домой и решили сразу приняться за работу.",
             reply_markup=get_make_belt_keyboard()
         )
@@ -4524,255 +3623,38 @@ async def shop_exit(callback: CallbackQuery, state: FSMContext):
             f"Вы вышли из магазина с Геной.\n\n- Ну вроде все что надо купил, вот держи ссылку на одно видео, там парень показывает, как он делает ремень. Не очень профессионально, но Бог с ним. Тебе хватит, чтоб понять, как работать.\n\nПопрощавшись и поблагодарив, вы вернулись домой и решили сразу приняться за работу.",
             reply_markup=get_make_belt_keyboard()
         )
-# Обработка категорий магазина
-@tutorial_router.callback_query(F.data.startswith("shop_"))
-async def show_shop_category(callback: CallbackQuery, state: FSMContext):
-    category_map = {
+
+# Магазин обучения: купить можно только доступное в обучении
+SHOP_TUTORIAL = ShopContext(
+    name="tutorial",
+    action=ItemAction.BUY,
+    categories={
         "shop_knives": "Ножи",
-        "shop_punches": "Пробойники", 
+        "shop_punches": "Пробойники",
         "shop_edges": "Торцбилы",
         "shop_materials": "Материалы",
-        "shop_hardware": "Фурнитура"
-    }
-    
-    category = category_map.get(callback.data)
-    if not category:
-        await callback.answer("❌ Ошибка категории")
-        return
-    
-    print(f"🎯 ОТЛАДКА: Открываем категорию: {category}")
-    
-    # Получаем товары категории и баланс
-    data = await state.get_data()
-    player_id = data.get('player_id')
-    
-    progress = tutorial_db.get_tutorial_progress(player_id)
-    balance = progress[3] if progress else 2000
-    
-    # Получаем ВСЕ товары категории
-    all_category_items = tutorial_db.get_shop_items_by_category(category)
-    print(f"📦 ОТЛАДКА: Все товары в категории {category}: {all_category_items}")
-    
-    # СОЗДАЕМ КЛАВИАТУРУ с правильной структурой
-    builder = InlineKeyboardBuilder()
-    for item in all_category_items:
-        try:
-            # ПРАВИЛЬНАЯ СТРУКТУРА:
-            # item[0] = название (string)
-            # item[1] = цена (int) 
-            # item[2] = доступность в обучении (0/1)
-            item_name = item[0]
-            item_price = item[1]
-            is_available_in_tutorial = item[2]
-            
-            print(f"🛒 ОТЛАДКА: Товар - Название: '{item_name}', Цена: {item_price}, Доступен в обучении: {is_available_in_tutorial}")
-            
-            # Проверяем доступность в обучении
-            is_tutorial_item = item_name in AVAILABLE_TUTORIAL_ITEMS.get(category, [])
-            
-            can_afford = balance >= item_price
-            item_text = f"{item_name} - {item_price} монет"
-            
-            if not can_afford:
-                item_text += " ❌"
-            elif not is_tutorial_item:
-                item_text += " 🔒"
-            
-            # Определяем callback_data в зависимости от доступности
-            if not is_tutorial_item:
-                # Товар недоступен в обучении
-                callback_data = "not_in_tutorial"
-            elif not can_afford:
-                # Не хватает денег
-                callback_data = "cant_afford"
-            else:
-                # Можно купить
-                callback_data = f"buy_{item_name}"
-            
-            builder.button(
-                text=item_text,
-                callback_data=callback_data
-            )
-        except Exception as e:
-            print(f"❌ Ошибка обработки товара {item}: {e}")
-            continue
-    
-    builder.button(text="🔙 Назад", callback_data="back_to_shop_menu")
-    builder.adjust(1)
-    keyboard = builder.as_markup()
-    
-    # Обновляем сообщение
-    await callback.message.edit_caption(
-        caption=f"🏪 Магазин - {category}\n\n"
-               f"💰 Ваш баланс: {balance} монет\n"
-               f"📋 Все товары (🔒 - недоступны в обучении):\n"
-               f"Выберите товар:",
-        reply_markup=keyboard
-    )
-    
-    await state.set_state(TutorialStates.in_shop_category)
-    await state.update_data(current_category=category, player_balance=balance)
-    await callback.answer()
-
-# Обработка покупки товара
-@tutorial_router.callback_query(F.data.startswith("buy_"))
-async def buy_item(callback: CallbackQuery, state: FSMContext):
-    try:
-        data = await state.get_data()
-        player_id = data.get('player_id')
-        current_category = data.get('current_category', '')
-        
-        print(f"🔍 ОТЛАДКА player_id В НАЧАЛЕ: player_id = {player_id}")
-        
-        # ЕСЛИ player_id НЕТ В СОСТОЯНИИ - ВОССТАНАВЛИВАЕМ
-        if not player_id:
-            print("🔄 player_id не найден в состоянии, получаем из БД...")
-            active_player = db.get_active_player(callback.from_user.id)
-            if active_player:
-                player_id = active_player[0]
-                await state.update_data(player_id=player_id)
-                print(f"✅ player_id получен из БД: {player_id}")
-            else:
-                print("❌ Не удалось получить player_id из БД")
-                await callback.answer("❌ Ошибка: персонаж не найден")
-                return
-        
-        # Двойная проверка
-        if not player_id:
-            print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: player_id is None или 0!")
-            await callback.answer("❌ Ошибка: персонаж не найден")
-            return
-        
-        # Получаем название товара из callback_data
-        item_name = callback.data.replace("buy_", "")
-        print(f"🛒 ПОКУПКА: Начало покупки товара: '{item_name}' для player_id: {player_id}")
-        
-        # ДАЛЕЕ ИДЕТ СТАРЫЙ КОД (без изменений)...
-        # Получаем текущий баланс из БД
-        progress = tutorial_db.get_tutorial_progress(player_id)
-        balance = progress[3] if progress else 2000
-            
-        print(f"💰 ПОКУПКА: Баланс игрока {player_id}: {balance}")
-        
-        # Получаем информацию о товаре
-        all_category_items = tutorial_db.get_shop_items_by_category(current_category)
-        item_info = None
-        
-        for item in all_category_items:
-            # Сравниваем по названию (item[0])
-            if item[0] == item_name:  
-                item_info = item
-                break
-        
-        if not item_info:
-            print(f"❌ ПОКУПКА: Товар '{item_name}' не найден")
-            await callback.answer("❌ Товар не найден")
-            return
-        
-        # Извлекаем данные из кортежа
-        item_name = item_info[0]
-        item_price = item_info[1]
-        is_available_in_tutorial = item_info[2]
-        
-        print(f"✅ ПОКУПКА: Найден товар: '{item_name}' за {item_price} монет")
-        
-        # Проверяем, доступен ли товар в обучении
-        if item_name not in AVAILABLE_TUTORIAL_ITEMS.get(current_category, []):
-            print(f"❌ ПОКУПКА: Товар недоступен в обучении")
-            await callback.answer("❌ Этот товар недоступен в обучении!")
-            return
-        
-        # Проверяем баланс
-        if balance < item_price:
-            print(f"❌ ПОКУПКА: Недостаточно средств. Нужно: {item_price}, есть: {balance}")
-            await callback.answer("❌ Недостаточно монет!")
-            return
-        
-        # Проверяем инвентарь
-        inventory = tutorial_db.get_tutorial_inventory(player_id)
-        print(f"🎒 ПОКУПКА: Текущий инвентарь: {inventory}")
-        
-        # Проверяем, есть ли уже такой товар в инвентаре (по названию)
-        for inv_item in inventory:
-            if len(inv_item) > 1 and inv_item[1] == item_name:  # inv_item[1] - название товара в инвентаре
-                print(f"❌ ПОКУПКА: Товар уже есть в инвентаре")
-                await callback.answer("❌ У тебя уже есть этот предмет!")
-                return
-        
-        # Выполняем покупку
-        new_balance = balance - item_price
-        print(f"💸 ПОКУПКА: Списание {item_price} монет. Новый баланс: {new_balance}")
-        
-        # Добавляем в инвентарь (передаем название вместо ID)
-        success = tutorial_db.add_to_tutorial_inventory(player_id, item_name, current_category)
-        
-        if success:
-            # Обновляем баланс
-            tutorial_db.update_player_balance(player_id, new_balance)
-            
-            print(f"✅ ПОКУПКА: Успешно! Товар добавлен в инвентарь")
-            
-            # Обновляем сообщение магазина
-            await update_shop_category_message(callback, current_category, new_balance, f"✅ Куплено: {item_name}")
-            
-            await state.update_data(player_balance=new_balance)
-            await callback.answer(f"✅ Куплено: {item_name}")
-        else:
-            print(f"❌ ПОКУПКА: Ошибка при добавлении в инвентарь")
-            await callback.answer("❌ Это я уже купил")
-            
-    except Exception as e:
-        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА в buy_item: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        await callback.answer("❌ Я уже это купил")
+        "shop_hardware": "Фурнитура",
+    },
+    allowed=None,
+    locked_callback="not_in_tutorial",
+    locked_message="❌ Этот товар недоступен в обучении!",
+    back_callback="back_to_shop_menu",
+    hint="📋 Все товары (🔒 - недоступны в обучении):",
+    owned_message="❌ Это я уже купил",
+)
 
-# Вспомогательная функция для обновления сообщения магазина
-async def update_shop_category_message(callback: CallbackQuery, category: str, balance: int, status_message: str = ""):
-    """Обновляет сообщение категории магазина"""
-    all_category_items = tutorial_db.get_shop_items_by_category(category)
-    
-    builder = InlineKeyboardBuilder()
-    for item in all_category_items:
-        item_name = item[0]
-        item_price = item[1]
-        is_available_in_tutorial = item[2]
-        
-        # Проверяем доступность в обучении
-        is_tutorial_item = item_name in AVAILABLE_TUTORIAL_ITEMS.get(category, [])
-        
-        can_afford = balance >= item_price
-        item_text = f"{item_name} - {item_price} монет"
-        
-        if not can_afford:
-            item_text += " ❌"
-        elif not is_tutorial_item:
-            item_text += " 🔒"
-        
-        # Определяем callback_data в зависимости от доступности
-        if not is_tutorial_item:
-            callback_data = "not_in_tutorial"
-        elif not can_afford:
-            callback_data = "cant_afford"
-        else:
-            callback_data = f"buy_{item_name}"
-        
-        builder.button(
-            text=item_text,
-            callback_data=callback_data
-        )
-    
-    builder.button(text="🔙 Назад", callback_data="back_to_shop_menu")
-    builder.adjust(1)
-    keyboard = builder.as_markup()
-    
-    caption = f"🏪 Магазин - {category}\n\n"
-    if status_message:
-        caption += f"{status_message}\n"
-    caption += f"💰 Ваш баланс: {balance} монет\nВыберите товар:"
-    
-    await callback.message.edit_caption(
-        caption=caption,
-        reply_markup=keyboard
-    )
+# Обработка категорий магазина
+@tutorial_router.on_callback_prefix("shop_")
+async def show_shop_category(callback: CallbackQuery, state: FSMContext):
+    if await show_shop_category_view(SHOP_TUTORIAL, callback, state):
+        await state.set_state(TutorialStates.in_shop_category)
+        await callback.answer()
 
+# Обработка покупки товара
+@tutorial_router.on_callback_data(ItemCallback, action=ItemAction.BUY)
+async def buy_item(callback: CallbackQuery, state: FSMContext, callback_data: ItemCallback):
+    result = await buy_shop_item(SHOP_TUTORIAL, callback, state, callback_data)
+    if result:
+        category = tutorial_db.catalog.get(callback_data.item_id).category
+        await update_shop_category_message(SHOP_TUTORIAL, callback, category, result.balance, f"✅ Куплено: {result.item_name}")
+        await callback.answer(f"✅ Куплено: {result.item_name}")
@@ -0,0 +1,51 @@
+# Benchmark of callback_data routing: sequential filter checks (as aiogram does with
+# F.data == ... / F.data.startswith(...)) vs utils.callback_index.CallbackIndex.
+# Usage: python3 bench_callback_dispatch.py [iterations]
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.callback_index import CallbackIndex
+
+
+def build(handler_count):
+    """handler_count обработчиков: 80% точных значений, 20% префиксов"""
+    filters = []
+    index = CallbackIndex()
+    for i in range(handler_count):
+        handler = lambda: None
+        if i % 5 == 4:
+            key = f"select_item_{i}_"
+            filters.append((lambda data, key=key: data.startswith(key), handler))
+            index.add(handler, key, is_prefix=True)
+        else:
+            key = f"button_{i}"
+            filters.append((lambda data, key=key: data == key, handler))
+            index.add(handler, key)
+    return filters, index
+
+
+def linear_resolve(filters, data):
+    for check, handler in filters:
+        if check(data):
+            return handler
+    return None
+
+
+def main(iterations):
+    print(f"{'handlers':>8} {'linear, us':>12} {'index, us':>10}")
+    for handler_count in (10, 50, 100, 500, 1000):
+        filters, index = build(handler_count)
+        # Худший случай для перебора - последний зарегистрированный обработчик
+        last = handler_count - 1
+        data = f"select_item_{last}_42" if last % 5 == 4 else f"button_{last}"
+        assert linear_resolve(filters, data) is index.resolve(data).handler
+
+        linear = timeit.timeit(lambda: linear_resolve(filters, data), number=iterations)
+        indexed = timeit.timeit(lambda: index.resolve(data), number=iterations)
+        print(f"{handler_count:>8} {linear / iterations * 1e6:>12.2f} {indexed / iterations * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
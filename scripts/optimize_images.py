@@ -0,0 +1,183 @@
+# Offline image optimizer: re-encodes the images the bot sends to Telegram-friendly
+# size and quality. Originals in images/ are never modified: optimized copies go to
+# .cache/images/ named by source content hash + settings, and the bot serves a copy
+# only while its source hash still matches (utils.assets). Runs across a process pool
+# and is incremental: sources whose copy already exists are skipped on rerun.
+# Requires Pillow (pip install Pillow).
+# Usage: python3 optimize_images.py [--max-side 1280] [--quality 85] [--workers N] [--dry-run] [--all]
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from utils.assets import ASSETS_DIR, IMAGE_EXTENSIONS, OPTIMIZED_DIR, OPTIMIZED_MANIFEST, asset_key
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+OUTPUT_DIR = ROOT / OPTIMIZED_DIR
+MANIFEST_FILE = OUTPUT_DIR / OPTIMIZED_MANIFEST
+# Telegram сжимает фото до 1280 px по большей стороне - больше отправлять нет смысла
+DEFAULT_MAX_SIDE = 1280
+DEFAULT_QUALITY = 85
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def output_name(source_hash, suffix, max_side, quality):
+    """Имя копии: хэш исходника + настройки - другой исходник или настройки дают другой файл"""
+    return f"{source_hash[:16]}-{max_side}q{quality}{suffix.lower()}"
+
+
+def optimize_one(key, max_side, quality, dry_run):
+    """Перекодирует один файл в OUTPUT_DIR. Выполняется в отдельном процессе"""
+    path = ROOT / key
+    source = path.read_bytes()
+    source_hash = file_hash(source)
+    output = None
+    with Image.open(io.BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if path.suffix.lower() in (".jpg", ".jpeg"):
+            image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+        elif path.suffix.lower() == ".png":
+            image.save(buffer, "PNG", optimize=True)
+        else:
+            image.save(buffer, "WEBP", quality=quality, method=6)
+    result = buffer.getvalue()
+
+    # Если перекодирование не помогло - копии нет, бот отправляет исходник
+    if len(result) >= len(source):
+        result = source
+    else:
+        output = output_name(source_hash, path.suffix, max_side, quality)
+        if not dry_run:
+            tmp_path = OUTPUT_DIR / (output + ".tmp")
+            tmp_path.write_bytes(result)
+            os.replace(tmp_path, OUTPUT_DIR / output)
+
+    return {
+        "path": key,
+        "source": source_hash,
+        "output": output,
+        "settings": [max_side, quality],
+        "before": len(source),
+        "after": len(result),
+    }
+
+
+def collect(include_all):
+    """Картинки, на которые ссылается бот (или все картинки из images/ с --all)"""
+    if include_all:
+        paths = {
+            asset_key(str(path)) for path in (ROOT / ASSETS_DIR).rglob("*")
+            if path.suffix.lower() in IMAGE_EXTENSIONS
+        }
+    else:
+        from utils.assets import referenced_images
+        paths = {asset_key(path) for path in referenced_images()}
+        paths.add(asset_key("images/placeholder.jpg"))
+    return sorted(key for key in paths if (ROOT / key).is_file())
+
+
+def load_manifest():
+    if MANIFEST_FILE.exists():
+        return json.loads(MANIFEST_FILE.read_text(encoding="utf-8")).get("files", {})
+    return {}
+
+
+def is_current(entry, source_hash, settings):
+    """Исходник уже обработан с этими настройками и копия (если была нужна) на месте"""
+    if not entry or entry["source"] != source_hash or entry.get("settings") != settings:
+        return False
+    return entry["output"] is None or (OUTPUT_DIR / entry["output"]).is_file()
+
+
+def prune(files):
+    """Удаляет копии, на которые манифест больше не ссылается (старые исходники и настройки)"""
+    keep = {entry["output"] for entry in files.values() if entry["output"]}
+    removed = 0
+    for path in OUTPUT_DIR.iterdir():
+        if path.name != OPTIMIZED_MANIFEST and path.name not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Оптимизация картинок бота для Telegram")
+    parser.add_argument("--max-side", type=int, default=DEFAULT_MAX_SIDE)
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать экономию, копии не записывать")
+    parser.add_argument("--all", action="store_true", help="все картинки из images/, а не только используемые")
+    args = parser.parse_args()
+
+    if Image is None:
+        print("❌ Нужен Pillow: pip install Pillow")
+        sys.exit(1)
+
+    files = load_manifest()
+    settings = [args.max_side, args.quality]
+
+    paths = collect(args.all)
+    todo = []
+    for key in paths:
+        # Исходник не менялся с прошлого запуска - его копия уже готова
+        if is_current(files.get(key), file_hash((ROOT / key).read_bytes()), settings):
+            continue
+        todo.append(key)
+
+    print(f"🖼️ К обработке: {len(todo)} из {len(paths)} (остальные уже оптимизированы)")
+    if not todo:
+        return
+    if not args.dry_run:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(optimize_one, key, args.max_side, args.quality, args.dry_run) for key in todo]
+        for key, future in zip(todo, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"❌ {key}: {e}")
+
+    total_before = total_after = 0
+    for result in sorted(results, key=lambda r: r["before"] - r["after"], reverse=True):
+        total_before += result["before"]
+        total_after += result["after"]
+        saved = result["before"] - result["after"]
+        percent = saved / result["before"] * 100 if result["before"] else 0
+        print(f"  {result['path']}: {result['before'] / 1024:.0f} КБ -> {result['after'] / 1024:.0f} КБ (-{percent:.0f}%)")
+        if not args.dry_run:
+            files[result["path"]] = result
+
+    saved = total_before - total_after
+    print(f"✅ Итого: {total_before / 1024:.0f} КБ -> {total_after / 1024:.0f} КБ, экономия {saved / 1024:.0f} КБ")
+
+    if not args.dry_run:
+        # Исходники, которых больше нет, из манифеста убираем (их копии удалит prune)
+        files = {key: entry for key, entry in files.items() if (ROOT / key).is_file()}
+        tmp_path = MANIFEST_FILE.with_name(MANIFEST_FILE.name + ".tmp")
+        tmp_path.write_text(json.dumps({"files": files}, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, MANIFEST_FILE)
+        removed = prune(files)
+        if removed:
+            print(f"🧹 Удалено устаревших копий: {removed}")
+        print(f"📦 Копии в {OPTIMIZED_DIR}/ - бот подхватит их после перезапуска или /reload_assets")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Balancing tool for the crafting quality formula (utils.quality.calculate_final_result).
+# Runs Monte Carlo draws for every class x tool tier x material tier x order difficulty
+# and prints the quality tier distribution of each cell. With numpy installed every cell
+# is one vectorized batch; without it falls back to the (slow) scalar formula.
+# Usage: python3 quality_balance.py [--samples 1000000] [--difficulty 1,2,3,4,5,6]
+#                                   [--mastery-gain 0] [--luck-gain 0] [--seed N] [--csv]
+import argparse
+import random
+import sys
+import time
+from itertools import product
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from database.seed import PLAYER_CLASSES
+from utils.quality import (
+    MATERIAL_TIER_BONUSES,
+    QUALITY_TIERS,
+    TOOL_TIER_BONUSES,
+    calculate_final_result,
+    calculate_final_results,
+    np,
+    tier_distribution,
+)
+
+# Цели баланса из базы знаний: доли уровней качества (мин, макс)
+BALANCE_TARGETS = {
+    "Брак": (0.01, 0.05),
+    "Обычный": (0.20, 0.60),
+    "Отличный": (0.30, 0.55),
+    "Превосходный": (0.05, 0.25),
+}
+
+
+def int_list(value):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def build_grid(difficulties, mastery_gains, luck_gains):
+    """Ячейки сетки: (класс, инструменты, материалы, сложность, мастерство, удача, бонус инструментов, бонус материалов)"""
+    grid = []
+    for (class_name, stats), tool_tier, material_tier, difficulty, mastery_gain, luck_gain in product(
+        PLAYER_CLASSES.items(), TOOL_TIER_BONUSES, MATERIAL_TIER_BONUSES,
+        difficulties, mastery_gains, luck_gains
+    ):
+        mastery, luck = stats[0] + mastery_gain, stats[1] + luck_gain
+        grid.append((class_name, tool_tier, material_tier, difficulty, mastery, luck,
+                     TOOL_TIER_BONUSES[tool_tier], MATERIAL_TIER_BONUSES[material_tier]))
+    return grid
+
+
+def simulate(cell, samples, rng):
+    mastery, luck, tools_bonus, materials_bonus, difficulty = cell[4], cell[5], cell[6], cell[7], cell[3]
+    if np is not None:
+        return tier_distribution(
+            calculate_final_results(mastery, luck, tools_bonus, materials_bonus, difficulty, size=samples, rng=rng)
+        )
+    return tier_distribution([
+        calculate_final_result(mastery, luck, tools_bonus, materials_bonus, difficulty, rng=rng)
+        for _ in range(samples)
+    ])
+
+
+def off_target(distribution):
+    return [name for name, (low, high) in BALANCE_TARGETS.items() if not low <= distribution[name] <= high]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Распределение качества изделий по классам и уровням снаряжения")
+    parser.add_argument("--samples", type=int, default=1_000_000, help="бросков на ячейку сетки")
+    parser.add_argument("--difficulty", type=int_list, default=[1, 2, 3, 4, 5, 6],
+                        help="сложности заказов через запятую (картхолдер 1 ... рюкзак 6)")
+    parser.add_argument("--mastery-gain", type=int_list, default=[0],
+                        help="прибавка к стартовому мастерству класса, через запятую (например 0,150,300)")
+    parser.add_argument("--luck-gain", type=int_list, default=[0], help="прибавка к стартовой удаче класса")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--csv", action="store_true", help="вывод в CSV")
+    args = parser.parse_args()
+
+    if np is not None:
+        rng = np.random.default_rng(args.seed)
+    else:
+        rng = random.Random(args.seed)
+        print("⚠️ numpy не установлен - считаем по одному броску, уменьшите --samples", file=sys.stderr)
+
+    grid = build_grid(args.difficulty, args.mastery_gain, args.luck_gain)
+    started = time.perf_counter()
+
+    if args.csv:
+        print("class,tools,materials,difficulty,mastery,luck," + ",".join(QUALITY_TIERS))
+    else:
+        print(f"{'Класс':<10} {'Инструменты':<11} {'Материалы':<10} {'Слож':>4} {'Маст':>5} {'Удача':>5} "
+              + " ".join(f"{name:>12}" for name in QUALITY_TIERS))
+
+    off = 0
+    for cell in grid:
+        distribution = simulate(cell, args.samples, rng)
+        shares = [distribution[name] for name in QUALITY_TIERS]
+        if args.csv:
+            print(",".join(str(value) for value in cell[:6]) + "," + ",".join(f"{share:.6f}" for share in shares))
+            continue
+        misses = off_target(distribution)
+        off += bool(misses)
+        print(f"{cell[0]:<10} {cell[1]:<11} {cell[2]:<10} {cell[3]:>4} {cell[4]:>5} {cell[5]:>5} "
+              + " ".join(f"{share:>11.2%}" for share in shares)
+              + (f"  ⚠️ {', '.join(misses)}" if misses else ""))
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(grid)} ячеек x {args.samples} бросков за {elapsed:.1f} c, вне целей баланса: {off}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Regression check for Database.add_user on pooled connections: after INSERT OR IGNORE
+# that inserts nothing, cursor.lastrowid keeps the rowid of the connection's previous
+# insert, so an existing user must still come back with its own id.
+# Usage: python3 test_add_user.py
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.models при импорте открывает game.db в текущей папке - не трогаем рабочую базу
+        os.chdir(tmp)
+        from database.models import Database
+
+        db = Database(os.path.join(tmp, "game.db"))
+
+        user_id = db.add_user(1001, "first", "First", None)
+        other_id = db.add_user(1002, "second", "Second", None)
+        for i in range(3):
+            db.add_player(1001, f"Мастер {i}", "Работяга")
+
+        again = db.add_user(1001, "first", "First", None)
+        assert again == user_id, f"add_user вернул {again} вместо {user_id}"
+        assert db.add_user(1002, "second", "Second", None) == other_id
+        print(f"✅ add_user: существующий пользователь получает свой id ({user_id})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# utils/assets.py
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import NamedTuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = "images"
+PLACEHOLDER = "images/placeholder.jpg"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+# Перекодированные копии картинок (scripts/optimize_images.py); исходники в images/ не трогаем
+OPTIMIZED_DIR = ".cache/images"
+OPTIMIZED_MANIFEST = "manifest.json"
+
+# Строковые литералы путей к картинкам в коде роутеров
+_IMAGE_LITERAL = re.compile(r'["\'](images/[^"\'{}]+\.(?:jpg|jpeg|png|webp))["\']')
+
+
+class Asset(NamedTuple):
+    path: str        # относительно корня проекта, через "/"
+    size: int
+    sha256: str
+    mtime_ns: int
+
+
+def asset_key(path):
+    """Любой путь (относительный или абсолютный) -> ключ манифеста"""
+    if not os.path.isabs(path):
+        path = os.path.join(PROJECT_ROOT, path)
+    return os.path.relpath(os.path.normpath(path), PROJECT_ROOT).replace(os.sep, "/")
+
+
+class AssetManifest:
+    """Список картинок, собранный один раз при старте.
+
+    resolve() на горячем пути - поиск в словаре без обращения к диску.
+    Если для картинки есть оптимизированная копия того же исходника - отдаем ее.
+    Отсутствующие картинки подменяются заглушкой и попадают в лог один раз.
+    Пересобирается командой /reload_assets.
+    """
+
+    def __init__(self, root=PROJECT_ROOT, directory=ASSETS_DIR, placeholder=PLACEHOLDER):
+        self.root = root
+        self.directory = directory
+        self.placeholder = placeholder
+        self.assets = {}
+        self.optimized = {}  # ключ -> путь к оптимизированной копии
+        self.missing = set()
+        self._lock = threading.Lock()
+        self.scan()
+
+    def scan(self):
+        """Пересобирает манифест; хэш пересчитывается только у измененных файлов"""
+        previous = self.assets
+        assets = {}
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, self.directory)):
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                key = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                stat = os.stat(full_path)
+                old = previous.get(key)
+                if old and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+                    assets[key] = old
+                    continue
+                with open(full_path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                assets[key] = Asset(key, stat.st_size, digest, stat.st_mtime_ns)
+
+        added = assets.keys() - previous.keys()
+        removed = previous.keys() - assets.keys()
+        changed = {key for key in assets.keys() & previous.keys() if assets[key] is not previous[key]}
+        optimized = self._load_optimized(assets)
+        with self._lock:
+            self.assets = assets
+            self.optimized = optimized
+            self.missing = set()
+        if self.placeholder not in assets:
+            print(f"❌ Заглушка {self.placeholder} не найдена")
+        return added, removed, changed
+
+    def _load_optimized(self, assets):
+        """Копии из OPTIMIZED_DIR, сделанные из текущей версии исходника (по sha256)"""
+        output_dir = os.path.join(self.root, OPTIMIZED_DIR)
+        try:
+            with open(os.path.join(output_dir, OPTIMIZED_MANIFEST), encoding="utf-8") as f:
+                entries = json.load(f).get("files", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Манифест оптимизированных картинок не прочитан: {e}")
+            return {}
+
+        optimized = {}
+        for key, entry in entries.items():
+            asset = assets.get(key)
+            # Исходник изменился после оптимизации - копия устарела, отдаем исходник
+            if asset is None or not entry.get("output") or entry.get("source") != asset.sha256:
+                continue
+            output_path = os.path.join(output_dir, entry["output"])
+            if os.path.isfile(output_path):
+                optimized[key] = output_path
+        return optimized
+
+    def get(self, path):
+        return self.assets.get(asset_key(path))
+
+    def resolve(self, path):
+        """Путь для отправки: сама картинка или заглушка, если ее нет"""
+        key = asset_key(path)
+        if key in self.assets:
+            return self.optimized.get(key, path)
+        if key not in self.missing:
+            with self._lock:
+                self.missing.add(key)
+            print(f"⚠️ Картинка {key} не найдена, используется заглушка")
+        return os.path.join(self.root, self.placeholder)
+
+    def report_missing(self, paths):
+        """Проверка при старте: каких из упомянутых в коде картинок нет"""
+        missing = sorted({asset_key(path) for path in paths} - self.assets.keys())
+        with self._lock:
+            self.missing.update(missing)
+        if missing:
+            print(f"⚠️ Нет картинок ({len(missing)}), вместо них будет заглушка:")
+            for key in missing:
+                print(f"   • {key}")
+        else:
+            print(f"✅ Все картинки на месте ({len(self.assets)} в манифесте)")
+        return missing
+
+    def stats(self):
+        return {
+            "assets": len(self.assets),
+            "bytes": sum(asset.size for asset in self.assets.values()),
+            "optimized": len(self.optimized),
+            "missing": len(self.missing),
+        }
+
+
+def referenced_images():
+    """Картинки, на которые ссылается бот: IMAGE_MAP, магазин и литералы в роутерах и сценариях"""
+    from config import IMAGE_MAP
+    from database.seed import SHOP_ITEMS
+
+    paths = set(IMAGE_MAP.values())
+    paths.update(item[4] for item in SHOP_ITEMS if item[4])
+    sources = glob.glob(os.path.join(PROJECT_ROOT, "routers", "*.py"))
+    sources += glob.glob(os.path.join(PROJECT_ROOT, "scenarios", "*.json"))
+    for source in sources:
+        with open(source, encoding="utf-8") as f:
+            paths.update(_IMAGE_LITERAL.findall(f.read()))
+    return paths
+
+
+asset_manifest = AssetManifest()
+
+
+def resolve_asset(path):
+    return asset_manifest.resolve(path)
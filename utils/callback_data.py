@@ -0,0 +1,44 @@
+# utils/callback_data.py
+from enum import IntEnum
+
+from aiogram.filters.callback_data import CallbackData
+
+
+class ItemAction(IntEnum):
+    """Код действия с товаром в callback_data.
+
+    Номера не меняем и не переиспользуем: старые кнопки остаются в чатах.
+    """
+    BUY = 1                          # магазин обучения
+    BUY_AFTER = 2                    # магазин после обучения (картхолдер)
+    BUY_BAG = 3                      # магазин для сумки
+    BUY_BAG_RETRY = 4                # магазин второй попытки сумки
+    TOGGLE_TOOL = 5                  # инструменты для ремня
+    TOGGLE_HOLDER_TOOL = 6           # инструменты для картхолдера
+    TOGGLE_BAG_MATERIAL = 7          # материалы для сумки
+    TOGGLE_BAG_TOOL = 8              # инструменты для сумки
+    TOGGLE_BAG_RETRY_MATERIAL = 9    # материалы для второй попытки
+    TOGGLE_BAG_RETRY_TOOL = 10       # инструменты для второй попытки
+    SELECT_BELT_LEATHER = 11         # кожа для ремня
+    SELECT_BELT_HARDWARE = 12        # фурнитура для ремня
+    SELECT_HOLDER_LEATHER = 13       # кожа для картхолдера
+    SELECT_HOLDER_THREAD = 14        # нитки для картхолдера
+    SELECT_BAG_WAX = 15              # воск для сумки
+    SELECT_BAG_THREAD = 16           # нитки для сумки
+    SELECT_BAG_RETRY_WAX = 17        # воск для второй попытки
+    SELECT_BAG_RETRY_THREAD = 18     # нитки для второй попытки
+
+
+class ItemCallback(CallbackData, prefix="it"):
+    """Кнопка товара: "it:<действие>:<id товара>" вместо названия товара в callback_data.
+
+    Занимает около 10 байт из 64 и не зависит от пробелов и "_" в названии;
+    товар находится по id в каталоге (catalog.get).
+    """
+    action: int
+    item_id: int
+
+
+def item_callback(action, item):
+    """callback_data для кнопки товара (item - ShopItem из каталога)"""
+    return ItemCallback(action=action, item_id=item.id).pack()
@@ -0,0 +1,120 @@
+# utils/callback_dispatch.py
+import inspect
+
+from aiogram import Router
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery
+
+from utils.callback_index import CallbackIndex
+
+
+class IndexedRouter(Router):
+    """Router, который выбирает обработчик кнопки по индексу, а не перебором фильтров.
+
+    Вместо сотни callback_query(F.data == ...) у роутера один обработчик,
+    а нужная функция находится по словарю / префиксному дереву:
+
+        @tutorial_router.on_callback("make_belt")
+        @tutorial_router.on_callback_prefix("shop_after_")
+        @start_router.on_callback_prefix("gender_", state=RegistrationStates.waiting_for_gender)
+        @tutorial_router.on_callback_data(ItemCallback, action=ItemAction.BUY)
+
+    Если кнопка не найдена в индексе, апдейт уходит следующим роутерам как обычно.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.callback_index = CallbackIndex()
+        self._handler_params = {}
+        self._factories = {}
+        self.callback_query.register(self._dispatch_callback, self._resolve_callback)
+
+    def on_callback(self, data, state=None):
+        """Обработчик для точного значения callback_data"""
+        return self._register(data, False, state)
+
+    def on_callback_prefix(self, prefix, state=None):
+        """Обработчик для всех callback_data, начинающихся с prefix"""
+        return self._register(prefix, True, state)
+
+    def on_callback_data(self, factory, action=None, state=None):
+        """Обработчик для типизированной callback_data (фабрика aiogram CallbackData).
+
+        С action - только для кнопок с этим значением первого поля (кода действия).
+        Обработчик получает разобранное значение в аргументе callback_data.
+        """
+        prefix = factory.__prefix__ + factory.__separator__
+        if action is not None:
+            prefix += f"{int(action)}{factory.__separator__}"
+
+        def decorator(handler):
+            self._factories[handler] = factory
+            return self._register(prefix, True, state)(handler)
+
+        return decorator
+
+    def _register(self, key, is_prefix, state):
+        if isinstance(state, State):
+            state = state.state
+
+        def decorator(handler):
+            self.callback_index.add(handler, key, is_prefix, state)
+            if handler not in self._handler_params:
+                # Обработчику передаем только те аргументы, которые он объявил
+                params = list(inspect.signature(handler).parameters.values())[1:]
+                varkw = any(param.kind is param.VAR_KEYWORD for param in params)
+                self._handler_params[handler] = None if varkw else frozenset(param.name for param in params)
+            return handler
+
+        return decorator
+
+    async def _resolve_callback(self, callback: CallbackQuery, **kwargs):
+        data = callback.data
+        if data is None:
+            return False
+        current_state = None
+        if self.callback_index.needs_state(data):
+            fsm = kwargs.get("state")
+            current_state = await fsm.get_state() if fsm is not None else None
+        route = self.callback_index.resolve(data, current_state)
+        if route is None:
+            return False
+        factory = self._factories.get(route.handler)
+        if factory is None:
+            return {"callback_route": route}
+        try:
+            return {"callback_route": route, "callback_data": factory.unpack(data)}
+        except (TypeError, ValueError):
+            # Кнопка с битой callback_data - как будто обработчика нет
+            return False
+
+    async def _dispatch_callback(self, callback: CallbackQuery, callback_route, **kwargs):
+        handler = callback_route.handler
+        params = self._handler_params[handler]
+        if params is not None:
+            kwargs = {name: value for name, value in kwargs.items() if name in params}
+        return await handler(callback, **kwargs)
+
+    def report_duplicates(self):
+        for route, existing in self.callback_index.duplicates:
+            print(f"❌ {route.describe()} перекрыт обработчиком {existing.name} и никогда не вызовется")
+        return self.callback_index.duplicates
+
+
+def check_callback_routes(*routers):
+    """Проверка при старте: дубли внутри роутеров и кнопки, перехваченные более ранним роутером"""
+    problems = []
+    seen = {}
+    for router in routers:
+        problems.extend(router.report_duplicates())
+        for route in router.callback_index.routes:
+            key = (route.key, route.is_prefix, route.state)
+            if key in seen and seen[key][0] is not router:
+                earlier = seen[key][1]
+                print(f"⚠️ {route.describe()} не сработает: кнопку раньше перехватывает {earlier.name}")
+                problems.append((route, earlier))
+            seen.setdefault(key, (router, route))
+    total = sum(len(router.callback_index) for router in routers)
+    if not problems:
+        print(f"✅ Обработчики кнопок проиндексированы: {total} шт., дублей нет")
+    return problems
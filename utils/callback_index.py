@@ -0,0 +1,96 @@
+# utils/callback_index.py
+"""Индекс обработчиков callback_data: точные значения - в dict, префиксы - в префиксном дереве.
+
+Поиск стоит O(длина callback_data) и не зависит от количества обработчиков.
+Точное совпадение важнее префикса, из префиксов побеждает самый длинный.
+Модуль не зависит от aiogram (его использует utils/callback_dispatch.py и бенчмарк).
+"""
+
+
+class CallbackRoute:
+    """Один зарегистрированный обработчик"""
+
+    __slots__ = ("handler", "key", "is_prefix", "state")
+
+    def __init__(self, handler, key, is_prefix=False, state=None):
+        self.handler = handler
+        self.key = key
+        self.is_prefix = is_prefix
+        self.state = state  # строка состояния FSM или None (любое состояние)
+
+    @property
+    def name(self):
+        return getattr(self.handler, "__qualname__", repr(self.handler))
+
+    def describe(self):
+        kind = "prefix" if self.is_prefix else "exact"
+        state = f" [{self.state}]" if self.state else ""
+        return f"{kind} {self.key!r}{state} -> {self.name}"
+
+
+class _TrieNode:
+    __slots__ = ("children", "routes")
+
+    def __init__(self):
+        self.children = {}
+        self.routes = None
+
+
+class CallbackIndex:
+    def __init__(self):
+        self._exact = {}
+        self._root = _TrieNode()
+        self.routes = []
+        # (перекрытый, перекрывающий) - второй обработчик никогда не вызовется
+        self.duplicates = []
+
+    def add(self, handler, key, is_prefix=False, state=None):
+        route = CallbackRoute(handler, key, is_prefix, state)
+        if is_prefix:
+            node = self._root
+            for char in key:
+                node = node.children.setdefault(char, _TrieNode())
+            if node.routes is None:
+                node.routes = []
+            bucket = node.routes
+        else:
+            bucket = self._exact.setdefault(key, [])
+
+        for existing in bucket:
+            if existing.state is None or existing.state == state:
+                self.duplicates.append((route, existing))
+                print(f"⚠️ Дублирующий обработчик: {route.describe()} (уже есть {existing.name})")
+                break
+        bucket.append(route)
+        self.routes.append(route)
+        return route
+
+    def needs_state(self, data):
+        """Нужно ли знать состояние FSM, чтобы выбрать обработчик"""
+        return any(route.state is not None for route in self.candidates(data))
+
+    def candidates(self, data):
+        """Подходящие обработчики в порядке приоритета"""
+        exact = self._exact.get(data)
+        if exact:
+            yield from exact
+
+        matched = []
+        node = self._root
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.routes:
+                matched.append(node.routes)
+        for routes in reversed(matched):
+            yield from routes
+
+    def resolve(self, data, state=None):
+        for route in self.candidates(data):
+            if route.state is None or route.state == state:
+                return route
+        return None
+
+    def __len__(self):
+        return len(self.routes)
@@ -0,0 +1,258 @@
+# utils/followups.py
+import asyncio
+import json
+import math
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import InlineKeyboardMarkup
+
+from database.async_db import _executor
+from database.migrations import prepare_database
+from database.pool import get_pool
+from utils.assets import resolve_asset
+from utils.media import send_photo
+from utils.send_queue import PRIORITY_HIGH, PRIORITY_LOW, send_priority
+
+# Шаг колеса и число ячеек: один оборот - 51.2 c, более долгие задержки ждут несколько оборотов
+TICK = 0.1
+SLOTS = 512
+
+
+class TimerWheel:
+    """Колесо таймеров: добавление, отмена и срабатывание за O(1).
+
+    Каждый тик курсор переходит на следующую ячейку; записи с rounds == 0 срабатывают,
+    у остальных счетчик оборотов уменьшается. В одной ячейке порядок - порядок добавления.
+    """
+
+    def __init__(self, tick=TICK, slots=SLOTS):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self.cursor = 0
+        self._where = {}  # ключ -> номер ячейки
+
+    def add(self, key, delay, item):
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self.cursor + ticks) % len(self.slots)
+        self.slots[slot][key] = [(ticks - 1) // len(self.slots), item]
+        self._where[key] = slot
+
+    def remove(self, key):
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return None
+        return self.slots[slot].pop(key)[1]
+
+    def advance(self):
+        """Один тик: возвращает сработавшие записи"""
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        slot = self.slots[self.cursor]
+        due = []
+        for key, entry in list(slot.items()):
+            if entry[0]:
+                entry[0] -= 1
+                continue
+            del slot[key]
+            del self._where[key]
+            due.append(entry[1])
+        return due
+
+    def __len__(self):
+        return len(self._where)
+
+
+class FollowUpScheduler:
+    """Отложенные сообщения игрокам («через 2 секунды пришло продолжение»).
+
+    Обработчик ставит сообщение в колесо и сразу завершается, вместо asyncio.sleep.
+    Задания лежат в SQLite и после перезапуска досылаются. Когда игрок кнопкой
+    переходит на другой шаг, ожидающие сообщения прежнего шага отменяются
+    (CancelFollowUpsMiddleware); повторное нажатие и кнопки, которые никто
+    не обработал, их не трогают.
+    """
+
+    def __init__(self, db_path='game.db', tick=TICK, slots=SLOTS):
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+        prepare_database(db_path)
+        self.wheel = TimerWheel(tick, slots)
+        self.bot = None
+        self._by_chat = {}  # chat_id -> id ожидающих заданий
+        self._task = None
+        self._sending = set()
+
+        self.scheduled = 0
+        self.sent = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _insert(self, chat_id, due_at, payload):
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                'INSERT INTO scheduled_messages (chat_id, due_at, payload) VALUES (?, ?, ?)',
+                (chat_id, due_at, payload)
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+    def _delete(self, job_ids):
+        with self.pool.connection() as conn:
+            conn.executemany('DELETE FROM scheduled_messages WHERE id = ?', [(job_id,) for job_id in job_ids])
+            conn.commit()
+
+    def _add(self, job_id, chat_id, delay, payload, priority):
+        self.wheel.add(job_id, delay, (job_id, chat_id, payload, priority))
+        self._by_chat.setdefault(chat_id, set()).add(job_id)
+
+    async def schedule(self, chat_id, text, photo=None, reply_markup=None, parse_mode=None, delay=0):
+        """Отправит сообщение (картинку с подписью, если photo задан) через delay секунд"""
+        payload = {"text": text, "photo": photo, "parse_mode": parse_mode}
+        if reply_markup is not None:
+            payload["reply_markup"] = reply_markup.model_dump(exclude_none=True)
+        loop = asyncio.get_running_loop()
+        job_id = await loop.run_in_executor(
+            _executor, self._insert, chat_id, time.time() + delay, json.dumps(payload, ensure_ascii=False)
+        )
+        self._add(job_id, chat_id, delay, payload, PRIORITY_HIGH)
+        self.scheduled += 1
+        return job_id
+
+    def pending(self, chat_id):
+        """id ожидающих заданий чата (снимок)"""
+        return frozenset(self._by_chat.get(chat_id, ()))
+
+    async def cancel(self, chat_id, job_ids=None):
+        """Отменяет ожидающие сообщения чата (все или только job_ids); без заданий - без обращения к БД"""
+        chat_jobs = self._by_chat.get(chat_id)
+        if not chat_jobs:
+            return 0
+        if job_ids is None:
+            job_ids = set(chat_jobs)
+        else:
+            job_ids = chat_jobs & set(job_ids)
+            if not job_ids:
+                return 0
+        chat_jobs -= job_ids
+        if not chat_jobs:
+            del self._by_chat[chat_id]
+        for job_id in job_ids:
+            self.wheel.remove(job_id)
+        self.cancelled += len(job_ids)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_executor, self._delete, list(job_ids))
+        return len(job_ids)
+
+    def _restore(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                'SELECT id, chat_id, due_at, payload FROM scheduled_messages ORDER BY due_at, id'
+            ).fetchall()
+        now = time.time()
+        for job_id, chat_id, due_at, payload in rows:
+            # Досылаемое после перезапуска не должно обгонять ответы на свежие нажатия
+            self._add(job_id, chat_id, max(0.0, due_at - now), json.loads(payload), PRIORITY_LOW)
+        return len(rows)
+
+    def start(self, bot):
+        self.bot = bot
+        restored = self._restore()
+        if restored:
+            print(f"⏳ Восстановлено отложенных сообщений: {restored}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает колесо и дожидается начатых отправок; остальное дошлем после запуска"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.wheel.tick
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            for job in self.wheel.advance():
+                job_ids = self._by_chat.get(job[1])
+                if job_ids is not None:
+                    job_ids.discard(job[0])
+                    if not job_ids:
+                        del self._by_chat[job[1]]
+                task = asyncio.create_task(self._fire(*job))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+
+    async def _fire(self, job_id, chat_id, payload, priority):
+        text = payload["text"]
+        kwargs = {}
+        if payload.get("reply_markup"):
+            kwargs["reply_markup"] = InlineKeyboardMarkup.model_validate(payload["reply_markup"])
+        if payload.get("parse_mode"):
+            kwargs["parse_mode"] = payload["parse_mode"]
+        try:
+            with send_priority(priority):
+                if payload.get("photo"):
+                    try:
+                        await send_photo(self.bot, chat_id, photo=resolve_asset(payload["photo"]),
+                                         caption=text, **kwargs)
+                    except Exception as e:
+                        print(f"⚠️ Не удалось отправить картинку в чат {chat_id} ({e}), отправляем текст")
+                        await self.bot.send_message(chat_id, text, **kwargs)
+                else:
+                    await self.bot.send_message(chat_id, text, **kwargs)
+            self.sent += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Отложенное сообщение в чат {chat_id} не отправлено: {e}")
+        # Удаляем после отправки: при падении посреди отправки сообщение будет дослано
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_executor, self._delete, [job_id])
+
+    def stats(self):
+        return {
+            "pending": len(self.wheel),
+            "chats": len(self._by_chat),
+            "scheduled": self.scheduled,
+            "sent": self.sent,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+
+class CancelFollowUpsMiddleware(BaseMiddleware):
+    """Внешний middleware для callback_query: переход на другой шаг отменяет ожидающие сообщения.
+
+    Отменяем только то, что ждало до нажатия, и только если кнопку обработали
+    и состояние FSM сменилось. Двойное нажатие или чужая кнопка не отнимут у игрока
+    клавиатуру, которая еще не пришла, а сообщения этого же нажатия остаются.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    async def __call__(self, handler, event, data):
+        chat_id = event.message.chat.id if event.message else event.from_user.id
+        pending = self.scheduler.pending(chat_id)
+        if not pending:
+            return await handler(event, data)
+
+        state = data.get("state")
+        before = await state.get_state() if state is not None else None
+        result = await handler(event, data)
+        if result is UNHANDLED:
+            return result
+        after = await state.get_state() if state is not None else None
+        if after != before:
+            await self.scheduler.cancel(chat_id, pending)
+        return result
+
+
+followups = FollowUpScheduler()
@@ -1,20 +1,13 @@
-import os
-from aiogram.types import FSInputFile
 from config import IMAGE_MAP
+from utils.assets import resolve_asset
+from utils.media import send_photo
 
 async def send_photo_safe(bot, chat_id, key, caption="", reply_markup=None):
-    rel_path = IMAGE_MAP.get(key, "images/placeholder.jpg")
-    abs_path = os.path.join(os.path.dirname(__file__), "..", rel_path)
-
-    if not os.path.exists(abs_path):
-        abs_path = os.path.join(os.path.dirname(__file__), "..", "images/placeholder.jpg")
-        if not os.path.exists(abs_path):
-            print(f"[ERROR] Placeholder не найден по пути {abs_path}")
-            await bot.send_message(chat_id, caption, reply_markup=reply_markup)
-            return
+    # Путь берем из манифеста картинок: без обращения к диску, с заглушкой для отсутствующих
+    image_path = resolve_asset(IMAGE_MAP.get(key, "images/placeholder.jpg"))
 
     try:
-        await bot.send_photo(chat_id, photo=FSInputFile(abs_path), caption=caption, reply_markup=reply_markup)
+        await send_photo(bot, chat_id, image_path, caption=caption, reply_markup=reply_markup)
     except Exception as e:
-        print(f"[ERROR] Не удалось отправить фото {abs_path}: {e}")
+        print(f"[ERROR] Не удалось отправить фото {image_path}: {e}")
         await bot.send_message(chat_id, caption, reply_markup=reply_markup)
\ No newline at end of file
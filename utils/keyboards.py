@@ -0,0 +1,71 @@
+# utils/keyboards.py
+import bisect
+import functools
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+@functools.lru_cache(maxsize=256)
+def inline_keyboard(*buttons):
+    """Клавиатура из кнопок (текст, callback_data), по одной в ряд.
+
+    Собирается один раз: все вызовы с теми же кнопками получают один и тот же объект,
+    поэтому возвращенную клавиатуру не меняем. Только для кнопок с постоянным текстом.
+    """
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=text, callback_data=callback_data)]
+        for text, callback_data in buttons
+    ])
+
+
+def affordability_bucket(items, balance):
+    """Сколько первых товаров (по возрастанию цены) игрок может купить.
+
+    От баланса клавиатура категории зависит только через это число:
+    при балансе 1500 и 1700 рядом с одними и теми же товарами стоит «❌».
+    """
+    return bisect.bisect_right([item.price for item in items], balance)
+
+
+class ShopKeyboardCache:
+    """Клавиатуры категорий магазина по ключу (магазин, категория, доступные по цене товары).
+
+    Перерисовка после покупки - поиск в словаре. Клавиатуры собираются из снимка
+    каталога и сбрасываются, когда каталог меняется.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._keyboards = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, shop, catalog, category, balance, build):
+        """build(category, items, balance) -> клавиатура; вызывается только при промахе"""
+        if catalog.version != self.version:
+            self._keyboards.clear()
+            self.version = catalog.version
+        items = catalog.in_category(category)
+        key = (shop, category, affordability_bucket(items, balance))
+        keyboard = self._keyboards.get(key)
+        if keyboard is None:
+            keyboard = build(category, items, balance)
+            self._keyboards[key] = keyboard
+            self.misses += 1
+        else:
+            self.hits += 1
+        return keyboard
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._keyboards),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "static": inline_keyboard.cache_info().currsize,
+        }
+
+
+shop_keyboards = ShopKeyboardCache()
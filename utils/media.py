@@ -0,0 +1,133 @@
+# utils/media.py
+import asyncio
+import functools
+import hashlib
+import os
+import threading
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+
+from database.async_db import _executor
+from database.migrations import prepare_database
+from database.pool import get_pool
+from utils.assets import asset_manifest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MediaCache:
+    """file_id картинок, уже загруженных в Telegram.
+
+    Каждый файл загружается один раз, дальше отправляется по file_id.
+    Ключ - путь относительно корня проекта, запись действительна, пока не изменилось
+    содержимое файла (sha256). Все записи держим в памяти, в SQLite - для перезапусков.
+    """
+
+    def __init__(self, db_path='game.db'):
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+        prepare_database(db_path)
+        self._lock = threading.Lock()
+        self._hashes = {}  # путь -> (mtime_ns, size, sha256)
+
+        self.uploads = 0
+        self.hits = 0
+        self.stale = 0
+
+        with self.pool.connection() as conn:
+            rows = conn.execute('SELECT path, content_hash, file_id FROM media_files').fetchall()
+        self._file_ids = {path: (content_hash, file_id) for path, content_hash, file_id in rows}
+
+    @staticmethod
+    def key(path):
+        return os.path.relpath(os.path.abspath(path), PROJECT_ROOT)
+
+    def content_hash(self, path):
+        """Хэш файла: из манифеста картинок, для файлов вне его - с диска"""
+        asset = asset_manifest.get(path)
+        if asset is not None:
+            return asset.sha256
+        stat = os.stat(path)
+        key = self.key(path)
+        cached = self._hashes.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._hashes[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def get(self, path):
+        """file_id для файла или None, если его еще не загружали (или файл изменился)"""
+        entry = self._file_ids.get(self.key(path))
+        if entry is None or entry[0] != self.content_hash(path):
+            return None
+        return entry[1]
+
+    def remember(self, path, file_id):
+        key = self.key(path)
+        content_hash = self.content_hash(path)
+        with self._lock:
+            self._file_ids[key] = (content_hash, file_id)
+        with self.pool.connection() as conn:
+            conn.execute(
+                'INSERT INTO media_files (path, content_hash, file_id, updated_at) '
+                'VALUES (?, ?, ?, CURRENT_TIMESTAMP) '
+                'ON CONFLICT(path) DO UPDATE SET content_hash = excluded.content_hash, '
+                'file_id = excluded.file_id, updated_at = excluded.updated_at',
+                (key, content_hash, file_id)
+            )
+            conn.commit()
+
+    def forget(self, path):
+        key = self.key(path)
+        with self._lock:
+            self._file_ids.pop(key, None)
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM media_files WHERE path = ?', (key,))
+            conn.commit()
+
+    def stats(self):
+        return {
+            "cached": len(self._file_ids),
+            "hits": self.hits,
+            "uploads": self.uploads,
+            "stale": self.stale,
+        }
+
+
+media_cache = MediaCache()
+
+
+async def _send_photo(send, image_path, kwargs):
+    """send(photo=...) - answer_photo или bot.send_photo с уже подставленным получателем"""
+    loop = asyncio.get_running_loop()
+    file_id = media_cache.get(image_path)
+    if file_id is not None:
+        try:
+            result = await send(photo=file_id, **kwargs)
+            media_cache.hits += 1
+            return result
+        except TelegramBadRequest as e:
+            # file_id устарел (или бот сменился) - загружаем файл заново
+            print(f"⚠️ file_id для {image_path} не принят ({e}), загружаем заново")
+            media_cache.stale += 1
+            await loop.run_in_executor(_executor, media_cache.forget, image_path)
+
+    result = await send(photo=FSInputFile(image_path), **kwargs)
+    media_cache.uploads += 1
+    if result.photo:
+        # Самый большой размер - его и отправляем дальше
+        await loop.run_in_executor(_executor, media_cache.remember, image_path, result.photo[-1].file_id)
+    return result
+
+
+async def answer_photo(message, photo, **kwargs):
+    """Как message.answer_photo, но photo - путь к файлу; файл загружается в Telegram один раз"""
+    return await _send_photo(message.answer_photo, photo, kwargs)
+
+
+async def send_photo(bot, chat_id, photo, **kwargs):
+    """Как bot.send_photo, но photo - путь к файлу; файл загружается в Telegram один раз"""
+    return await _send_photo(functools.partial(bot.send_photo, chat_id), photo, kwargs)
@@ -0,0 +1,208 @@
+# utils/quality.py
+import functools
+import math
+import random
+
+from database.seed import MATERIALS, TOOLS
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для пакетного расчета (scripts/quality_balance.py)
+    np = None
+
+# Уровни качества; в пакетном расчете результат - индекс в этом кортеже
+QUALITY_TIERS = ("Брак", "Обычный", "Отличный", "Превосходный")
+FAILURE, ORDINARY, EXCELLENT, SUPERB = range(len(QUALITY_TIERS))
+
+# Ценовые уровни инструментов и материалов (по возрастанию цены внутри категории)
+ITEM_TIERS = ("Дешевые", "Средние", "Дорогие")
+
+# Базовая сложность заказов (база знаний по балансировке)
+ORDER_DIFFICULTY = {
+    "Картхолдер": 1,
+    "Ремень": 2,
+    "Кошелек": 3,
+    "Сумка": 4,
+    "Портфель": 5,
+    "Рюкзак": 6,
+}
+
+# Строка предпросмотра в подписи сообщения выбора - по ней ее находим и заменяем
+QUALITY_PREVIEW_MARK = "🎯 Ожидаемое качество:"
+
+
+def failure_chance(player_luck):
+    """Шанс брака в процентах: от 5% без удачи до 1% при удаче 40+"""
+    return max(1, 5 - (player_luck / 10))
+
+
+def quality_thresholds(player_mastery, order_difficulty):
+    """Пороги (обычный, отличный) - выше второго качество превосходное"""
+    scaling_factor = player_mastery / 150
+    ordinary_threshold = 25 + (order_difficulty * 4) + scaling_factor
+    excellent_threshold = 50 + (order_difficulty * 8) + (scaling_factor * 1.5)
+    return ordinary_threshold, excellent_threshold
+
+
+def final_quality(player_mastery, player_luck, tools_bonus, materials_bonus, order_difficulty):
+    base_quality = (player_mastery * 0.8) + player_luck
+    total_bonus = tools_bonus + materials_bonus
+    return base_quality + (base_quality * total_bonus / 100) - (order_difficulty * 6)
+
+
+def calculate_final_result(player_mastery, player_luck, tools_bonus, materials_bonus, order_difficulty, rng=random):
+    """Итоговое качество изделия (формула из базы знаний по геймплею)"""
+    # 1. РАСЧЕТ БРАКА
+    if rng.randint(1, 100) <= failure_chance(player_luck):
+        return "Брак"
+
+    # 2. ДИНАМИЧЕСКИЕ ПОРОГИ КАЧЕСТВА
+    ordinary_threshold, excellent_threshold = quality_thresholds(player_mastery, order_difficulty)
+
+    # 3. РАСЧЕТ КАЧЕСТВА
+    quality = final_quality(player_mastery, player_luck, tools_bonus, materials_bonus, order_difficulty)
+
+    # 4. ОПРЕДЕЛЕНИЕ УРОВНЯ КАЧЕСТВА
+    if quality <= ordinary_threshold:
+        return "Обычный"
+    elif quality <= excellent_threshold:
+        return "Отличный"
+    else:
+        return "Превосходный"
+
+
+def calculate_final_results(player_mastery, player_luck, tools_bonus, materials_bonus, order_difficulty,
+                            size=None, rng=None):
+    """Пакетный calculate_final_result на numpy: массив индексов QUALITY_TIERS.
+
+    Параметры - числа или массивы (транслируются друг к другу), size - число бросков,
+    если все параметры скалярные. Тот же бросок randint(1, 100), что и в одиночной версии.
+    """
+    if np is None:
+        raise RuntimeError("Для пакетного расчета качества нужен numpy (pip install numpy)")
+    rng = rng if rng is not None else np.random.default_rng()
+
+    mastery, luck, tools, materials, difficulty = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64)
+          for value in (player_mastery, player_luck, tools_bonus, materials_bonus, order_difficulty))
+    )
+    shape = np.broadcast_shapes(mastery.shape, size if size is not None else ())
+
+    ordinary_threshold, excellent_threshold = quality_thresholds(mastery, difficulty)
+    quality = final_quality(mastery, luck, tools, materials, difficulty)
+    failure = np.maximum(1, 5 - luck / 10)
+
+    tiers = np.where(quality <= ordinary_threshold, ORDINARY,
+                     np.where(quality <= excellent_threshold, EXCELLENT, SUPERB))
+    tiers = np.broadcast_to(tiers, shape).astype(np.int8)
+    return np.where(rng.integers(1, 101, size=shape) <= failure, FAILURE, tiers).astype(np.int8)
+
+
+def tier_distribution(results):
+    """Доли уровней качества: {название: доля} по массиву индексов или списку названий"""
+    if np is not None and isinstance(results, np.ndarray):
+        counts = np.bincount(results.ravel(), minlength=len(QUALITY_TIERS)).tolist()
+    else:
+        counts = [0] * len(QUALITY_TIERS)
+        for result in results:
+            counts[QUALITY_TIERS.index(result) if isinstance(result, str) else result] += 1
+    total = sum(counts) or 1
+    return {name: count / total for name, count in zip(QUALITY_TIERS, counts)}
+
+
+@functools.lru_cache(maxsize=None)
+def difficulty_thresholds(order_difficulty):
+    """Часть порогов и штрафа, зависящая только от сложности: (обычный, отличный, штраф)"""
+    return 25 + (order_difficulty * 4), 50 + (order_difficulty * 8), order_difficulty * 6
+
+
+@functools.lru_cache(maxsize=4096)
+def quality_probabilities(player_mastery, player_luck, bonus_sum, order_difficulty):
+    """Точные вероятности уровней качества (по порядку QUALITY_TIERS) для calculate_final_result.
+
+    Случайен в формуле только бросок брака randint(1, 100) <= шанс: брак выпадает
+    с вероятностью floor(шанс) / 100. Без брака качество определено параметрами,
+    поэтому оставшаяся вероятность целиком приходится на один уровень.
+    """
+    failure = min(100, math.floor(failure_chance(player_luck))) / 100
+
+    ordinary_base, excellent_base, penalty = difficulty_thresholds(order_difficulty)
+    scaling_factor = player_mastery / 150
+    base_quality = (player_mastery * 0.8) + player_luck
+    quality = base_quality + (base_quality * bonus_sum / 100) - penalty
+
+    if quality <= ordinary_base + scaling_factor:
+        tier = ORDINARY
+    elif quality <= excellent_base + scaling_factor * 1.5:
+        tier = EXCELLENT
+    else:
+        tier = SUPERB
+
+    probabilities = [0.0] * len(QUALITY_TIERS)
+    probabilities[FAILURE] = failure
+    probabilities[tier] += 1 - failure
+    return tuple(probabilities)
+
+
+def items_bonus(item_names):
+    """Сумма бонусов выбранных предметов; предметы без бонусов в справочниках дают 0"""
+    return sum(ITEM_BONUSES.get(SHOP_ITEM_ALIASES.get(name, name), 0) for name in item_names)
+
+
+def format_quality_preview(probabilities):
+    """Строка для подписи: только уровни с ненулевой вероятностью"""
+    shares = [
+        f"{name} {probability:.0%}"
+        for name, probability in zip(QUALITY_TIERS, probabilities)
+        if probability > 0
+    ]
+    return f"{QUALITY_PREVIEW_MARK} {' · '.join(shares)}"
+
+
+def _tier_bonuses(rows, bonus_columns):
+    """Сумма бонусов набора предметов одного ценового уровня (по одному из каждой категории)"""
+    by_category = {}
+    for row in rows:
+        by_category.setdefault(row[1], []).append(row)
+    bonuses = [0] * len(ITEM_TIERS)
+    for items in by_category.values():
+        for tier, row in enumerate(sorted(items, key=lambda row: row[2])[:len(ITEM_TIERS)]):
+            bonuses[tier] += sum(row[column] for column in bonus_columns)
+    return dict(zip(ITEM_TIERS, bonuses))
+
+
+# Бонусы уровней из справочников (database/seed.py):
+# инструменты - mastery_bonus + luck_bonus, материалы - stage1_bonus + stage4_bonus
+TOOL_TIER_BONUSES = _tier_bonuses(TOOLS, (3, 4))
+MATERIAL_TIER_BONUSES = _tier_bonuses(MATERIALS, (3, 4))
+
+# Материалы магазина, которых нет в справочнике materials: бонус как у ременных
+# ленты и фурнитуры того же уровня (дешевые -10, средние 0, дорогие +16)
+SHOP_MATERIAL_BONUSES = {
+    "Кожа для галантереи (дешевая)": -10,
+    "Кожа для галантереи (средняя)": 0,
+    "Кожа для галантереи (дорогая)": 16,
+    "Кожа для сумок (дешевая)": -10,
+    "Кожа для сумок (средняя)": 0,
+    "Кожа для сумок (дорогая)": 16,
+    "Дешевая фурнитура для сумок": -10,
+    "Средняя фурнитура для сумок": 0,
+    "Дорогая фурнитура для сумок": 16,
+}
+
+# Бонус отдельного предмета: те же суммы, по названию
+ITEM_BONUSES = {
+    **{row[0]: row[3] + row[4] for row in TOOLS},
+    **{row[0]: row[3] + row[4] for row in MATERIALS},
+    **SHOP_MATERIAL_BONUSES,
+}
+
+# В магазине часть материалов называется иначе, чем в справочнике materials
+SHOP_ITEM_ALIASES = {
+    "Дешевая ременная заготовка": "Дешевая ременная лента",
+    "Обычная ременная заготовка": "Обычная ременная лента",
+    "Дорогая ременная заготовка": "Дорогая ременная лента",
+    "Дешевая фурнитура для ремней": "Дешевая фурнитура",
+    "Нержавейка для ремней": "Нержавейка",
+    "Латунная фурнитура для ремней": "Латунная фурнитура",
+}
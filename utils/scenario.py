@@ -0,0 +1,182 @@
+# utils/scenario.py
+import json
+import os
+import string
+from types import MappingProxyType
+from typing import NamedTuple
+
+from aiogram.types import CallbackQuery
+from aiogram.fsm.context import FSMContext
+
+from database.steps import STEP_BITS
+from utils.assets import PROJECT_ROOT, resolve_asset
+from utils.followups import followups
+from utils.keyboards import inline_keyboard
+from utils.media import answer_photo
+
+# Подстановки, доступные в подписях сценария
+CAPTION_FIELDS = {"balance"}
+DEFAULT_BALANCE = 2000
+
+
+class ScenarioError(ValueError):
+    pass
+
+
+class ScenarioMessage(NamedTuple):
+    image: str
+    caption: str
+    buttons: tuple     # ((текст, callback_data), ...)
+    delay: float       # 0 - сразу, иначе отложенное сообщение (followups)
+
+    @property
+    def keyboard(self):
+        return inline_keyboard(*self.buttons) if self.buttons else None
+
+
+class ScenarioStep(NamedTuple):
+    """Шаг сценария: нажатие кнопки id -> переход в state и сообщения шага"""
+    id: str
+    state: str
+    messages: tuple
+    balance: bool      # подписи используют {balance} - читаем баланс из прогресса
+
+
+class Scenario:
+    """Линейные шаги обучения, описанные данными (scenarios/*.json).
+
+    Файл читается и проверяется один раз при импорте, дальше - граф шагов в памяти:
+    callback_data кнопки -> шаг. Все шаги обслуживает один обработчик handle().
+
+    Сюда вынесены только шаги без выбора: картинка, подпись, кнопки перехода.
+    Магазины, выбор материалов/инструментов и оценка качества остаются
+    обработчиками в routers/tutorial.py - у них своя логика (покупки, проверки
+    инвентаря, клавиатуры с отметками), для которой в сценарии пока нет типов шагов.
+    """
+
+    def __init__(self, steps, states, db):
+        self.steps = MappingProxyType({step.id: step for step in steps})
+        self.states = states
+        self.db = db
+
+    @classmethod
+    def load(cls, path, states, db):
+        if not os.path.isabs(path):
+            path = os.path.join(PROJECT_ROOT, path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        steps = [cls._parse_step(raw, states) for raw in data.get("steps", [])]
+
+        seen = set()
+        for step in steps:
+            if step.id in seen:
+                raise ScenarioError(f"Шаг {step.id!r} описан дважды")
+            seen.add(step.id)
+        if not steps:
+            raise ScenarioError(f"В сценарии {path} нет шагов")
+
+        scenario = cls(steps, states, db)
+        print(f"✅ Сценарий {os.path.basename(path)} загружен: {len(steps)} шагов")
+        return scenario
+
+    @staticmethod
+    def _parse_step(raw, states):
+        step_id = raw.get("id")
+        if not step_id:
+            raise ScenarioError(f"У шага нет id: {raw}")
+        state = raw.get("state")
+        # Шаг должен быть и состоянием FSM, и битом в маске прогресса
+        if state not in STEP_BITS or not hasattr(states, state):
+            raise ScenarioError(f"Шаг {step_id!r}: неизвестное состояние {state!r}")
+
+        messages = []
+        for message in raw.get("messages", []):
+            caption = message.get("caption")
+            if not caption:
+                raise ScenarioError(f"Шаг {step_id!r}: сообщение без текста")
+            fields = {name for _, name, _, _ in string.Formatter().parse(caption) if name is not None}
+            if fields - CAPTION_FIELDS:
+                raise ScenarioError(f"Шаг {step_id!r}: неизвестные подстановки {sorted(fields - CAPTION_FIELDS)}")
+            buttons = tuple((text, callback_data) for text, callback_data in message.get("buttons", []))
+            for _, callback_data in buttons:
+                if len(callback_data.encode("utf-8")) > 64:
+                    raise ScenarioError(f"Шаг {step_id!r}: callback_data длиннее 64 байт: {callback_data!r}")
+            messages.append(ScenarioMessage(message.get("image"), caption, buttons, float(message.get("delay", 0))))
+        if not messages:
+            raise ScenarioError(f"Шаг {step_id!r}: нет сообщений")
+        if messages[0].delay:
+            raise ScenarioError(f"Шаг {step_id!r}: первое сообщение отправляется сразу")
+
+        return ScenarioStep(step_id, state, tuple(messages), bool(raw.get("balance", False)))
+
+    def keyboard(self, step_id):
+        """Клавиатура, которой заканчивается шаг (для восстановления и старых сообщений)"""
+        for message in reversed(self.steps[step_id].messages):
+            if message.buttons:
+                return message.keyboard
+        return None
+
+    def register(self, router):
+        """Регистрирует шаги в IndexedRouter: по одному точному ключу на шаг"""
+        for step_id in self.steps:
+            router.on_callback(step_id)(self.handle)
+
+    def check_links(self, *routers):
+        """Проверка при старте: каждая кнопка сценария кем-то обрабатывается"""
+        dead = []
+        for step in self.steps.values():
+            current_state = getattr(self.states, step.state).state
+            for message in step.messages:
+                for text, callback_data in message.buttons:
+                    if not any(router.callback_index.resolve(callback_data, current_state) for router in routers):
+                        print(f"❌ Кнопка «{text}» шага {step.id!r} ведет в никуда: {callback_data!r}")
+                        dead.append((step.id, callback_data))
+        return dead
+
+    async def handle(self, callback: CallbackQuery, state: FSMContext):
+        await self.run(callback.data, callback, state)
+
+    async def run(self, step_id, callback: CallbackQuery, state: FSMContext):
+        """Переход на шаг: состояние, прогресс, сообщения шага (отложенные - через followups)"""
+        step = self.steps[step_id]
+        data = await state.get_data()
+        player_id = data.get('player_id')
+
+        await state.set_state(getattr(self.states, step.state))
+        await self.db.update_tutorial_progress(player_id, step.state)
+
+        fields = {}
+        if step.balance:
+            progress = await self.db.get_tutorial_progress(player_id)
+            fields["balance"] = progress[3] if progress else DEFAULT_BALANCE
+            await state.update_data(player_balance=fields["balance"])
+
+        # Удаляем кнопки из предыдущего сообщения
+        await callback.message.edit_reply_markup(reply_markup=None)
+
+        for message in step.messages:
+            caption = message.caption.format(**fields)
+            if message.delay:
+                await followups.schedule(
+                    callback.message.chat.id,
+                    caption,
+                    photo=message.image,
+                    reply_markup=message.keyboard,
+                    delay=message.delay
+                )
+                continue
+            if not message.image:
+                await callback.message.answer(caption, reply_markup=message.keyboard)
+                continue
+            try:
+                await answer_photo(
+                    callback.message,
+                    photo=resolve_asset(message.image),
+                    caption=caption,
+                    reply_markup=message.keyboard
+                )
+            except Exception as e:
+                print(f"⚠️ Шаг {step.id}: не удалось отправить картинку ({e}), отправляем текст")
+                await callback.message.answer(caption, reply_markup=message.keyboard)
+
+        await callback.answer()
@@ -0,0 +1,219 @@
+# utils/send_queue.py
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import time
+from contextvars import ContextVar
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+# Лимиты Telegram: ~30 сообщений в секунду на бота, ~1 в секунду в личный чат, 20 в минуту в группу
+GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+CHAT_BURST = int(os.getenv("SEND_CHAT_BURST", "3"))
+GROUP_RATE = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))
+MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "5"))
+
+# Приоритеты: ответы на действия игрока идут раньше фоновых сообщений
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+_priority = ContextVar("send_priority", default=PRIORITY_HIGH)
+
+
+@contextlib.contextmanager
+def send_priority(priority):
+    """Все отправки внутри блока идут с указанным приоритетом"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Забирает токен (в долг, если нужно) и возвращает, сколько ждать до отправки"""
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    @property
+    def idle(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class PriorityRateLimiter(TokenBucket):
+    """Общий лимит бота: ждущие получают токены по приоритету, внутри приоритета - по очереди"""
+
+    def __init__(self, rate, capacity):
+        super().__init__(rate, capacity)
+        self._waiters = []
+        self._seq = itertools.count()
+        self._pump_task = None
+
+    async def acquire(self, priority):
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._pump_task is None:
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+
+    async def _pump(self):
+        try:
+            while self._waiters:
+                self._refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    continue
+                _, _, future = heapq.heappop(self._waiters)
+                if future.done():  # отправку отменили, пока она ждала
+                    continue
+                self.tokens -= 1
+                future.set_result(None)
+        finally:
+            self._pump_task = None
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+
+def _is_send(method):
+    """Новое сообщение в чат (sendMessage, sendPhoto...): только на них действует лимит чата.
+
+    Правки и удаления уже отправленных сообщений лимит чата не тратят и его не ждут.
+    """
+    api_method = getattr(method, "__api_method__", "")
+    return api_method.startswith("send") and api_method != "sendChatAction"
+
+
+class _ChatLane:
+    __slots__ = ("lock", "bucket", "pending")
+
+    def __init__(self, rate, capacity):
+        self.lock = asyncio.Lock()  # asyncio.Lock честный - сообщения в чат уходят по порядку
+        self.bucket = TokenBucket(rate, capacity)
+        self.pending = 0  # запросы чата, которые еще ждут лимитов или отправляются
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """Планировщик исходящих запросов бота (подключается к bot.session).
+
+    Запросы с chat_id проходят через общий лимит бота с приоритетами и очередь
+    своего чата (FIFO); новые сообщения (send*) сначала ждут еще и лимит чата.
+    Ожидание лимитов - до захвата очереди чата, чтобы не держать за ним правки.
+    На 429 ждем retry_after и повторяем, не теряя места в очереди чата.
+    Остальные методы (answerCallbackQuery и т.п.) идут напрямую.
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE, chat_burst=CHAT_BURST,
+                 group_rate=GROUP_RATE, max_retries=MAX_RETRIES):
+        self.limiter = PriorityRateLimiter(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._lanes = {}
+
+        self.queued = 0
+        self.max_queued = 0
+        self.sent = [0, 0]  # по приоритетам
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _lane(self, chat_id):
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            if len(self._lanes) >= 10000:
+                self._evict_idle_lanes()
+            # Отрицательный chat_id - группа, у нее свой, более строгий лимит
+            if isinstance(chat_id, int) and chat_id < 0:
+                lane = _ChatLane(self.group_rate, 1)
+            else:
+                lane = _ChatLane(self.chat_rate, self.chat_burst)
+            self._lanes[chat_id] = lane
+        return lane
+
+    def _evict_idle_lanes(self):
+        for chat_id in [chat_id for chat_id, lane in self._lanes.items()
+                        if not lane.pending and lane.bucket.idle]:
+            del self._lanes[chat_id]
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        priority = _priority.get()
+        started = time.monotonic()
+        lane = self._lane(chat_id)
+        lane.pending += 1
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            # Токен чата резервируется сразу (без await), поэтому очередность отправок
+            # в чат сохраняется, а спим уже без блокировки
+            if _is_send(method):
+                delay = lane.bucket.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+            await self.limiter.acquire(priority)
+            async with lane.lock:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        result = await make_request(bot, method)
+                        break
+                    except TelegramRetryAfter as e:
+                        if attempt == self.max_retries:
+                            raise
+                        self.retries += 1
+                        print(f"⏳ Лимит Telegram в чате {chat_id}: ждем {e.retry_after} c")
+                        await asyncio.sleep(e.retry_after)
+        finally:
+            lane.pending -= 1
+            self.queued -= 1
+
+        latency = time.monotonic() - started
+        self.sent[priority] += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        return result
+
+    def stats(self):
+        sent = sum(self.sent)
+        return {
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "global_waiting": self.limiter.waiting,
+            "chats": len(self._lanes),
+            "sent": sent,
+            "sent_high": self.sent[PRIORITY_HIGH],
+            "sent_low": self.sent[PRIORITY_LOW],
+            "retries": self.retries,
+            "latency_avg": self.latency_total / sent if sent else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+send_scheduler = SendScheduler()
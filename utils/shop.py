@@ -0,0 +1,108 @@
+# utils/shop.py
+import functools
+from typing import NamedTuple, Optional
+
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from database.models import PURCHASE_ITEM_NOT_FOUND, PurchaseResult
+from utils.callback_data import ItemAction, item_callback
+from utils.keyboards import shop_keyboards
+
+# Товар есть в каталоге, но в этом магазине его купить нельзя
+PURCHASE_NOT_ALLOWED = "not_allowed"
+
+
+class ShopContext(NamedTuple):
+    """Вариант магазина обучения: какие товары можно купить и куда ведут кнопки"""
+    name: str                       # ключ кэша клавиатур
+    action: ItemAction              # код кнопки покупки
+    categories: dict                # callback_data кнопки категории -> категория
+    allowed: Optional[frozenset]    # названия разрешенных товаров; None - доступные в обучении
+    locked_callback: str            # кнопка товара, который сейчас купить нельзя
+    locked_message: str             # ответ на покупку такого товара
+    back_callback: str
+    owned_message: str = "❌ У тебя уже есть этот предмет!"
+    hint: str = ""                  # строка подписи категории под балансом
+    only_allowed: bool = False      # показывать только разрешенные товары
+    default_balance: int = 2000
+
+
+class ShopService:
+    """Общий код четырех магазинов обучения.
+
+    Показ категории - одно чтение баланса и готовая клавиатура из shop_keyboards,
+    покупка - одна транзакция buy_item_atomic, после которой перерисовываем
+    по возвращенному балансу без повторного чтения из базы.
+    """
+
+    def __init__(self, db, keyboards=shop_keyboards):
+        self.db = db
+        self.keyboards = keyboards
+
+    def is_allowed(self, context, item):
+        if context.allowed is None:
+            return self.db.catalog.in_tutorial(item.id)
+        return item.name in context.allowed
+
+    def build_keyboard(self, context, category, items, balance):
+        builder = InlineKeyboardBuilder()
+        shown = 0
+        for item in items:
+            is_allowed = self.is_allowed(context, item)
+            if context.only_allowed and not is_allowed:
+                continue
+            shown += 1
+
+            can_afford = balance >= item.price
+            item_text = f"{item.name} - {item.price} монет"
+            if not can_afford:
+                item_text += " ❌"
+            elif not is_allowed:
+                item_text += " 🔒"
+
+            if not is_allowed:
+                callback_data = context.locked_callback
+            elif not can_afford:
+                callback_data = "cant_afford"
+            else:
+                callback_data = item_callback(context.action, item)
+
+            builder.button(text=item_text, callback_data=callback_data)
+
+        if not shown:
+            builder.button(text="🚫 Нет подходящих товаров", callback_data="not_needed")
+
+        builder.button(text="🔙 Назад", callback_data=context.back_callback)
+        builder.adjust(1)
+        return builder.as_markup()
+
+    def keyboard(self, context, category, balance):
+        """Клавиатура категории: зависит только от того, какие товары по карману"""
+        build = functools.partial(self.build_keyboard, context)
+        return self.keyboards.get(context.name, self.db.catalog, category, balance, build)
+
+    def caption(self, context, category, balance, status_message=""):
+        caption = f"🏪 Магазин - {category}\n\n"
+        if status_message:
+            caption += f"{status_message}\n"
+        caption += f"💰 Ваш баланс: {balance} монет\n"
+        if context.hint and not status_message:
+            caption += f"{context.hint}\n"
+        return caption + "Выберите товар:"
+
+    def view(self, context, category, balance, status_message=""):
+        """(подпись, клавиатура) категории магазина"""
+        return self.caption(context, category, balance, status_message), self.keyboard(context, category, balance)
+
+    async def balance(self, context, player_id):
+        progress = await self.db.get_tutorial_progress(player_id)
+        return progress[3] if progress else context.default_balance
+
+    async def purchase(self, context, player_id, item_id, category):
+        """Проверка товара по каталогу и покупка одной транзакцией"""
+        item = self.db.catalog.get(item_id)
+        if item is None or item.category != category:
+            return PurchaseResult(PURCHASE_ITEM_NOT_FOUND, item.name if item else None)
+        if not self.is_allowed(context, item):
+            return PurchaseResult(PURCHASE_NOT_ALLOWED, item.name, item.price)
+        return await self.db.buy_item_atomic(player_id, item.id)